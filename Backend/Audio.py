@@ -1,153 +1,192 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import tempfile
 import os
 import traceback
 import speech_recognition as sr
-from deep_translator import GoogleTranslator
 import io
-import subprocess
-import shutil
-from gtts import gTTS
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from translation_cache import translation_cache
+from translator_registry import get_translator
+from language_catalog import language_catalog
+from audio_stream import SAMPLE_RATE, SAMPLE_WIDTH, TranscodeError, pcm_seconds, pcm_to_wav
+from transcoder import transcoder, TranscoderBusy
+from vad import voice_activity_detector, StreamSegmenter
+from recognizers import RECOGNIZERS, get_recognizer
+from tts_cache import tts_cache, split_sentences, stream_speech
+from http_cache import send_cached_file, streaming_response
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:3000", "http://localhost:5173", "http://127.0.0.1:5173"])
 
 app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50 MB
 
-def find_ffmpeg():
-    ffmpeg_path = shutil.which("ffmpeg")
-    if ffmpeg_path:
-        return ffmpeg_path
-    
-    custom_paths = [
-        "C:\\FFMPEG\\ffmpeg\\bin\\ffmpeg.exe",
-        "C:\\ffmpeg\\bin\\ffmpeg.exe",
-        "C:\\Program Files\\ffmpeg\\bin\\ffmpeg.exe",
-        "/usr/bin/ffmpeg",
-        "/usr/local/bin/ffmpeg",
-        'C:\\ffmpeg\\bin',
-        'C:\ffmpeg\bin'
-    ]
-    
-    for path in custom_paths:
-        if os.path.exists(path):
-            return path
-    
-    return None
+# Utterances are recognised in parallel on this pool
+RECOGNITION_WORKERS = int(os.environ.get("RECOGNITION_WORKERS", "4"))
+recognition_pool = ThreadPoolExecutor(max_workers=RECOGNITION_WORKERS, thread_name_prefix="recognition")
 
-FFMPEG_PATH = find_ffmpeg()
-
-def convert_audio_to_wav(audio_data, input_extension=".webm"):
-    if not FFMPEG_PATH:
-        print("FFmpeg not found, skipping audio conversion")
-        return None
-        
+def convert_audio_to_pcm(audio_data, input_extension=".webm"):
+    """16 kHz mono PCM for an upload (None if it can't be decoded); TranscoderBusy propagates"""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=input_extension) as input_file:
-            input_file.write(audio_data)
-            input_path = input_file.name
-            
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as output_file:
-            output_path = output_file.name
-            
-        cmd = [
-            FFMPEG_PATH,
-            '-i', input_path,
-            '-acodec', 'pcm_s16le',
-            '-ac', '1',
-            '-ar', '16000',
-            '-loglevel', 'error',
-            output_path,
-            '-y'
-        ]
-        
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        if result.returncode == 0:
-            with open(output_path, 'rb') as f:
-                wav_data = f.read()
-                
-            os.unlink(input_path)
-            os.unlink(output_path)
-            
-            return wav_data
-        else:
-            print(f"FFmpeg conversion failed: {result.stderr}")
-            try:
-                os.unlink(input_path)
-                os.unlink(output_path)
-            except:
-                pass
-            return None
-            
-    except Exception as e:
-        print(f"Error in FFmpeg conversion: {e}")
-        try:
-            os.unlink(input_path)
-            os.unlink(output_path)
-        except:
-            pass
+        return transcoder.to_pcm(audio_data, input_extension)
+    except TranscodeError as e:
+        print(f"FFmpeg conversion failed: {e}")
         return None
 
-def transcribe_audio(audio_data, language="ur-IN"):
+def convert_audio_to_wav(audio_data, input_extension=".webm"):
+    pcm = convert_audio_to_pcm(audio_data, input_extension)
+    return pcm_to_wav(pcm) if pcm is not None else None
+
+def transcribe_audio(audio_data, language="ur-IN", backend=None):
     try:
-        recognizer = sr.Recognizer()
-        
         with sr.AudioFile(io.BytesIO(audio_data)) as source:
-            audio = recognizer.record(source)
-            
-        # Try with specified language first, then fallback to auto-detect
-        try:
-            text = recognizer.recognize_google(audio, language=language)
-        except:
-            text = recognizer.recognize_google(audio)
-            
-        return text
-    except sr.UnknownValueError:
-        return "Could not understand audio"
-    except sr.RequestError as e:
-        return f"Error with speech recognition service: {e}"
+            audio = sr.Recognizer().record(source)
     except Exception as e:
         return f"Error transcribing audio: {str(e)}"
+    return transcribe_pcm(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH), language, backend)
+
+def transcribe_pcm(pcm, language="ur-IN", backend=None):
+    """Transcribe raw 16 kHz mono PCM with the configured (or given) recognizer backend"""
+    return get_recognizer(backend).transcribe(pcm, language)
+
+def is_transcript(text):
+    return bool(text.strip()) and not text.startswith("Could not understand") and not text.startswith("Error")
 
 def translate_text(text, target_lang, source_lang='auto'):
     try:
-        if text.strip() and not text.startswith("Could not understand") and not text.startswith("Error"):
-            translation = GoogleTranslator(source=source_lang, target=target_lang).translate(text)
+        if is_transcript(text):
+            cached = translation_cache.get(text, target_lang, source_lang)
+            if cached:
+                return cached["text"]
+            translation = get_translator(source=source_lang, target=target_lang).translate(text)
+            if translation:
+                translation_cache.set(text, target_lang, source_lang, {"text": translation, "src": source_lang})
             return translation
         return text
     except Exception as e:
         return f"Translation error: {str(e)}"
 
 def text_to_speech(text, lang='en'):
+    """Path and ETag of the cached MP3 for text, rendering it on first use"""
     try:
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-            tts = gTTS(text=text, lang=lang, slow=False)
-            tts.save(tmp_file.name)
-            return tmp_file.name
+        return tts_cache.get(text, lang)
     except Exception as e:
         print(f"Error in text-to-speech: {e}")
         return None
 
+def transcribe_utterances(utterances, language, backend=None):
+    """Recognise utterances concurrently, results in the original order"""
+    texts = recognition_pool.map(lambda utterance: transcribe_pcm(utterance.pcm, language, backend), utterances)
+    return [
+        {"start": utterance.start, "end": utterance.end, "transcript": text}
+        for utterance, text in zip(utterances, texts)
+    ]
+
+def transcribe_upload(audio_data, file_extension, source_lang, backend=None):
+    """Convert an uploaded recording to PCM and transcribe it, returns (transcript, segments)"""
+    # Language hint for the recogniser, None lets it detect ('auto' or unknown codes)
+    speech_lang = language_catalog.speech_code(source_lang, None)
+    
+    # Decode to PCM (native WAV fast path or the ffmpeg pool)
+    pcm = convert_audio_to_pcm(audio_data, file_extension)
+    
+    if pcm is None:
+        # If conversion fails or FFmpeg not available, use mock text
+        return "This is a transcript of your recording. (Audio conversion not available)", []
+    
+    # Only speech goes to the recogniser, one request per utterance
+    segments = [
+        segment for segment in transcribe_utterances(voice_activity_detector.split(pcm), speech_lang, backend)
+        if is_transcript(segment["transcript"])
+    ]
+    original_text = " ".join(segment["transcript"] for segment in segments)
+    
+    # If transcription failed, use mock text
+    if not original_text:
+        print("Transcription failed: no speech recognised")
+        original_text = "This is a transcript of your recording."
+    
+    return original_text, segments
+
+def stream_translation(audio_data, file_extension, source_lang, target_lang, backend=None):
+    """
+    Decode an upload through ffmpeg pipes, cut it into utterances as PCM
+    arrives and yield each one as soon as it is recognised and translated
+    (in order), then a summary
+    """
+    speech_lang = language_catalog.speech_code(source_lang, None)
+    segmenter = StreamSegmenter()
+    pending = deque()  # (utterance, future) in stream order
+    transcripts = []
+    translations = []
+    duration = 0.0
+    index = 0
+    
+    def result(utterance, text):
+        data = {"index": index, "start": utterance.start, "end": utterance.end}
+        if is_transcript(text):
+            translated = translate_text(text, target_lang, source_lang)
+            transcripts.append(text)
+            translations.append(translated)
+            data.update({"transcript": text, "translated_text": translated})
+        else:
+            # Unrecognisable utterance, keep going
+            data.update({"transcript": "", "translated_text": "", "error": text})
+        return data
+    
+    try:
+        for pcm in transcoder.stream(audio_data, file_extension):
+            duration += pcm_seconds(len(pcm))
+            for utterance in segmenter.feed(pcm):
+                pending.append((utterance, recognition_pool.submit(transcribe_pcm, utterance.pcm, speech_lang, backend)))
+            while pending and pending[0][1].done():
+                utterance, future = pending.popleft()
+                yield "partial", result(utterance, future.result())
+                index += 1
+    except TranscodeError as e:
+        yield "error", {"error": f"Audio conversion failed: {e}"}
+        return
+    except TranscoderBusy as e:
+        yield "error", {"error": f"Server busy: {e}"}
+        return
+    
+    for utterance in segmenter.flush():
+        pending.append((utterance, recognition_pool.submit(transcribe_pcm, utterance.pcm, speech_lang, backend)))
+    while pending:
+        utterance, future = pending.popleft()
+        yield "partial", result(utterance, future.result())
+        index += 1
+    
+    yield "done", {
+        "transcript": " ".join(transcripts),
+        "translated_text": " ".join(translations),
+        "duration": round(duration, 2)
+    }
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @app.route("/health", methods=["GET"])
 def health():
-    ffmpeg_available = FFMPEG_PATH is not None
+    ffmpeg_available = transcoder.ffmpeg_path is not None
     info = {
         "status": "OK", 
         "free_apis_available": True, 
         "mode": "free_apis", 
         "ffmpeg_available": ffmpeg_available,
-        "ffmpeg_path": FFMPEG_PATH or "Not found"
+        "ffmpeg_path": transcoder.ffmpeg_path or "Not found"
     }
     return jsonify(info)
 
+@app.route("/transcoder/stats", methods=["GET"])
+def transcoder_stats():
+    return jsonify(transcoder.stats())
+
+@app.route("/recognizer/stats", methods=["GET"])
+def recognizer_stats():
+    return jsonify(get_recognizer().stats())
+
 @app.route("/translate", methods=["POST", "OPTIONS"])
 def translate_audio():
     if request.method == "OPTIONS":
@@ -160,6 +199,9 @@ def translate_audio():
         audio_file = request.files["file"]
         source_lang = request.form.get("source_lang", "auto")
         target_lang = request.form.get("target_lang", "en")
+        backend = request.form.get("backend") or None
+        if backend and backend not in RECOGNIZERS:
+            return jsonify({"error": f"Unknown speech backend '{backend}'"}), 400
 
         # Get file extension
         filename = audio_file.filename
@@ -169,35 +211,7 @@ def translate_audio():
 
         audio_data = audio_file.read()
         
-        # Map language codes to speech recognition language codes
-        lang_map = {
-            "ur": "ur-PK",  # Urdu for Pakistan
-            "en": "en-US",
-            "es": "es-ES",
-            "fr": "fr-FR",
-            "de": "de-DE",
-            "hi": "hi-IN",
-            "ja": "ja-JP",
-            "zh": "zh-CN",
-            "ar": "ar-SA"
-        }
-        
-        speech_lang = lang_map.get(source_lang, "en-US")
-        
-        # Convert audio to WAV format
-        wav_data = convert_audio_to_wav(audio_data, file_extension)
-        
-        if wav_data:
-            # Transcribe audio
-            original_text = transcribe_audio(wav_data, speech_lang)
-            
-            # If transcription failed, use mock text
-            if "Error" in original_text or "Could not understand" in original_text:
-                print(f"Transcription failed: {original_text}")
-                original_text = "This is a transcript of your recording."
-        else:
-            # If conversion fails or FFmpeg not available, use mock text
-            original_text = "This is a transcript of your recording. (Audio conversion not available)"
+        original_text, segments = transcribe_upload(audio_data, file_extension, source_lang, backend)
 
         # Translate text
         translated_text = translate_text(original_text, target_lang, source_lang)
@@ -205,38 +219,83 @@ def translate_audio():
         # Return JSON response
         return jsonify({
             "transcript": original_text,
-            "translated_text": translated_text
+            "translated_text": translated_text,
+            "segments": segments
         })
 
+    except TranscoderBusy as e:
+        return jsonify({"error": f"Server busy: {e}"}), 503
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": f"Server exception: {str(e)}"}), 500
 
-@app.route("/text-to-speech", methods=["POST", "OPTIONS"])
+@app.route("/translate/stream", methods=["POST", "OPTIONS"])
+def translate_audio_stream():
+    """Like /translate, but streams per-utterance results as Server-Sent Events"""
+    if request.method == "OPTIONS":
+        return jsonify({}), 200
+        
+    if "file" not in request.files:
+        return jsonify({"error": "No file uploaded (field name must be 'file')."}), 400
+    audio_file = request.files["file"]
+    source_lang = request.form.get("source_lang", "auto")
+    target_lang = request.form.get("target_lang", "en")
+    backend = request.form.get("backend") or None
+    if backend and backend not in RECOGNIZERS:
+        return jsonify({"error": f"Unknown speech backend '{backend}'"}), 400
+    _, file_extension = os.path.splitext(audio_file.filename or "")
+    audio_data = audio_file.read()
+    
+    def generate():
+        for event, data in stream_translation(audio_data, file_extension or ".webm", source_lang, target_lang, backend):
+            yield sse_event(event, data)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/text-to-speech", methods=["GET", "POST", "OPTIONS"])
 def handle_text_to_speech():
     if request.method == "OPTIONS":
         return jsonify({}), 200
         
     try:
-        data = request.get_json(force=True, silent=True) or {}
+        # GET lets audio players revalidate and request byte ranges
+        if request.method == "GET":
+            data = request.args
+        else:
+            data = request.get_json(force=True, silent=True) or {}
         text = data.get("text", "").strip()
         lang = data.get("lang", "en")
         
         if not text:
             return jsonify({"error": "Text is required"}), 400
         
-        # Generate speech from text
-        audio_file_path = text_to_speech(text, lang)
+        # Several sentences are streamed as soon as the first one is synthesized
+        if len(split_sentences(text)) > 1:
+            try:
+                chunks = stream_speech(text, lang)
+            except Exception as e:
+                print(f"Error in text-to-speech: {e}")
+                return jsonify({"error": "Failed to generate speech"}), 500
+            return streaming_response(chunks, "audio/mpeg", "translation.mp3", as_attachment=True)
+        
+        # Generate speech from text (served from the TTS cache when already rendered)
+        audio = text_to_speech(text, lang)
         
-        if not audio_file_path:
+        if not audio:
             return jsonify({"error": "Failed to generate speech"}), 500
             
         # Return the audio file
-        return send_file(
+        audio_file_path, etag = audio
+        return send_cached_file(
             audio_file_path,
+            etag,
+            mimetype="audio/mpeg",
             as_attachment=True,
-            download_name=f"translation.mp3",
-            mimetype="audio/mpeg"
+            download_name="translation.mp3"
         )
         
     except Exception as e:
@@ -266,12 +325,12 @@ def text_translate():
 
 @app.route("/", methods=["GET"])
 def index():
-    ffmpeg_available = FFMPEG_PATH is not None
+    ffmpeg_available = transcoder.ffmpeg_path is not None
     return jsonify({
         "message": "Voice Translation API is running", 
         "mode": "free_apis", 
         "ffmpeg_available": ffmpeg_available,
-        "ffmpeg_path": FFMPEG_PATH or "Not found"
+        "ffmpeg_path": transcoder.ffmpeg_path or "Not found"
     })
 
 if __name__ == "__main__":
@@ -282,11 +341,15 @@ if __name__ == "__main__":
         print("Installing pydub for audio processing...")
         os.system("pip install pydub")
     
-    if FFMPEG_PATH:
-        print(f"Found FFmpeg at: {FFMPEG_PATH}")
+    if transcoder.ffmpeg_path:
+        print(f"Found FFmpeg at: {transcoder.ffmpeg_path}")
+        transcoder.preload()
     else:
         print("FFmpeg not found. Audio conversion will not be available.")
         print("Please install FFmpeg and add it to your PATH.")
+    
+    # Load the speech model (if the backend has one) before the first request
+    get_recognizer().preload()
         
     print("Starting Flask server with free speech-to-text and translation APIs")
     app.run(debug=True, port=5000, host="0.0.0.0")
\ No newline at end of file
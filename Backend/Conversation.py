@@ -1,10 +1,14 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from deep_translator import GoogleTranslator
 import json
 from datetime import datetime
 import os
 import logging
+from translation_cache import translation_cache
+from translator_registry import get_translator
+from language_catalog import language_catalog
+from language_detector import language_detector
+from http_cache import conditional_response
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -18,17 +22,48 @@ def translate_text(text, source_lang, target_lang):
     """
     Translate text from source language to target language
     """
+    cached = translation_cache.get(text, target_lang, source_lang)
+    if cached:
+        return cached['text']
+
     try:
-        # Use 'auto' for automatic language detection if source is not specified
-        if source_lang == 'auto':
-            translated = GoogleTranslator(source='auto', target=target_lang).translate(text)
-        else:
-            translated = GoogleTranslator(source=source_lang, target=target_lang).translate(text)
+        # Shared per-pair client ('auto' lets Google detect the source language)
+        translated = get_translator(source=source_lang, target=target_lang).translate(text)
+        if translated:
+            translation_cache.set(text, target_lang, source_lang, {"text": translated, "src": source_lang})
         return translated
     except Exception as e:
         logger.error(f"Translation error: {e}")
         return None
 
+def save_conversation_file(conversation, source_lang, target_lang):
+    """
+    Write a conversation to the conversations directory and return its filename
+    """
+    # Create conversations directory if it doesn't exist
+    if not os.path.exists('conversations'):
+        os.makedirs('conversations')
+    
+    # Generate filename with timestamp
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"conversations/conversation_{timestamp}.json"
+    
+    # Prepare data to save
+    save_data = {
+        'metadata': {
+            'source_language': source_lang,
+            'target_language': target_lang,
+            'saved_at': datetime.now().isoformat()
+        },
+        'conversation': conversation
+    }
+    
+    # Save to file
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(save_data, f, ensure_ascii=False, indent=2)
+    
+    return filename
+
 @app.route('/translate', methods=['POST'])
 def translate():
     """
@@ -81,27 +116,7 @@ def save_conversation():
         if not conversation:
             return jsonify({'error': 'No conversation data provided'}), 400
         
-        # Create conversations directory if it doesn't exist
-        if not os.path.exists('conversations'):
-            os.makedirs('conversations')
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"conversations/conversation_{timestamp}.json"
-        
-        # Prepare data to save
-        save_data = {
-            'metadata': {
-                'source_language': source_lang,
-                'target_language': target_lang,
-                'saved_at': datetime.now().isoformat()
-            },
-            'conversation': conversation
-        }
-        
-        # Save to file
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, ensure_ascii=False, indent=2)
+        filename = save_conversation_file(conversation, source_lang, target_lang)
         
         return jsonify({
             'message': 'Conversation saved successfully',
@@ -118,9 +133,9 @@ def get_languages():
     Endpoint for getting supported languages
     """
     try:
-        # Google Translator supported languages
-        languages = GoogleTranslator().get_supported_languages(as_dict=True)
-        return jsonify({'languages': languages})
+        # Google Translator supported languages, cached and refreshed by the shared catalog
+        body, etag = language_catalog.snapshot('google')
+        return conditional_response(body, etag, max_age=3600)
     except Exception as e:
         logger.error(f"Error getting languages: {e}")
         return jsonify({'error': 'Failed to retrieve languages'}), 500
@@ -135,17 +150,26 @@ def detect_language():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
             
+        # Batch input: {"texts": [...]}
+        texts = data.get('texts')
+        if isinstance(texts, list):
+            results = language_detector.detect_batch([t if isinstance(t, str) else '' for t in texts])
+            return jsonify({'results': [
+                {'detected_language': r['language'], 'confidence': r['confidence']} for r in results
+            ]})
+        
         text = data.get('text', '')
         
         if not text:
             return jsonify({'error': 'No text provided'}), 400
         
-        # Detect language
-        detected_lang = GoogleTranslator().detect(text)
+        # Detect language locally, no network round trip
+        detected = language_detector.detect(text)
         
         return jsonify({
             'text': text,
-            'detected_language': detected_lang
+            'detected_language': detected['language'],
+            'confidence': detected['confidence']
         })
         
     except Exception as e:
@@ -158,4 +182,5 @@ def health_check():
 
 if __name__ == '__main__':
     print("Starting Conversation Server...")
+    language_catalog.preload()
     app.run(debug=True, port=5000)
\ No newline at end of file
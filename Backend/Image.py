@@ -1,62 +1,33 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify
 from flask_cors import CORS
-import tempfile
 import os
 import traceback
-from deep_translator import GoogleTranslator
-from PIL import Image
-import io
-from gtts import gTTS
-import requests
 import base64
 import pytesseract
-import cv2
-import numpy as np
+from translation_cache import translation_cache
+from translator_registry import get_translator
+from http_client import http_client, CONNECT_TIMEOUT
+from tts_cache import tts_cache, split_sentences, stream_speech
+from http_cache import send_cached_file, streaming_response
+from ocr_pipeline import ocr_pipeline
+from ocr_engine import ocr_engine, OCRBusy
+from image_cache import image_result_cache
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:3000", "http://localhost:5173", "http://127.0.0.1:5173"])
 
 app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50 MB
 
+# Read timeout for the online OCR fallback (large images take a while to parse)
+OCR_READ_TIMEOUT = float(os.environ.get("OCR_READ_TIMEOUT", "30"))
+
 # Set the path to Tesseract executable (Your custom installation path)
 pytesseract.pytesseract.tesseract_cmd = r'C:\Users\Dell\Desktop\Tesseract-OCR\tesseract.exe'
 
-def preprocess_image(image_data):
-    """Preprocess image to improve OCR accuracy"""
-    try:
-        # Convert bytes to numpy array
-        nparr = np.frombuffer(image_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Apply noise reduction
-        denoised = cv2.medianBlur(gray, 3)
-        
-        # Apply threshold to get image with only black and white
-        thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-        
-        # Apply dilation to connect broken parts of text
-        kernel = np.ones((1, 1), np.uint8)
-        processed = cv2.dilate(thresh, kernel, iterations=1)
-        
-        return processed
-    except Exception as e:
-        print(f"Error in image preprocessing: {e}")
-        # Fallback: return original image data as numpy array
-        nparr = np.frombuffer(image_data, np.uint8)
-        return cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-
 def extract_text_from_image(image_data):
-    """Extract text from image using Tesseract OCR"""
+    """Extract text from image using the staged Tesseract OCR pipeline"""
     try:
-        # Preprocess the image
-        processed_image = preprocess_image(image_data)
-        
-        # Use Tesseract to extract text
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(processed_image, config=custom_config)
+        text = ocr_pipeline.extract(image_data)
         
         if text and text.strip():
             return text.strip()
@@ -64,6 +35,8 @@ def extract_text_from_image(image_data):
             # Fallback to online OCR if Tesseract fails
             return extract_text_online_fallback(image_data)
             
+    except OCRBusy:
+        raise
     except Exception as e:
         print(f"Error in Tesseract OCR: {e}")
         # Fallback to online OCR
@@ -85,7 +58,7 @@ def extract_text_online_fallback(image_data):
             'isOverlayRequired': False
         }
         
-        response = requests.post(api_url, data=payload)
+        response = http_client.post(api_url, data=payload, timeout=(CONNECT_TIMEOUT, OCR_READ_TIMEOUT))
         result = response.json()
         
         if result['IsErroredOnProcessing']:
@@ -101,76 +74,51 @@ def translate_text(text, target_lang, source_lang='auto'):
     """Translate text to target language"""
     try:
         if text and text.strip():
+            cached = translation_cache.get(text, target_lang, source_lang)
+            if cached:
+                return cached["text"]
+
             # Split text into chunks to handle long text
             chunks = [text[i:i+4000] for i in range(0, len(text), 4000)]
             translated_chunks = []
             
+            translator = get_translator(source=source_lang, target=target_lang)
             for chunk in chunks:
-                translation = GoogleTranslator(source=source_lang, target=target_lang).translate(chunk)
+                translation = translator.translate(chunk)
                 translated_chunks.append(translation)
             
-            return " ".join(translated_chunks)
+            translated = " ".join(translated_chunks)
+            translation_cache.set(text, target_lang, source_lang, {"text": translated, "src": source_lang})
+            return translated
         return text
     except Exception as e:
         print(f"Translation error: {e}")
         return f"Translation error: {str(e)}"
 
 def text_to_speech(text, lang='en'):
-    """Convert text to speech"""
+    """Convert text to speech, returns the cached MP3's path and ETag"""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-            tts = gTTS(text=text, lang=lang, slow=False)
-            tts.save(tmp_file.name)
-            return tmp_file.name
+        return tts_cache.get(text, lang)
     except Exception as e:
         print(f"Error in text-to-speech: {e}")
         return None
 
 def test_tesseract():
-    """Test function to verify Tesseract is working"""
-    try:
-        # Create a simple test image with text
-        from PIL import Image, ImageDraw, ImageFont
-        import tempfile
-        
-        # Create a white image
-        img = Image.new('RGB', (400, 200), color='white')
-        d = ImageDraw.Draw(img)
-        
-        # Try to use a basic font
-        try:
-            font = ImageFont.truetype("arial.ttf", 24)
-        except:
-            font = ImageFont.load_default()
-            
-        # Add text to image
-        d.text((10, 10), "Hello, Tesseract!", fill='black', font=font)
-        
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-            img.save(tmp.name)
-            
-            # Try to extract text
-            text = pytesseract.image_to_string(Image.open(tmp.name))
-            print(f"Tesseract test result: '{text}'")
-            
-            # Clean up
-            os.unlink(tmp.name)
-            
-        return "Tesseract is working!" if "Hello" in text else f"Tesseract test failed: {text}"
-    except Exception as e:
-        return f"Tesseract test error: {str(e)}"
+    """Run the OCR engine's self-test now (OCRs a rendered test image)"""
+    passed, message = ocr_engine.run_self_test()
+    return message
 
 @app.route("/health", methods=["GET"])
 def health():
-    # Test Tesseract
-    tesseract_test = test_tesseract()
+    # Cheap liveness plus the cached self-test, so probes don't each run OCR
+    engine = ocr_engine.health()
     
     info = {
         "status": "OK", 
-        "ocr_available": "Tesseract" in tesseract_test, 
+        "ocr_available": engine["available"] and engine["self_test_passed"], 
         "mode": "tesseract_with_fallback",
-        "tesseract_test": tesseract_test
+        "tesseract_test": engine["self_test"],
+        "ocr_engine": engine
     }
     return jsonify(info)
 
@@ -189,56 +137,96 @@ def image_translate():
 
         image_data = image_file.read()
         
+        # Exactly this photo already translated (retries)
+        cached, fingerprint = image_result_cache.get(image_data, target_lang, source_lang)
+        if cached is not None:
+            return jsonify(cached)
+        
         # Extract text from image
-        extracted_text = extract_text_from_image(image_data)
+        try:
+            extracted_text = extract_text_from_image(image_data)
+        except OCRBusy as e:
+            return jsonify({"error": str(e)}), 503
         
         if not extracted_text:
             return jsonify({"error": "No text could be extracted from the image"}), 400
 
+        # A nearly identical photo with the same text (the same sign twice) already has its translation
+        cached = image_result_cache.near_match(fingerprint, extracted_text)
+        if cached is not None:
+            return jsonify(cached)
+
         # Translate text
         translated_text = translate_text(extracted_text, target_lang, source_lang)
 
-        # Return JSON response
-        return jsonify({
+        result = {
             "extracted_text": extracted_text,
             "translated_text": translated_text
-        })
+        }
+        if not translated_text.startswith("Translation error:"):
+            image_result_cache.put(fingerprint, result)
+        
+        # Return JSON response
+        return jsonify(result)
 
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": f"Server exception: {str(e)}"}), 500
 
-@app.route("/image-text-to-speech", methods=["POST", "OPTIONS"])
+@app.route("/image-text-to-speech", methods=["GET", "POST", "OPTIONS"])
 def image_text_to_speech():
     if request.method == "OPTIONS":
         return jsonify({}), 200
         
     try:
-        data = request.get_json(force=True, silent=True) or {}
+        # GET lets audio players revalidate and request byte ranges
+        if request.method == "GET":
+            data = request.args
+        else:
+            data = request.get_json(force=True, silent=True) or {}
         text = data.get("text", "").strip()
         lang = data.get("lang", "en")
         
         if not text:
             return jsonify({"error": "Text is required"}), 400
         
-        # Generate speech from text
-        audio_file_path = text_to_speech(text, lang)
+        # Several sentences are streamed as soon as the first one is synthesized
+        if len(split_sentences(text)) > 1:
+            try:
+                chunks = stream_speech(text, lang)
+            except Exception as e:
+                print(f"Error in text-to-speech: {e}")
+                return jsonify({"error": "Failed to generate speech"}), 500
+            return streaming_response(chunks, "audio/mpeg", "translation.mp3", as_attachment=True)
+        
+        # Generate speech from text (served from the TTS cache when already rendered)
+        audio = text_to_speech(text, lang)
         
-        if not audio_file_path:
+        if not audio:
             return jsonify({"error": "Failed to generate speech"}), 500
             
         # Return the audio file
-        return send_file(
+        audio_file_path, etag = audio
+        return send_cached_file(
             audio_file_path,
+            etag,
+            mimetype="audio/mpeg",
             as_attachment=True,
-            download_name=f"translation.mp3",
-            mimetype="audio/mpeg"
+            download_name="translation.mp3"
         )
         
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": f"Server exception: {str(e)}"}), 500
 
+@app.route("/image-cache/stats", methods=["GET"])
+def image_cache_stats():
+    return jsonify(image_result_cache.stats())
+
+@app.route("/ocr/stats", methods=["GET"])
+def ocr_stats():
+    return jsonify(ocr_pipeline.stats())
+
 @app.route("/test-tesseract", methods=["GET"])
 def test_tesseract_route():
     result = test_tesseract()
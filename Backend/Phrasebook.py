@@ -1,219 +1,23 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-from gtts import gTTS
 import json
 import os
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-import io
-import tempfile
+import argparse
+import jwt
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from language_catalog import language_catalog
+from phrasebook_store import phrasebook_store, phrase_dict
+from pdf_cache import pdf_cache
+from favorites_store import favorites_store
+from token_cache import VerifiedTokenCache, verify_jwt
+from tts_cache import tts_cache, split_sentences, stream_speech
+from http_cache import EncodedPayload, payload_response, send_cached_file, streaming_response
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:3000", "http://localhost:5173", "http://127.0.0.1:5173"])
 
-# Complete categories with all data
-categories = [
-    {"id": "greetings", "name": "Greetings", "icon": "FaHandPeace"},
-    {"id": "food", "name": "Food & Dining", "icon": "FaUtensils"},
-    {"id": "transportation", "name": "Transportation", "icon": "FaCar"},
-    {"id": "shopping", "name": "Shopping", "icon": "FaShoppingCart"},
-    {"id": "emergency", "name": "Emergency", "icon": "FaFirstAid"},
-    {"id": "directions", "name": "Directions", "icon": "FaCompass"},
-    {"id": "accommodation", "name": "Accommodation", "icon": "FaHotel"},
-    {"id": "numbers", "name": "Numbers", "icon": "FaSortNumericDown"}
-]
-
-# Complete phrases for all categories
-phrases = {
-    "greetings": [
-        {"id": 1, "english": "Hello", "translation": "Hola", "pronunciation": "OH-lah"},
-        {"id": 2, "english": "Good morning", "translation": "Buenos días", "pronunciation": "BWEH-nos DEE-as"},
-        {"id": 3, "english": "Good afternoon", "translation": "Buenas tardes", "pronunciation": "BWEH-nas TAR-des"},
-        {"id": 4, "english": "Good evening", "translation": "Buenas noches", "pronunciation": "BWEH-nas NO-ches"},
-        {"id": 5, "english": "How are you?", "translation": "¿Cómo estás?", "pronunciation": "KOH-mo es-TAS"},
-        {"id": 6, "english": "I'm fine, thank you", "translation": "Estoy bien, gracias", "pronunciation": "es-TOY byen, GRA-syas"},
-        {"id": 7, "english": "What's your name?", "translation": "¿Cómo te llamas?", "pronunciation": "KOH-mo te YAH-mas"},
-        {"id": 8, "english": "My name is...", "translation": "Me llamo...", "pronunciation": "meh YAH-mo"},
-        {"id": 9, "english": "Nice to meet you", "translation": "Mucho gusto", "pronunciation": "MOO-cho GOOS-to"},
-        {"id": 10, "english": "Goodbye", "translation": "Adiós", "pronunciation": "a-DYOS"},
-        {"id": 11, "english": "See you later", "translation": "Hasta luego", "pronunciation": "AS-ta LWE-go"},
-        {"id": 12, "english": "See you tomorrow", "translation": "Hasta mañana", "pronunciation": "AS-ta ma-NYA-na"},
-        {"id": 13, "english": "Please", "translation": "Por favor", "pronunciation": "por fa-VOR"},
-        {"id": 14, "english": "Thank you", "translation": "Gracias", "pronunciation": "GRA-syas"},
-        {"id": 15, "english": "You're welcome", "translation": "De nada", "pronunciation": "de NA-da"},
-        {"id": 16, "english": "Excuse me", "translation": "Disculpe", "pronunciation": "dis-KOOL-pe"},
-        {"id": 17, "english": "I'm sorry", "translation": "Lo siento", "pronunciation": "lo SYEN-to"},
-        {"id": 18, "english": "Yes", "translation": "Sí", "pronunciation": "see"},
-        {"id": 19, "english": "No", "translation": "No", "pronunciation": "no"},
-        {"id": 20, "english": "Maybe", "translation": "Quizás", "pronunciation": "kee-SAS"}
-    ],
-    "food": [
-        {"id": 21, "english": "I would like to order", "translation": "Me gustaría ordenar", "pronunciation": "meh goos-ta-REE-ah or-den-AR"},
-        {"id": 22, "english": "The menu, please", "translation": "El menú, por favor", "pronunciation": "el meh-NOO por fa-VOR"},
-        {"id": 23, "english": "What do you recommend?", "translation": "¿Qué recomienda?", "pronunciation": "keh reh-koh-MYEN-da"},
-        {"id": 24, "english": "I am vegetarian", "translation": "Soy vegetariano/a", "pronunciation": "soy veh-he-ta-RYAH-no/na"},
-        {"id": 25, "english": "I am vegan", "translation": "Soy vegano/a", "pronunciation": "soy ve-GA-no/na"},
-        {"id": 26, "english": "I have food allergies", "translation": "Tengo alergias alimentarias", "pronunciation": "TEN-go a-LER-hyas a-li-men-TA-ryas"},
-        {"id": 27, "english": "Cheers!", "translation": "¡Salud!", "pronunciation": "sa-LOOD"},
-        {"id": 28, "english": "The bill, please", "translation": "La cuenta, por favor", "pronunciation": "la KWEN-ta por fa-VOR"},
-        {"id": 29, "english": "Is service included?", "translation": "¿El servicio está incluido?", "pronunciation": "el ser-VEE-syo es-ta in-kloo-EE-do"},
-        {"id": 30, "english": "This is delicious", "translation": "Esto está delicioso", "pronunciation": "ES-to es-ta de-li-SYO-so"},
-        {"id": 31, "english": "I would like water", "translation": "Quisiera agua", "pronunciation": "ki-SYE-ra A-gwa"},
-        {"id": 32, "english": "A table for two, please", "translation": "Una mesa para dos, por favor", "pronunciation": "OO-na ME-sa PA-ra dos por fa-VOR"},
-        {"id": 33, "english": "Do you have vegan options?", "translation": "¿Tienen opciones veganas?", "pronunciation": "TYE-nen op-SYO-nes ve-GA-nas"},
-        {"id": 34, "english": "Could I have the wine list?", "translation": "¿Podría ver la carta de vinos?", "pronunciation": "po-DREE-a ver la CAR-ta de VEE-nos"},
-        {"id": 35, "english": "I'll have the same", "translation": "Voy a tomar lo mismo", "pronunciation": "voy a to-MAR lo MEES-mo"},
-        {"id": 36, "english": "Is this dish spicy?", "translation": "¿Este plato es picante?", "pronunciation": "ES-te PLA-to es pi-KAN-te"},
-        {"id": 37, "english": "Could I have more bread?", "translation": "¿Podría traer más pan?", "pronunciation": "po-DREE-a tra-ER mas PAN"},
-        {"id": 38, "english": "I'm full", "translation": "Estoy lleno", "pronunciation": "es-TOY YE-no"},
-        {"id": 39, "english": "This isn't what I ordered", "translation": "Esto no es lo que pedí", "pronunciation": "ES-to no es lo ke pe-DEE"},
-        {"id": 40, "english": "Could I have a doggy bag?", "translation": "¿Podría llevarme lo que sobra?", "pronunciation": "po-DREE-a ye-VAR-me lo ke SO-bra"}
-    ],
-    "transportation": [
-        {"id": 41, "english": "Where is the bus stop?", "translation": "¿Dónde está la parada de autobús?", "pronunciation": "DON-deh es-TA la pa-RA-da de ow-to-BOOS"},
-        {"id": 42, "english": "How much is a ticket?", "translation": "¿Cuánto cuesta un boleto?", "pronunciation": "KWAN-to KWES-ta oon bo-LE-to"},
-        {"id": 43, "english": "I need a taxi", "translation": "Necesito un taxi", "pronunciation": "ne-se-SEE-to oon TAK-see"},
-        {"id": 44, "english": "To the airport, please", "translation": "Al aeropuerto, por favor", "pronunciation": "al a-e-ro-PWER-to por fa-VOR"},
-        {"id": 45, "english": "To the train station", "translation": "A la estación de tren", "pronunciation": "a la es-ta-SYON de TREN"},
-        {"id": 46, "english": "How long does it take?", "translation": "¿Cuánto tiempo se tarda?", "pronunciation": "KWAN-to TYEM-po se TAR-da"},
-        {"id": 47, "english": "Is this seat taken?", "translation": "¿Está ocupado este asiento?", "pronunciation": "es-TA o-koo-PA-do ES-te a-SYEN-to"},
-        {"id": 48, "english": "Which platform for the train to...?", "translation": "¿Qué andén para el tren a...?", "pronunciation": "ke an-DEN PA-ra el tren a"},
-        {"id": 49, "english": "I'd like to rent a car", "translation": "Me gustaría alquilar un coche", "pronunciation": "me goos-ta-REE-a al-ki-LAR oon KO-che"},
-        {"id": 50, "english": "Where can I get a taxi?", "translation": "¿Dónde puedo tomar un taxi?", "pronunciation": "DON-de PWE-do to-MAR oon TAK-see"},
-        {"id": 51, "english": "Does this bus go to...?", "translation": "¿Este autobús va a...?", "pronunciation": "ES-te ow-to-BOOS va a"},
-        {"id": 52, "english": "When is the next bus?", "translation": "¿Cuándo es el próximo autobús?", "pronunciation": "KWAN-do es el PROK-see-mo ow-to-BOOS"},
-        {"id": 53, "english": "I need directions to...", "translation": "Necesito direcciones para llegar a...", "pronunciation": "ne-se-SEE-to di-rek-SYO-nes PA-ra ye-GAR a"},
-        {"id": 54, "english": "How much is the fare?", "translation": "¿Cuánto cuesta el pasaje?", "pronunciation": "KWAN-to KWES-ta el pa-SA-he"},
-        {"id": 55, "english": "Is there a direct bus?", "translation": "¿Hay un autobús directo?", "pronunciation": "ai oon ow-to-BOOS di-REK-to"},
-        {"id": 56, "english": "I'm getting off at the next stop", "translation": "Me bajo en la próxima parada", "pronunciation": "me BA-ho en la PROK-see-ma pa-RA-da"},
-        {"id": 57, "english": "Could you let me know when we arrive?", "translation": "¿Podría avisarme cuando lleguemos?", "pronunciation": "po-DREE-a a-vee-SAR-me KWAN-do ye-GE-mos"},
-        {"id": 58, "english": "Where is the nearest metro station?", "translation": "¿Dónde está la estación de metro más cercana?", "pronunciation": "DON-de es-TA la es-ta-SYON de ME-tro mas ser-KA-na"},
-        {"id": 59, "english": "I'm lost", "translation": "Estoy perdido", "pronunciation": "es-TOY per-DEE-do"},
-        {"id": 60, "english": "Can you show me on the map?", "translation": "¿Puede mostrarme en el mapa?", "pronunciation": "PWE-de mos-TRAR-me en el MA-pa"}
-    ],
-    "shopping": [
-        {"id": 61, "english": "How much does this cost?", "translation": "¿Cuánto cuesta esto?", "pronunciation": "KWAN-to KWES-ta ES-to"},
-        {"id": 62, "english": "Do you accept credit cards?", "translation": "¿Aceptan tarjetas de crédito?", "pronunciation": "a-SEP-tan tar-HE-tas de CRE-di-to"},
-        {"id": 63, "english": "I'm just looking", "translation": "Solo estoy mirando", "pronunciation": "SO-lo es-TOY mee-RAN-do"},
-        {"id": 64, "english": "Can I try this on?", "translation": "¿Puedo probarme esto?", "pronunciation": "PWE-do pro-BAR-me ES-to"},
-        {"id": 65, "english": "Where are the changing rooms?", "translation": "¿Dónde están los probadores?", "pronunciation": "DON-de es-TAN los pro-ba-DO-res"},
-        {"id": 66, "english": "Do you have this in a different size?", "translation": "¿Tiene esto en otra talla?", "pronunciation": "TYE-ne ES-to en O-tra TA-ya"},
-        {"id": 67, "english": "Do you have this in another color?", "translation": "¿Tiene esto en otro color?", "pronunciation": "TYE-ne ES-to en O-tra ko-LOR"},
-        {"id": 68, "english": "It's too expensive", "translation": "Es demasiado caro", "pronunciation": "es de-ma-SYA-do KA-ro"},
-        {"id": 69, "english": "Is there a discount?", "translation": "¿Hay descuento?", "pronunciation": "ai des-KWEN-to"},
-        {"id": 70, "english": "Can you give me a better price?", "translation": "¿Puede hacerme un mejor precio?", "pronunciation": "PWE-de a-SER-me oon me-HOR pre-SYO"},
-        {"id": 71, "english": "I'll take it", "translation": "Me lo llevo", "pronunciation": "me lo YE-vo"},
-        {"id": 72, "english": "Do you have a bag?", "translation": "¿Tiene una bolsa?", "pronunciation": "TYE-ne OO-na BOL-sa"},
-        {"id": 73, "english": "Where do I pay?", "translation": "¿Dónde pago?", "pronunciation": "DON-de PA-go"},
-        {"id": 74, "english": "Can I get a receipt?", "translation": "¿Puedo tener un recibo?", "pronunciation": "PWE-do te-NER oon re-SEE-bo"},
-        {"id": 75, "english": "Do you have a warranty?", "translation": "¿Tiene garantía?", "pronunciation": "TYE-ne ga-ran-TEE-a"},
-        {"id": 76, "english": "I'm looking for a gift", "translation": "Estoy buscando un regalo", "pronunciation": "es-TOY boos-KAN-do oon re-GA-lo"},
-        {"id": 77, "english": "What's your return policy?", "translation": "¿Cuál es su política de devoluciones?", "pronunciation": "KWAL es soo po-LEE-tee-ka de de-vo-loo-SYO-nes"},
-        {"id": 78, "english": "Do you have something cheaper?", "translation": "¿Tiene algo más barato?", "pronunciation": "TYE-ne AL-go mas ba-RA-to"},
-        {"id": 79, "english": "This is a present", "translation": "Esto es un regalo", "pronunciation": "ES-to es oon re-GA-lo"},
-        {"id": 80, "english": "Can you gift wrap it?", "translation": "¿Puede envolverlo para regalo?", "pronunciation": "PWE-de en-vol-VER-lo PA-ra re-GA-lo"}
-    ],
-    "emergency": [
-        {"id": 81, "english": "Help!", "translation": "¡Ayuda!", "pronunciation": "ah-YOO-da"},
-        {"id": 82, "english": "I need a doctor", "translation": "Necesito un médico", "pronunciation": "neh-seh-SEE-to oon MEH-dee-ko"},
-        {"id": 83, "english": "Call the police", "translation": "Llame a la policía", "pronunciation": "YAH-meh a la po-lee-SEE-ah"},
-        {"id": 84, "english": "Where is the hospital?", "translation": "¿Dónde está el hospital?", "pronunciation": "DON-deh es-TA el os-pee-TAL"},
-        {"id": 85, "english": "I am lost", "translation": "Estoy perdido/a", "pronunciation": "es-TOY per-DEE-do/da"},
-        {"id": 86, "english": "I've been robbed", "translation": "Me han robado", "pronunciation": "me an ro-BA-do"},
-        {"id": 87, "english": "My wallet was stolen", "translation": "Me robaron la cartera", "pronunciation": "me ro-BA-ron la kar-TE-ra"},
-        {"id": 88, "english": "I need help", "translation": "Necesito ayuda", "pronunciation": "ne-se-SEE-to a-YOO-da"},
-        {"id": 89, "english": "It's an emergency", "translation": "Es una emergencia", "pronunciation": "es OO-na e-mer-HEN-sya"},
-        {"id": 90, "english": "Call an ambulance", "translation": "Llame una ambulancia", "pronunciation": "YA-me OO-na am-boo-LAN-sya"},
-        {"id": 91, "english": "There's been an accident", "translation": "Ha habido un accidente", "pronunciation": "a a-BEE-do oon ak-see-DEN-te"},
-        {"id": 92, "english": "I'm not feeling well", "translation": "No me siento bien", "pronunciation": "no me SYEN-to byen"},
-        {"id": 93, "english": "Where is the pharmacy?", "translation": "¿Dónde está la farmacia?", "pronunciation": "DON-de es-TA la far-MA-sya"},
-        {"id": 94, "english": "I'm allergic to...", "translation": "Soy alérgico/a a...", "pronunciation": "soy a-LER-hee-ko/a a"},
-        {"id": 95, "english": "I need to contact my embassy", "translation": "Necesito contactar con mi embajada", "pronunciation": "ne-se-SEE-to kon-tak-TAR kon mi em-ba-HA-da"},
-        {"id": 96, "english": "Fire!", "translation": "¡Fuego!", "pronunciation": "FWE-go"},
-        {"id": 97, "english": "Be careful!", "translation": "¡Cuidado!", "pronunciation": "kwee-DA-do"},
-        {"id": 98, "english": "Watch out!", "translation": "¡Atención!", "pronunciation": "a-ten-SYON"},
-        {"id": 99, "english": "Is it safe here?", "translation": "¿Es seguro aquí?", "pronunciation": "es se-GU-ro a-KEE"},
-        {"id": 100, "english": "I need to report a crime", "translation": "Necesito reportar un crimen", "pronunciation": "ne-se-SEE-to re-por-TAR oon KREE-men"}
-    ],
-    "directions": [
-        {"id": 101, "english": "Where is...?", "translation": "¿Dónde está...?", "pronunciation": "DON-deh es-TA"},
-        {"id": 102, "english": "How do I get to...?", "translation": "¿Cómo llego a...?", "pronunciation": "KO-mo YE-go a"},
-        {"id": 103, "english": "Turn left", "translation": "Gire a la izquierda", "pronunciation": "HEE-re a la ees-KYER-da"},
-        {"id": 104, "english": "Turn right", "translation": "Gire a la derecha", "pronunciation": "HEE-re a la de-RE-cha"},
-        {"id": 105, "english": "Go straight", "translation": "Siga derecho", "pronunciation": "SEE-ga de-RE-cho"},
-        {"id": 106, "english": "It's nearby", "translation": "Está cerca", "pronunciation": "es-TA SER-ka"},
-        {"id": 107, "english": "It's far", "translation": "Está lejos", "pronunciation": "es-TA LE-hos"},
-        {"id": 108, "english": "North", "translation": "Norte", "pronunciation": "NOR-te"},
-        {"id": 109, "english": "South", "translation": "Sur", "pronunciation": "soor"},
-        {"id": 110, "english": "East", "translation": "Este", "pronunciation": "ES-te"},
-        {"id": 111, "english": "West", "translation": "Oeste", "pronunciation": "o-ES-te"},
-        {"id": 112, "english": "On the corner", "translation": "En la esquina", "pronunciation": "en la es-KEE-na"},
-        {"id": 113, "english": "Next to", "translation": "Junto a", "pronunciation": "HOON-to a"},
-        {"id": 114, "english": "Behind", "translation": "Detrás de", "pronunciation": "de-TRAS de"},
-        {"id": 115, "english": "In front of", "translation": "En frente de", "pronunciation": "en FREN-te de"},
-        {"id": 116, "english": "Between", "translation": "Entre", "pronunciation": "EN-tre"},
-        {"id": 117, "english": "Across from", "translation": "Frente a", "pronunciation": "FREN-te a"},
-        {"id": 118, "english": "At the traffic light", "translation": "En el semáforo", "pronunciation": "en el se-MA-fo-ro"},
-        {"id": 119, "english": "At the roundabout", "translation": "En la rotonda", "pronunciation": "en la ro-TON-da"},
-        {"id": 120, "english": "Can you show me on the map?", "translation": "¿Puede mostrarme en el mapa?", "pronunciation": "PWE-de mos-TRAR-me en el MA-pa"}
-    ],
-    "accommodation": [
-        {"id": 121, "english": "I have a reservation", "translation": "Tengo una reservación", "pronunciation": "TEN-go oo-na re-ser-va-SYON"},
-        {"id": 122, "english": "Do you have any rooms available?", "translation": "¿Tienen habitaciones disponibles?", "pronunciation": "TYE-nen a-bee-ta-SYO-nes dis-po-nee-BLES"},
-        {"id": 123, "english": "What time is check-out?", "translation": "¿A qué hora es la salida?", "pronunciation": "a ke O-ra es la sa-LEE-da"},
-        {"id": 124, "english": "The key, please", "translation": "La llave, por favor", "pronunciation": "la YA-ve por fa-VOR"},
-        {"id": 125, "english": "I'd like a single room", "translation": "Me gustaría una habitación individual", "pronunciation": "me goos-ta-REE-a OO-na a-bee-ta-SYON in-dee-vee-dwal"},
-        {"id": 126, "english": "I'd like a double room", "translation": "Me gustaría una habitación doble", "pronunciation": "me goos-ta-REE-a OO-na a-bee-ta-SYON DO-ble"},
-        {"id": 127, "english": "Does the room have a bathroom?", "translation": "¿La habitación tiene baño?", "pronunciation": "la a-bee-ta-SYON TYE-ne BA-nyo"},
-        {"id": 128, "english": "Is breakfast included?", "translation": "¿El desayuno está incluido?", "pronunciation": "el de-sa-YOO-no es-ta in-kloo-EE-do"},
-        {"id": 129, "english": "What time is breakfast served?", "translation": "¿A qué hora se sirve el desayuno?", "pronunciation": "a ke O-ra se SER-ve el de-sa-YOO-no"},
-        {"id": 130, "english": "I need extra towels", "translation": "Necesito toallas adicionales", "pronunciation": "ne-se-SEE-to to-A-yas a-dee-syo-NA-les"},
-        {"id": 131, "english": "The room is too hot/cold", "translation": "La habitación está muy caliente/fría", "pronunciation": "la a-bee-ta-SYON es-TA MOOY ka-LYEN-te/FREE-a"},
-        {"id": 132, "english": "There's a problem with the...", "translation": "Hay un problema con...", "pronunciation": "ai oon pro-BLE-ma kon"},
-        {"id": 133, "english": "Can I have a wake-up call?", "translation": "¿Pueden despertarme por teléfono?", "pronunciation": "PWE-den des-per-TAR-me por te-LE-fo-no"},
-        {"id": 134, "english": "Where is the elevator?", "translation": "¿Dónde está el ascensor?", "pronunciation": "DON-de es-TA el as-sen-SOR"},
-        {"id": 135, "english": "Do you have Wi-Fi?", "translation": "¿Tienen Wi-Fi?", "pronunciation": "TYE-nen WAI-FAI"},
-        {"id": 136, "english": "What's the Wi-Fi password?", "translation": "¿Cuál es la contraseña del Wi-Fi?", "pronunciation": "KWAL es la kon-tra-SE-nya del WAI-FAI"},
-        {"id": 137, "english": "I'd like to extend my stay", "translation": "Me gustaría extender mi estadía", "pronunciation": "me goos-ta-REE-a eks-ten-DER me es-ta-DEE-a"},
-        {"id": 138, "english": "I'm checking out today", "translation": "Me voy hoy", "pronunciation": "me VOY oy"},
-        {"id": 139, "english": "Can I store my luggage?", "translation": "¿Puedo guardar mi equipaje?", "pronunciation": "PWE-do gwar-DAR me e-kee-PA-he"},
-        {"id": 140, "english": "Where is the nearest ATM?", "translation": "¿Dónde está el cajero automático más cercano?", "pronunciation": "DON-de es-TA el ka-HE-ro ow-to-MA-tee-ko mas ser-KA-no"}
-    ],
-    "numbers": [
-        {"id": 141, "english": "One", "translation": "Uno", "pronunciation": "OO-no"},
-        {"id": 142, "english": "Two", "translation": "Dos", "pronunciation": "DOS"},
-        {"id": 143, "english": "Three", "translation": "Tres", "pronunciation": "TRES"},
-        {"id": 144, "english": "Four", "translation": "Cuatro", "pronunciation": "KWA-tro"},
-        {"id": 145, "english": "Five", "translation": "Cinco", "pronunciation": "SIN-ko"},
-        {"id": 146, "english": "Six", "translation": "Seis", "pronunciation": "SEIS"},
-        {"id": 147, "english": "Seven", "translation": "Siete", "pronunciation": "SYE-te"},
-        {"id": 148, "english": "Eight", "translation": "Ocho", "pronunciation": "O-cho"},
-        {"id": 149, "english": "Nine", "translation": "Nueve", "pronunciation": "NWE-ve"},
-        {"id": 150, "english": "Ten", "translation": "Diez", "pronunciation": "DYESS"},
-        {"id": 151, "english": "Eleven", "translation": "Once", "pronunciation": "ON-se"},
-        {"id": 152, "english": "Twelve", "translation": "Doce", "pronunciation": "DO-se"},
-        {"id": 153, "english": "Thirteen", "translation": "Trece", "pronunciation": "TRE-se"},
-        {"id": 154, "english": "Fourteen", "translation": "Catorce", "pronunciation": "ka-TOR-se"},
-        {"id": 155, "english": "Fifteen", "translation": "Quince", "pronunciation": "KEEN-se"},
-        {"id": 156, "english": "Sixteen", "translation": "Dieciséis", "pronunciation": "dye-see-SEIS"},
-        {"id": 157, "english": "Seventeen", "translation": "Diecisiete", "pronunciation": "dye-see-SYE-te"},
-        {"id": 158, "english": "Eighteen", "translation": "Dieciocho", "pronunciation": "dye-see-O-cho"},
-        {"id": 159, "english": "Nineteen", "translation": "Diecinueve", "pronunciation": "dye-see-NWE-ve"},
-        {"id": 160, "english": "Twenty", "translation": "Veinte", "pronunciation": "VEIN-te"},
-        {"id": 161, "english": "Thirty", "translation": "Treinta", "pronunciation": "TREIN-ta"},
-        {"id": 162, "english": "Forty", "translation": "Cuarenta", "pronunciation": "kwa-REN-ta"},
-        {"id": 163, "english": "Fifty", "translation": "Cincuenta", "pronunciation": "sin-KWEN-ta"},
-        {"id": 164, "english": "Sixty", "translation": "Sesenta", "pronunciation": "se-SEN-ta"},
-        {"id": 165, "english": "Seventy", "translation": "Setenta", "pronunciation": "se-TEN-ta"},
-        {"id": 166, "english": "Eighty", "translation": "Ochenta", "pronunciation": "o-CHEN-ta"},
-        {"id": 167, "english": "Ninety", "translation": "Noventa", "pronunciation": "no-VEN-ta"},
-        {"id": 168, "english": "One hundred", "translation": "Cien", "pronunciation": "SYEN"},
-        {"id": 169, "english": "One thousand", "translation": "Mil", "pronunciation": "MEEL"},
-        {"id": 170, "english": "Million", "translation": "Millón", "pronunciation": "mee-YON"}
-    ]
-}
-
 practice_questions = [
     {
         "question": "How would you say \"Hello\" in Spanish?",
@@ -232,108 +36,230 @@ practice_questions = [
     }
 ]
 
-# In-memory storage for favorites (in a real app, use a database)
-favorites = []
+# Tokens come from the auth service (app.py) and are checked with the same key
+JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
+JWT_ALGORITHM = 'HS256'
+# Claims of already verified tokens
+token_cache = VerifiedTokenCache()
+
+# Language served when a request doesn't name one
+DEFAULT_LANGUAGE = 'es'
+
+# Pagination limits for /api/phrases
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Encoded pages kept before the page memo is reset
+MAX_CACHED_PAGES = 1024
+
+class PhrasebookPayloads:
+    """
+    Read API payloads encoded once (JSON, gzip, brotli, ETag). Shared
+    payloads are built at startup; a language's phrase payloads are built
+    on its first request and again only when its content hash changes.
+    Pages are encoded on first request and memoized with the language.
+    """
+    
+    def __init__(self, store=phrasebook_store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._languages = OrderedDict()  # code -> encoded payloads, least recently used first
+        self.rebuild()
+    
+    def rebuild(self):
+        """Re-encode the shared payloads and drop every language's"""
+        shared = {
+            'categories': EncodedPayload(self.store.categories()),
+            'practice_questions': EncodedPayload(practice_questions),
+        }
+        with self._lock:
+            self._shared = shared
+            self._languages.clear()
+    
+    def get(self, name):
+        with self._lock:
+            return self._shared[name]
+    
+    def _language(self, language):
+        phrase_set = self.store.get(language)
+        if phrase_set is None:
+            return None
+        with self._lock:
+            entry = self._languages.get(language)
+            if entry is not None and entry['hash'] == phrase_set.content_hash:
+                self._languages.move_to_end(language)
+                return entry
+        
+        payloads = {None: EncodedPayload(phrase_set.as_dict())}
+        for category_id in phrase_set.by_category:
+            payloads[category_id] = EncodedPayload(phrase_set.as_dict(category_id))
+        entry = {'hash': phrase_set.content_hash, 'phrase_set': phrase_set, 'payloads': payloads, 'pages': {}}
+        with self._lock:
+            self._languages[language] = entry
+            self._languages.move_to_end(language)
+            while len(self._languages) > self.store.max_languages:
+                self._languages.popitem(last=False)
+        return entry
+    
+    def phrases(self, language, category=None):
+        """Encoded phrases of a language (one category or all), None for an unknown language"""
+        entry = self._language(language)
+        return entry['payloads'][category] if entry else None
+    
+    def page(self, language, category, page, per_page):
+        entry = self._language(language)
+        if entry is None:
+            return None
+        key = (category, page, per_page)
+        with self._lock:
+            cached = entry['pages'].get(key)
+        if cached is not None:
+            return cached
+        
+        phrase_set = entry['phrase_set']
+        items = phrase_set.by_category[category] if category else phrase_set.phrases
+        start = (page - 1) * per_page
+        payload = EncodedPayload({
+            'items': [dict(phrase_dict(phrase), category=phrase.category) for phrase in items[start:start + per_page]],
+            'category': category,
+            'page': page,
+            'per_page': per_page,
+            'total': len(items),
+            'pages': (len(items) + per_page - 1) // per_page
+        })
+        with self._lock:
+            if len(entry['pages']) >= MAX_CACHED_PAGES:
+                entry['pages'].clear()
+            entry['pages'][key] = payload
+        return payload
+
+phrasebook_payloads = PhrasebookPayloads()
+
+@app.route('/api/languages', methods=['GET'])
+def get_languages():
+    return jsonify([
+        {"code": code, "name": language_catalog.name(code)}
+        for code in phrasebook_store.languages()
+    ])
 
 @app.route('/api/categories', methods=['GET'])
 def get_categories():
-    return jsonify(categories)
+    return payload_response(phrasebook_payloads.get('categories'))
 
 @app.route('/api/phrases', methods=['GET'])
 def get_phrases():
-    return jsonify(phrases)
+    language = request.args.get('language', DEFAULT_LANGUAGE)
+    category = request.args.get('category') or None
+    if category and not phrasebook_store.has_category(category):
+        return jsonify({"error": f"Unknown category '{category}'"}), 404
+    
+    # Paginated listing: ?page=2&per_page=20 (optionally with ?category=food)
+    if 'page' in request.args or 'per_page' in request.args:
+        page = max(1, request.args.get('page', 1, type=int) or 1)
+        per_page = min(MAX_PAGE_SIZE, max(1, request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int) or DEFAULT_PAGE_SIZE))
+        payload = phrasebook_payloads.page(language, category, page, per_page)
+    else:
+        payload = phrasebook_payloads.phrases(language, category)
+    
+    if payload is None:
+        return jsonify({"error": f"No phrasebook for language '{language}'"}), 404
+    return payload_response(payload)
 
 @app.route('/api/practice-questions', methods=['GET'])
 def get_practice_questions():
-    return jsonify(practice_questions)
+    return payload_response(phrasebook_payloads.get('practice_questions'))
+
+def favorites_owner():
+    """User id from the request's token (header, then cookie), None for visitors who are not signed in"""
+    auth_header = request.headers.get('Authorization', '')
+    token = auth_header[7:] if auth_header.startswith('Bearer ') else request.cookies.get('token')
+    if not token:
+        return None
+    return verify_jwt(token, token_cache, JWT_SECRET_KEY, JWT_ALGORITHM)['user_id']
 
 @app.route('/api/favorites', methods=['GET', 'POST'])
 def handle_favorites():
+    try:
+        user_id = favorites_owner()
+    except jwt.ExpiredSignatureError:
+        return jsonify({"error": "Token has expired"}), 401
+    except (jwt.InvalidTokenError, KeyError):
+        return jsonify({"error": "Token is invalid"}), 401
+    
+    # Favorites are stored per account; visitors who are not signed in keep theirs in the page
+    if user_id is None:
+        if request.method == 'GET':
+            return jsonify([])
+        return jsonify({"error": "Sign in to save favorites"}), 401
+    
     if request.method == 'GET':
-        return jsonify(favorites)
+        return jsonify(favorites_store.get(user_id))
     
     if request.method == 'POST':
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         phrase_id = data.get('phraseId')
+        if not isinstance(phrase_id, int) or not phrasebook_store.has_phrase(phrase_id):
+            return jsonify({"error": f"Unknown phrase id {phrase_id!r}"}), 404
         
-        if phrase_id in favorites:
-            favorites.remove(phrase_id)
-        else:
-            favorites.append(phrase_id)
-            
-        return jsonify(favorites)
+        return jsonify(favorites_store.toggle(user_id, phrase_id))
 
-@app.route('/api/audio', methods=['POST'])
+@app.route('/api/favorites/stats', methods=['GET'])
+def favorites_stats():
+    return jsonify(favorites_store.stats())
+
+@app.route('/api/audio', methods=['GET', 'POST'])
 def generate_audio():
-    data = request.get_json()
+    # GET lets audio players revalidate and request byte ranges
+    data = request.args if request.method == 'GET' else request.get_json()
     text = data.get('text', '')
-    language = data.get('language', 'es')
+    language = data.get('language', DEFAULT_LANGUAGE)
     
     try:
-        # Language code mapping
-        lang_map = {
-            'es': 'es',  # Spanish
-            'fr': 'fr',  # French
-            'de': 'de',  # German
-            'ja': 'ja',  # Japanese
-            'zh': 'zh-CN',  # Chinese
-            'ar': 'ar',  # Arabic
-            'ru': 'ru',  # Russian
-            'en': 'en'   # English
-        }
+        lang_code = language_catalog.tts_code(language, 'es')
+        # Longer text is streamed sentence by sentence
+        if len(split_sentences(text)) > 1:
+            return streaming_response(stream_speech(text, lang_code), 'audio/mpeg', 'audio.mp3')
         
-        lang_code = lang_map.get(language, 'es')
-        tts = gTTS(text=text, lang=lang_code, slow=False)
+        # Phrases are a small fixed set, almost every request is a cache hit
+        audio_path, etag = tts_cache.get(text, lang_code)
         
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-            tts.save(tmp_file.name)
-            tmp_file.flush()
-            
-            return send_file(
-                tmp_file.name,
-                mimetype='audio/mpeg',
-                as_attachment=False,
-                download_name='audio.mp3'
-            )
+        return send_cached_file(
+            audio_path,
+            etag,
+            mimetype='audio/mpeg',
+            as_attachment=False,
+            download_name='audio.mp3'
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/download', methods=['POST'])
+@app.route('/api/download', methods=['GET', 'POST'])
 def download_phrases():
-    data = request.get_json()
-    language = data.get('language', 'es')
+    # GET (?language=es&categories=food,numbers) lets browsers revalidate with the ETag
+    if request.method == 'GET':
+        language = request.args.get('language', DEFAULT_LANGUAGE)
+        categories = [c for c in request.args.get('categories', '').split(',') if c] or None
+    else:
+        data = request.get_json()
+        language = data.get('language', DEFAULT_LANGUAGE)
+        # Optional subset: {"categories": ["food", "numbers"]}
+        categories = data.get('categories') or None
+    if categories is not None:
+        if not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+            return jsonify({"error": "categories must be a list of category ids"}), 400
+        unknown = [c for c in categories if not phrasebook_store.has_category(c)]
+        if unknown:
+            return jsonify({"error": f"Unknown categories: {', '.join(unknown)}"}), 404
     
     try:
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
+        # Rendered once per language, subset and phrase data version
+        cached = pdf_cache.get(language, categories)
+        if cached is None:
+            return jsonify({"error": f"No phrasebook for language '{language}'"}), 404
+        pdf_path, etag = cached
         
-        # Add title
-        title = Paragraph(f"Phrasebook - {language.upper()}", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
-        
-        # Add phrases by category
-        for category_id, phrase_list in phrases.items():
-            category_name = next((cat['name'] for cat in categories if cat['id'] == category_id), category_id)
-            category_header = Paragraph(category_name, styles['Heading2'])
-            story.append(category_header)
-            story.append(Spacer(1, 6))
-            
-            for phrase in phrase_list:
-                phrase_text = f"<b>{phrase['english']}</b>: {phrase['translation']} ({phrase['pronunciation']})"
-                story.append(Paragraph(phrase_text, styles['BodyText']))
-                story.append(Spacer(1, 3))
-            
-            story.append(Spacer(1, 12))
-        
-        doc.build(story)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
+        return send_cached_file(
+            pdf_path,
+            etag,
             mimetype='application/pdf',
             as_attachment=True,
             download_name=f'{language}_phrasebook.pdf'
@@ -341,6 +267,34 @@ def download_phrases():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/audio/stats', methods=['GET'])
+def audio_cache_stats():
+    return jsonify(tts_cache.stats())
+
+@app.route('/api/download/stats', methods=['GET'])
+def download_cache_stats():
+    return jsonify(pdf_cache.stats())
+
+def warm_audio_cache(language=DEFAULT_LANGUAGE, workers=8):
+    """Pre-render every phrase's translation into the TTS cache"""
+    phrase_set = phrasebook_store.get(language)
+    if phrase_set is None:
+        raise ValueError(f"No phrasebook for language '{language}'")
+    lang_code = language_catalog.tts_code(language, 'es')
+    texts = {phrase.translation for phrase in phrase_set.phrases}
+    
+    def render(text):
+        try:
+            tts_cache.get(text, lang_code)
+            return True
+        except Exception as e:
+            print(f"Could not render '{text}': {e}")
+            return False
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        rendered = sum(pool.map(render, sorted(texts)))
+    return rendered, len(texts)
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({
@@ -353,4 +307,14 @@ def index():
     return jsonify({"message": "Phrasebook API is running"})
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5002, host='0.0.0.0')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Phrasebook API")
+    parser.add_argument('command', nargs='?', choices=['serve', 'warm-tts'], default='serve')
+    parser.add_argument('--language', default=DEFAULT_LANGUAGE, help="language to pre-render (warm-tts)")
+    args = parser.parse_args()
+    
+    if args.command == 'warm-tts':
+        rendered, total = warm_audio_cache(args.language)
+        print(f"Rendered {rendered}/{total} phrases into {tts_cache.directory} ({tts_cache.stats()['bytes']} bytes)")
+    else:
+        pdf_cache.preload(DEFAULT_LANGUAGE)
+        app.run(debug=True, port=5002, host='0.0.0.0')
\ No newline at end of file
@@ -1,11 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
-import hashlib
 import os
-import json
+import hashlib
+import uuid
 from datetime import datetime, timedelta
 import jwt
 from functools import wraps
+from user_store import UserStore
+from token_cache import VerifiedTokenCache, verify_jwt
+from password_hasher import password_hasher, HasherBusy
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here-change-this-in-production'
@@ -18,51 +21,39 @@ CORS(app,
      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
 
 # JWT configuration
-app.config['JWT_SECRET_KEY'] = 'jwt-secret-key-change-in-production'
+app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
 app.config['JWT_ALGORITHM'] = 'HS256'
 
-# File to store user data
+# Legacy file that used to store user data (migrated into the user store on startup)
 DATA_FILE = "users.txt"
 
-def ensure_data_file():
-    """Create the data file if it doesn't exist"""
-    if not os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'w') as f:
-            f.write("")
+# Indexed user store (SQLite, unique email index, read-through cache)
+user_store = UserStore()
+user_store.migrate_from_file(DATA_FILE)
 
-def read_users():
-    """Read all users from the text file"""
-    ensure_data_file()
-    users = {}
-    try:
-        with open(DATA_FILE, 'r') as f:
-            for line in f:
-                if line.strip():
-                    user_data = json.loads(line.strip())
-                    users[user_data['email']] = user_data
-    except Exception as e:
-        print(f"Error reading users: {e}")
-    return users
-
-def write_user(user_data):
-    """Write a new user to the text file"""
-    ensure_data_file()
-    with open(DATA_FILE, 'a') as f:
-        f.write(json.dumps(user_data) + '\n')
+# Claims of already verified tokens, so authenticated requests skip the signature check
+token_cache = VerifiedTokenCache()
 
 def hash_password(password):
-    """Hash a password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash a password with salted scrypt on the bounded hashing pool"""
+    return password_hasher.hash(password)
 
-def generate_token(user_id, email):
-    """Generate a JWT token"""
+def generate_token(user_id, email, name=None):
+    """Generate a JWT token (profile fields are embedded so /user needs no lookup)"""
     payload = {
         'user_id': user_id,
         'email': email,
-        'exp': datetime.utcnow() + timedelta(hours=24)
+        'exp': datetime.utcnow() + timedelta(hours=24),
+        'jti': uuid.uuid4().hex  # every login gets its own token, so logout revokes only that one
     }
+    if name is not None:
+        payload['name'] = name
     return jwt.encode(payload, app.config['JWT_SECRET_KEY'], algorithm=app.config['JWT_ALGORITHM'])
 
+def verify_token(token):
+    """Decode a JWT, reusing the claims of tokens already verified and rejecting logged out ones"""
+    return verify_jwt(token, token_cache, app.config['JWT_SECRET_KEY'], app.config['JWT_ALGORITHM'])
+
 def token_required(f):
     """Decorator to verify JWT tokens"""
     @wraps(f)
@@ -85,11 +76,15 @@ def token_required(f):
             return jsonify({'success': False, 'message': 'Token is missing'}), 401
         
         try:
-            data = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=[app.config['JWT_ALGORITHM']])
+            data = verify_token(token)
             current_user = {
                 'id': data['user_id'],
                 'email': data['email']
             }
+            if 'name' in data:
+                current_user['name'] = data['name']
+            g.token = token
+            g.token_exp = data['exp']
         except jwt.ExpiredSignatureError:
             return jsonify({'success': False, 'message': 'Token has expired'}), 401
         except jwt.InvalidTokenError:
@@ -129,11 +124,13 @@ def register():
     if len(password) < 6:
         return jsonify({'success': False, 'message': 'Password must be at least 6 characters'}), 400
     
-    users = read_users()
-    if email in users:
+    if user_store.get_by_email(email):
         return jsonify({'success': False, 'message': 'Email already exists'}), 409
     
-    hashed_password = hash_password(password)
+    try:
+        hashed_password = hash_password(password)
+    except HasherBusy:
+        return jsonify({'success': False, 'message': 'Server busy, please try again'}), 503
     user_id = hashlib.sha256(email.encode()).hexdigest()[:12]
     user_data = {
         'id': user_id,
@@ -143,10 +140,12 @@ def register():
         'created_at': datetime.now().isoformat()
     }
     
-    write_user(user_data)
+    # The unique email index also catches concurrent registrations
+    if not user_store.create(user_data):
+        return jsonify({'success': False, 'message': 'Email already exists'}), 409
     
     # Generate token
-    token = generate_token(user_id, email)
+    token = generate_token(user_id, email, name)
     
     response = jsonify({
         'success': True, 
@@ -182,17 +181,28 @@ def login():
     if not email or not password:
         return jsonify({'success': False, 'message': 'Email and password required'}), 400
     
-    users = read_users()
-    if email not in users or users[email]['password'] != hash_password(password):
+    user = user_store.get_by_email(email)
+    if not user:
         return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
     
+    try:
+        valid, new_hash = password_hasher.verify_and_update(password, user['password'])
+    except HasherBusy:
+        return jsonify({'success': False, 'message': 'Server busy, please try again'}), 503
+    if not valid:
+        return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
+    
+    # Upgrade legacy SHA-256 (or outdated cost) hashes now that we know the password
+    if new_hash:
+        user_store.update(email, password=new_hash)
+    
     # Generate token
-    token = generate_token(users[email]['id'], email)
+    token = generate_token(user['id'], email, user['name'])
     
     user_info = {
-        'id': users[email]['id'],
-        'name': users[email]['name'],
-        'email': users[email]['email']
+        'id': user['id'],
+        'name': user['name'],
+        'email': user['email']
     }
     
     response = jsonify({
@@ -219,6 +229,9 @@ def logout(current_user):
     if request.method == 'OPTIONS':
         return jsonify({}), 200
         
+    # The token token_required accepted (header first, then cookie) stays rejected until it expires
+    token_cache.revoke(g.token, g.token_exp)
+        
     response = jsonify({'success': True, 'message': 'Logged out successfully'})
     response.delete_cookie('token')
     return response, 200
@@ -229,12 +242,13 @@ def get_user(current_user):
     if request.method == 'OPTIONS':
         return jsonify({}), 200
         
-    # Get user data from database
-    users = read_users()
-    if current_user['email'] not in users:
-        return jsonify({'success': False, 'message': 'User not found'}), 404
-        
-    user_data = users[current_user['email']]
+    # Tokens carry the profile fields, older tokens fall back to the cached user store
+    if 'name' in current_user:
+        user_data = current_user
+    else:
+        user_data = user_store.get_by_email(current_user['email'])
+        if not user_data:
+            return jsonify({'success': False, 'message': 'User not found'}), 404
     
     return jsonify({
         'success': True, 
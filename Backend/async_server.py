@@ -0,0 +1,553 @@
+"""
+Async (ASGI) serving mode for text_translator.py, Conversation.py and Audio.py.
+
+Same routes and JSON contracts, with non-blocking upstream calls. Run with
+    python async_server.py text|conversation|audio [--port N]
+or  uvicorn --factory async_server:create_text_app --port 5001
+"""
+import os
+import asyncio
+import argparse
+import logging
+import traceback
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, JSONResponse, FileResponse, StreamingResponse
+from starlette.routing import Route
+
+import text_translator
+import Conversation
+import Audio
+from text_translator import (
+    LANGUAGES, MAX_TEXT_LENGTH, MAX_BATCH_ITEMS, mymemory_url,
+    parse_mymemory_response, simple_translate, provider_router
+)
+from translator_registry import GOOGLE_TRANSLATE_URL, GOOGLE_HEADERS, google_params, parse_google_response
+from translation_cache import translation_cache, make_key
+from language_catalog import language_catalog
+from language_detector import language_detector, resolve_source_lang
+from singleflight import translation_flight
+from http_client import CONNECT_TIMEOUT, READ_TIMEOUT, http_client
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Connection limits for the shared async upstream client
+ASYNC_MAX_CONNECTIONS = int(os.environ.get("ASYNC_MAX_CONNECTIONS", "512"))
+ASYNC_MAX_KEEPALIVE = int(os.environ.get("ASYNC_MAX_KEEPALIVE", "128"))
+
+CORS_ORIGINS = ["http://localhost:3000", "http://localhost:5173", "http://127.0.0.1:5173"]
+
+# Shared async client, created on application startup
+async_client = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global async_client
+    async_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS,
+                            max_keepalive_connections=ASYNC_MAX_KEEPALIVE)
+    )
+    try:
+        yield
+    finally:
+        await async_client.aclose()
+        async_client = None
+
+
+def make_app(routes):
+    middleware = [
+        Middleware(CORSMiddleware, allow_origins=CORS_ORIGINS, allow_methods=["*"], allow_headers=["*"])
+    ]
+    return Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
+
+
+# Non-blocking upstream providers
+
+async def async_translate_with_google(text, target_lang, source_lang='auto'):
+    response = await async_client.get(
+        GOOGLE_TRANSLATE_URL,
+        params=google_params(text, target_lang, source_lang),
+        headers=GOOGLE_HEADERS
+    )
+    response.raise_for_status()
+    return parse_google_response(response.json(), source_lang)
+
+
+async def async_translate_with_mymemory(text, target_lang, source_lang='auto'):
+    if source_lang == 'auto':
+        # MyMemory needs an explicit source, detect it locally (English if unsure)
+        source_lang = resolve_source_lang(text)
+        if source_lang == 'auto':
+            source_lang = 'en'
+    response = await async_client.get(mymemory_url(text, target_lang, source_lang))
+    response.raise_for_status()
+    return parse_mymemory_response(response.json(), source_lang)
+
+
+# Async counterpart for each sync provider, looked up by name
+ASYNC_PROVIDERS = {
+    'translate_with_google_translate': async_translate_with_google,
+    'translate_with_mymemory': async_translate_with_mymemory,
+}
+
+
+async def async_translate_text_api(text, target_lang, source_lang='auto'):
+    """Async version of text_translator.translate_text_api (same routing and hedging)"""
+    cached = await translation_cache.get_async(text, target_lang, source_lang)
+    if cached:
+        return cached
+
+    # Confident local detection replaces 'auto' so routing works per language pair
+    cache_source = source_lang
+    source_lang = resolve_source_lang(text, source_lang)
+
+    result = await provider_router.translate_async(text, target_lang, source_lang, ASYNC_PROVIDERS)
+    if result:
+        await translation_cache.set_async(text, target_lang, cache_source, result)
+        return result
+
+    # All APIs failed, use simple fallback (never cached)
+    return simple_translate(text, target_lang, cache_source)
+
+
+async def async_translate_plain(text, target_lang, source_lang='auto'):
+    """Translate and return only the text, None on failure (Conversation/Audio contract)"""
+    cached = await translation_cache.get_async(text, target_lang, source_lang)
+    if cached:
+        return cached['text']
+    try:
+        result = await translation_flight.do_async(
+            make_key(text, target_lang, source_lang), async_translate_with_google, text, target_lang, source_lang
+        )
+    except Exception as e:
+        logger.error(f"Translation error: {e}")
+        return None
+    if result['text']:
+        await translation_cache.set_async(text, target_lang, source_lang, result)
+    return result['text']
+
+
+def error(message, status):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+# text_translator.py routes
+
+async def text_translate(request):
+    try:
+        data = await request.json()
+        text = data.get('text', '').strip()
+        target_lang = data.get('target_lang', 'en')
+        source_lang = data.get('source_lang', 'auto')
+
+        if not text:
+            return error("No text provided", 400)
+
+        if len(text) > MAX_TEXT_LENGTH:
+            return error(f"Text too long. Maximum {MAX_TEXT_LENGTH} characters allowed.", 400)
+
+        # Concurrent identical requests share a single upstream call
+        translation = await translation_flight.do_async(
+            make_key(text, target_lang, source_lang), async_translate_text_api, text, target_lang, source_lang
+        )
+        return JSONResponse({
+            "translated_text": translation['text'],
+            "source_lang": translation['src']
+        })
+    except Exception as e:
+        logger.error(f"Translation error: {e}")
+        return error("Translation service temporarily unavailable. Please try again.", 500)
+
+
+async def text_translate_batch(request):
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        texts = data.get('texts')
+        target_lang = data.get('target_lang', 'en')
+        source_lang = data.get('source_lang', 'auto')
+
+        if not isinstance(texts, list) or not texts:
+            return error("Field 'texts' must be a non-empty list", 400)
+
+        if len(texts) > MAX_BATCH_ITEMS:
+            return error(f"Too many texts. Maximum {MAX_BATCH_ITEMS} per batch.", 400)
+
+        # Batches pack many texts into a handful of upstream calls, run them on a worker thread
+        result = await asyncio.to_thread(text_translator.batch_translate, texts, target_lang, source_lang)
+        return JSONResponse(result)
+    except Exception as e:
+        logger.error(f"Batch translation error: {e}")
+        return error("Translation service temporarily unavailable. Please try again.", 500)
+
+
+def catalog_response(request, kind, max_age=3600):
+    """Pre-encoded language catalog payload with ETag/Cache-Control and 304 support"""
+    body, etag = language_catalog.snapshot(kind)
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': f"public, max-age={max_age}"}
+    if_none_match = request.headers.get('if-none-match', '')
+    if f'"{etag}"' in if_none_match or if_none_match.strip() == '*':
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
+
+
+def cached_file_response(request, path, etag, media_type, filename=None, max_age=86400):
+    """Content-addressed file with strong ETag and 304 support (FileResponse handles Range)"""
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': f"public, max-age={max_age}"}
+    if_none_match = request.headers.get('if-none-match', '')
+    if f'"{etag}"' in if_none_match or if_none_match.strip() == '*':
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
+
+
+async def text_languages(request):
+    try:
+        return catalog_response(request, 'supported')
+    except Exception as e:
+        logger.error(f"Error getting languages: {e}")
+        return error(str(e), 500)
+
+
+async def text_cache_stats(request):
+    return JSONResponse(await asyncio.to_thread(translation_cache.stats))
+
+
+async def text_providers_stats(request):
+    return JSONResponse(provider_router.stats())
+
+
+async def text_singleflight_stats(request):
+    return JSONResponse(translation_flight.stats())
+
+
+async def text_http_stats(request):
+    return JSONResponse(http_client.stats())
+
+
+async def text_health(request):
+    return JSONResponse({"status": "OK", "message": "Translation server is running"})
+
+
+def create_text_app():
+    return make_app([
+        Route('/translate', text_translate, methods=['POST']),
+        Route('/translate/batch', text_translate_batch, methods=['POST']),
+        Route('/languages', text_languages, methods=['GET']),
+        Route('/cache/stats', text_cache_stats, methods=['GET']),
+        Route('/providers/stats', text_providers_stats, methods=['GET']),
+        Route('/singleflight/stats', text_singleflight_stats, methods=['GET']),
+        Route('/http/stats', text_http_stats, methods=['GET']),
+        Route('/health', text_health, methods=['GET']),
+    ])
+
+
+# Conversation.py routes
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def conversation_translate(request):
+    try:
+        data = await read_json(request)
+        if not data:
+            return JSONResponse({'error': 'No data provided'}, status_code=400)
+
+        text = data.get('text', '')
+        source_lang = data.get('source_lang', 'auto')
+        target_lang = data.get('target_lang', 'en')
+
+        if not text:
+            return JSONResponse({'error': 'No text provided'}, status_code=400)
+
+        translated_text = await async_translate_plain(text, target_lang, source_lang)
+
+        if translated_text is None:
+            return JSONResponse({'error': 'Translation failed. Please check your input and try again.'},
+                                status_code=500)
+
+        return JSONResponse({
+            'original_text': text,
+            'translated_text': translated_text,
+            'source_lang': source_lang,
+            'target_lang': target_lang,
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"Error in translate endpoint: {e}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+
+async def conversation_save(request):
+    try:
+        data = await read_json(request)
+        if not data:
+            return JSONResponse({'error': 'No data provided'}, status_code=400)
+
+        conversation = data.get('conversation', [])
+        source_lang = data.get('source_lang', 'en')
+        target_lang = data.get('target_lang', 'es')
+
+        if not conversation:
+            return JSONResponse({'error': 'No conversation data provided'}, status_code=400)
+
+        filename = await asyncio.to_thread(
+            Conversation.save_conversation_file, conversation, source_lang, target_lang
+        )
+        return JSONResponse({
+            'message': 'Conversation saved successfully',
+            'filename': filename
+        })
+    except Exception as e:
+        logger.error(f"Error in save-conversation endpoint: {e}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+
+async def conversation_languages(request):
+    try:
+        # First call may load the upstream list, later calls are served from memory
+        await asyncio.to_thread(language_catalog.google_languages)
+        return catalog_response(request, 'google')
+    except Exception as e:
+        logger.error(f"Error getting languages: {e}")
+        return JSONResponse({'error': 'Failed to retrieve languages'}, status_code=500)
+
+
+async def conversation_detect(request):
+    try:
+        data = await read_json(request)
+        if not data:
+            return JSONResponse({'error': 'No data provided'}, status_code=400)
+
+        texts = data.get('texts')
+        if isinstance(texts, list):
+            results = language_detector.detect_batch([t if isinstance(t, str) else '' for t in texts])
+            return JSONResponse({'results': [
+                {'detected_language': r['language'], 'confidence': r['confidence']} for r in results
+            ]})
+
+        text = data.get('text', '')
+        if not text:
+            return JSONResponse({'error': 'No text provided'}, status_code=400)
+
+        detected = language_detector.detect(text)
+        return JSONResponse({
+            'text': text,
+            'detected_language': detected['language'],
+            'confidence': detected['confidence']
+        })
+    except Exception as e:
+        logger.error(f"Error in detect-language endpoint: {e}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+
+async def conversation_health(request):
+    return JSONResponse({"status": "OK", "message": "Conversation server is running"})
+
+
+def create_conversation_app():
+    return make_app([
+        Route('/translate', conversation_translate, methods=['POST']),
+        Route('/save-conversation', conversation_save, methods=['POST']),
+        Route('/get-languages', conversation_languages, methods=['GET']),
+        Route('/detect-language', conversation_detect, methods=['POST']),
+        Route('/health', conversation_health, methods=['GET']),
+    ])
+
+
+# Audio.py routes
+
+async def async_translate_transcript(text, target_lang, source_lang='auto'):
+    """Async version of Audio.translate_text (error strings are passed through)"""
+    if not text.strip() or text.startswith("Could not understand") or text.startswith("Error"):
+        return text
+    translated = await async_translate_plain(text, target_lang, source_lang)
+    if translated is None:
+        return "Translation error: upstream translation failed"
+    return translated
+
+
+async def audio_translate(request):
+    try:
+        form = await request.form()
+        if "file" not in form:
+            return error("No file uploaded (field name must be 'file').", 400)
+
+        audio_file = form["file"]
+        source_lang = form.get("source_lang", "auto")
+        target_lang = form.get("target_lang", "en")
+        backend = form.get("backend") or None
+        if backend and backend not in Audio.RECOGNIZERS:
+            return error(f"Unknown speech backend '{backend}'", 400)
+
+        _, file_extension = os.path.splitext(audio_file.filename or "")
+        if not file_extension:
+            file_extension = ".webm"  # Default assumption
+
+        audio_data = await audio_file.read()
+
+        # ffmpeg and speech recognition block, keep them off the event loop
+        original_text, segments = await asyncio.to_thread(
+            Audio.transcribe_upload, audio_data, file_extension, source_lang, backend
+        )
+        translated_text = await async_translate_transcript(original_text, target_lang, source_lang)
+
+        return JSONResponse({
+            "transcript": original_text,
+            "translated_text": translated_text,
+            "segments": segments
+        })
+    except Audio.TranscoderBusy as e:
+        return error(f"Server busy: {e}", 503)
+    except Exception as e:
+        traceback.print_exc()
+        return error(f"Server exception: {str(e)}", 500)
+
+
+async def audio_translate_stream(request):
+    form = await request.form()
+    if "file" not in form:
+        return error("No file uploaded (field name must be 'file').", 400)
+    audio_file = form["file"]
+    source_lang = form.get("source_lang", "auto")
+    target_lang = form.get("target_lang", "en")
+    backend = form.get("backend") or None
+    if backend and backend not in Audio.RECOGNIZERS:
+        return error(f"Unknown speech backend '{backend}'", 400)
+    _, file_extension = os.path.splitext(audio_file.filename or "")
+    audio_data = await audio_file.read()
+
+    # Starlette iterates the blocking generator in its thread pool
+    events = Audio.stream_translation(audio_data, file_extension or ".webm", source_lang, target_lang, backend)
+    return StreamingResponse(
+        (Audio.sse_event(event, data) for event, data in events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def audio_text_to_speech(request):
+    try:
+        if request.method == "GET":
+            data = request.query_params
+        else:
+            data = await read_json(request) or {}
+        text = data.get("text", "").strip()
+        lang = data.get("lang", "en")
+
+        if not text:
+            return error("Text is required", 400)
+
+        # Several sentences are streamed as soon as the first one is synthesized
+        if len(Audio.split_sentences(text)) > 1:
+            try:
+                chunks = await asyncio.to_thread(Audio.stream_speech, text, lang)
+            except Exception as e:
+                logger.warning(f"Error in text-to-speech: {e}")
+                return error("Failed to generate speech", 500)
+            return StreamingResponse(chunks, media_type="audio/mpeg", headers={
+                "Cache-Control": "no-cache",
+                "Content-Disposition": 'attachment; filename="translation.mp3"'
+            })
+
+        audio = await asyncio.to_thread(Audio.text_to_speech, text, lang)
+        if not audio:
+            return error("Failed to generate speech", 500)
+
+        audio_file_path, etag = audio
+        return cached_file_response(request, audio_file_path, etag, "audio/mpeg", "translation.mp3")
+    except Exception as e:
+        traceback.print_exc()
+        return error(f"Server exception: {str(e)}", 500)
+
+
+async def audio_text_translate(request):
+    try:
+        data = await read_json(request) or {}
+        text = (data.get("text") or "").strip()
+        if not text:
+            return error("Field 'text' required.", 400)
+
+        source_lang = data.get("source_lang", "auto")
+        target_lang = data.get("target_lang", "en")
+
+        translated = await async_translate_transcript(text, target_lang, source_lang)
+        return JSONResponse({"translated_text": translated})
+    except Exception as e:
+        traceback.print_exc()
+        return error(f"Server exception: {str(e)}", 500)
+
+
+async def audio_transcoder_stats(request):
+    return JSONResponse(Audio.transcoder.stats())
+
+
+async def audio_recognizer_stats(request):
+    return JSONResponse(Audio.get_recognizer().stats())
+
+
+async def audio_health(request):
+    return JSONResponse({
+        "status": "OK",
+        "free_apis_available": True,
+        "mode": "free_apis",
+        "ffmpeg_available": Audio.transcoder.ffmpeg_path is not None,
+        "ffmpeg_path": Audio.transcoder.ffmpeg_path or "Not found"
+    })
+
+
+async def audio_index(request):
+    return JSONResponse({
+        "message": "Voice Translation API is running",
+        "mode": "free_apis",
+        "ffmpeg_available": Audio.transcoder.ffmpeg_path is not None,
+        "ffmpeg_path": Audio.transcoder.ffmpeg_path or "Not found"
+    })
+
+
+def create_audio_app():
+    return make_app([
+        Route('/translate', audio_translate, methods=['POST']),
+        Route('/translate/stream', audio_translate_stream, methods=['POST']),
+        Route('/text-to-speech', audio_text_to_speech, methods=['GET', 'POST']),
+        Route('/text-translate', audio_text_translate, methods=['POST']),
+        Route('/transcoder/stats', audio_transcoder_stats, methods=['GET']),
+        Route('/recognizer/stats', audio_recognizer_stats, methods=['GET']),
+        Route('/health', audio_health, methods=['GET']),
+        Route('/', audio_index, methods=['GET']),
+    ])
+
+
+APP_FACTORIES = {
+    'text': (create_text_app, 5001),
+    'conversation': (create_conversation_app, 5000),
+    'audio': (create_audio_app, 5000),
+}
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a translation service in async (ASGI) mode")
+    parser.add_argument('service', choices=sorted(APP_FACTORIES))
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int)
+    args = parser.parse_args()
+
+    factory, default_port = APP_FACTORIES[args.service]
+    print(f"Starting {args.service} service in async mode...")
+    print("Supported languages loaded:", len(LANGUAGES))
+    uvicorn.run(factory(), host=args.host, port=args.port or default_port)
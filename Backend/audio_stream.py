@@ -0,0 +1,117 @@
+import io
+import os
+import wave
+import tempfile
+import threading
+import subprocess
+
+# PCM format handed to speech recognition
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit
+CHANNELS = 1
+
+# Length of the fixed windows the streaming endpoint recognises one at a time
+CHUNK_SECONDS = float(os.environ.get("AUDIO_CHUNK_SECONDS", "5"))
+
+# Containers whose index may sit at the end of the file and cannot be probed from a pipe
+SEEKABLE_FORMATS = {'.mp4', '.m4a', '.mov', '.3gp'}
+
+
+class TranscodeError(Exception):
+    """ffmpeg could not decode the upload"""
+
+
+def window_bytes(seconds=CHUNK_SECONDS):
+    """Bytes of PCM in a window of the given length"""
+    return int(seconds * SAMPLE_RATE) * SAMPLE_WIDTH * CHANNELS
+
+
+def pcm_seconds(size):
+    return size / (SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS)
+
+
+def ffmpeg_pcm_command(ffmpeg_path, input_path='pipe:0'):
+    return [
+        ffmpeg_path,
+        '-loglevel', 'error',
+        '-i', input_path,
+        '-f', 's16le',
+        '-acodec', 'pcm_s16le',
+        '-ac', str(CHANNELS),
+        '-ar', str(SAMPLE_RATE),
+        'pipe:1'
+    ]
+
+
+def _feed(pipe, data):
+    try:
+        pipe.write(data)
+    except (BrokenPipeError, OSError):
+        pass  # ffmpeg exited early, its stderr explains why
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+
+def stream_pcm(audio_data, ffmpeg_path, input_extension='.webm', chunk_bytes=None, process=None):
+    """
+    Decode an upload with ffmpeg through stdin/stdout pipes and yield raw
+    16 kHz mono s16le PCM in windows of chunk_bytes as soon as each one is
+    decoded (the last window may be shorter). An already started ffmpeg
+    process waiting on stdin may be passed in. Raises TranscodeError if
+    ffmpeg fails.
+    """
+    chunk_bytes = chunk_bytes or window_bytes()
+    input_path = None
+    if process is None and input_extension.lower() in SEEKABLE_FORMATS:
+        # These need random access to the input; everything else stays in memory
+        with tempfile.NamedTemporaryFile(delete=False, suffix=input_extension) as input_file:
+            input_file.write(audio_data)
+            input_path = input_file.name
+
+    if process is None:
+        process = subprocess.Popen(
+            ffmpeg_pcm_command(ffmpeg_path, input_path or 'pipe:0'),
+            stdin=subprocess.DEVNULL if input_path else subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+    errors = []
+    threads = [threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)]
+    if not input_path:
+        threads.append(threading.Thread(target=_feed, args=(process.stdin, audio_data), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            chunk = process.stdout.read(chunk_bytes)
+            if not chunk:
+                break
+            yield chunk
+        process.wait()
+        for thread in threads:
+            thread.join()
+        if process.returncode != 0:
+            message = b"".join(errors).decode('utf-8', 'replace').strip()
+            raise TranscodeError(message or f"ffmpeg exited with {process.returncode}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        if input_path:
+            os.unlink(input_path)
+
+
+def pcm_to_wav(pcm):
+    """Wrap raw PCM in a WAV header without touching disk"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(CHANNELS)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
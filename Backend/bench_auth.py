@@ -0,0 +1,58 @@
+"""
+Benchmark per-request auth overhead: JWT decode on every request versus
+the verified-token cache, and a full authenticated /user request.
+
+    python bench_auth.py --requests 20000
+"""
+import os
+import time
+import argparse
+import tempfile
+
+
+def bench(label, fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    per_call = (time.perf_counter() - start) / count
+    print(f"{label:<44} {per_call * 1e6:>9.2f} us/request")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auth overhead per request")
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        import jwt
+        import app as auth_app
+
+        config = auth_app.app.config
+        token = auth_app.generate_token('bench0000001', 'bench@example.com', 'bench')
+        legacy_token = auth_app.generate_token('bench0000001', 'bench@example.com')
+        auth_app.user_store.create({
+            'id': 'bench0000001', 'name': 'bench', 'email': 'bench@example.com',
+            'password': auth_app.hash_password('benchmark'), 'created_at': '2025-01-01T00:00:00'
+        })
+
+        print(f"{args.requests} requests\n")
+        decode = bench("jwt.decode every request",
+                       lambda: jwt.decode(token, config['JWT_SECRET_KEY'], algorithms=[config['JWT_ALGORITHM']]),
+                       args.requests)
+        cached = bench("verify_token (verified-token cache hit)",
+                       lambda: auth_app.verify_token(token), args.requests)
+        print(f"  -> {decode / cached:.1f}x cheaper token verification\n")
+
+        client = auth_app.app.test_client()
+        full_requests = max(1, args.requests // 10)
+        bench("GET /user, profile embedded in token",
+              lambda: client.get('/user', headers={'Authorization': f"Bearer {token}"}), full_requests)
+        bench("GET /user, legacy token (cached user store)",
+              lambda: client.get('/user', headers={'Authorization': f"Bearer {legacy_token}"}), full_requests)
+        print(f"\ntoken cache: {auth_app.token_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmark password verification at each scrypt work factor to size
+PASSWORD_HASH_COST: logins/sec on one core and through the shared pool.
+
+    python bench_password_hash.py --costs 12 13 14 15 --logins 40
+"""
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from password_hasher import PasswordHasher, PASSWORD_HASH_WORKERS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password hashing throughput per work factor")
+    parser.add_argument('--costs', type=int, nargs='+', default=[12, 13, 14, 15, 16])
+    parser.add_argument('--logins', type=int, default=40, help="verifications per work factor")
+    parser.add_argument('--workers', type=int, default=PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cpus, pool of {args.workers} workers, {args.logins} logins per cost\n")
+    print(f"{'cost (log2 N)':<14} {'memory':>8} {'ms/login':>10} {'logins/s/core':>14} {'logins/s pool':>14}")
+    for cost in args.costs:
+        hasher = PasswordHasher(cost=cost, workers=args.workers, queue_size=args.logins)
+        stored = hasher.hash("correct horse battery staple")
+
+        start = time.perf_counter()
+        for _ in range(args.logins):
+            hasher._verify("correct horse battery staple", stored)
+        per_login = (time.perf_counter() - start) / args.logins
+
+        with ThreadPoolExecutor(max_workers=args.workers) as clients:
+            start = time.perf_counter()
+            list(clients.map(lambda _: hasher.verify("correct horse battery staple", stored), range(args.logins)))
+            pool_rate = args.logins / (time.perf_counter() - start)
+
+        memory_mb = 128 * hasher.block_size * (1 << cost) / (1 << 20)
+        print(f"{cost:<14} {memory_mb:>6.0f}MB {per_login * 1000:>10.1f} {1 / per_login:>14.1f} {pool_rate:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
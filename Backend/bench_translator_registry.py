@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: per-call deep_translator.GoogleTranslator construction
+versus the shared translator registry, against a local stub upstream.
+
+    python bench_translator_registry.py --calls 2000
+"""
+import os
+import time
+import argparse
+
+from loadtest import free_port, start_stub_upstream
+
+
+def bench(label, fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<48} {elapsed / calls * 1e6:>10.1f} us/call")
+    return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Translator construction/reuse micro-benchmark")
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--upstream-delay', type=float, default=0.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    start_stub_upstream(port, args.upstream_delay)
+    stub_url = f"http://127.0.0.1:{port}/translate_a/single"
+    os.environ['GOOGLE_TRANSLATE_URL'] = stub_url
+
+    import requests
+    from deep_translator import GoogleTranslator
+    from translator_registry import get_translator, google_params, GOOGLE_HEADERS
+
+    print(f"{args.calls} calls, stub upstream at {stub_url}\n")
+
+    print("Construction only (no network):")
+    construct = bench("GoogleTranslator(source, target) per call",
+                      lambda i: GoogleTranslator(source='en', target='es'), args.calls)
+    reuse = bench("get_translator(source, target) registry lookup",
+                  lambda i: get_translator('en', 'es'), args.calls)
+    print(f"  -> construction overhead saved: {(construct - reuse) * 1e6:.1f} us/call\n")
+
+    print("End to end against the stub:")
+
+    def fresh(i):
+        # What the services did before: a new translator and a new connection per call
+        GoogleTranslator(source='en', target='es')
+        requests.get(stub_url, params=google_params(f"hello {i}", 'es', 'en'),
+                     headers=GOOGLE_HEADERS, timeout=10).json()
+
+    per_call = bench("new GoogleTranslator + new connection per call", fresh, args.calls)
+    pooled = bench("registry client + pooled keep-alive session",
+                   lambda i: get_translator('en', 'es').translate(f"hello {i}"), args.calls)
+    print(f"  -> speedup: {per_call / pooled:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
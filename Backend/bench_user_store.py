@@ -0,0 +1,104 @@
+"""
+Benchmark login lookups: legacy users.txt full scan versus the indexed
+user store (cold SQLite lookup and warm read-through cache).
+
+    python bench_user_store.py --sizes 10000 100000 1000000
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import sqlite3
+import argparse
+import tempfile
+
+from user_store import UserStore
+
+PASSWORD_HASH = hashlib.sha256(b"123456").hexdigest()
+
+
+def legacy_read_users(path):
+    """The old app.read_users: parse the whole JSON-lines file"""
+    users = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                user_data = json.loads(line.strip())
+                users[user_data['email']] = user_data
+    return users
+
+
+def make_user(i):
+    email = f"user{i}@example.com"
+    return {
+        'id': hashlib.sha256(email.encode()).hexdigest()[:12],
+        'name': f"user{i}",
+        'email': email,
+        'password': PASSWORD_HASH,
+        'created_at': "2025-01-01T00:00:00",
+    }
+
+
+def populate(directory, size, with_legacy):
+    db_path = os.path.join(directory, f"users_{size}.db")
+    store = UserStore(db_path=db_path, cache_size=size)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO users (id, name, email, password, created_at) VALUES (?, ?, ?, ?, ?)",
+        ((u['id'], u['name'], u['email'], u['password'], u['created_at']) for u in map(make_user, range(size)))
+    )
+    conn.commit()
+    conn.close()
+
+    legacy_path = None
+    if with_legacy:
+        legacy_path = os.path.join(directory, f"users_{size}.txt")
+        with open(legacy_path, 'w') as f:
+            for i in range(size):
+                f.write(json.dumps(make_user(i)) + '\n')
+    return store, legacy_path
+
+
+def login(lookup, email):
+    user = lookup(email)
+    return user is not None and user['password'] == PASSWORD_HASH
+
+
+def time_logins(lookup, emails):
+    start = time.perf_counter()
+    for email in emails:
+        assert login(lookup, email)
+    return (time.perf_counter() - start) / len(emails)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login latency: users.txt scan vs indexed user store")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--logins', type=int, default=2000)
+    parser.add_argument('--legacy-max', type=int, default=100000,
+                        help="largest size to run the legacy full-file scan for")
+    args = parser.parse_args()
+
+    print(f"{'users':>10} {'legacy scan':>14} {'sqlite (cold)':>14} {'cached':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            with_legacy = size <= args.legacy_max
+            store, legacy_path = populate(directory, size, with_legacy)
+            emails = [f"user{random.randrange(size)}@example.com" for _ in range(args.logins)]
+
+            legacy = "skipped"
+            if legacy_path:
+                legacy_logins = emails[:max(1, min(20, args.logins))]
+                per_login = time_logins(lambda e: legacy_read_users(legacy_path).get(e), legacy_logins)
+                legacy = f"{per_login * 1000:.2f} ms"
+
+            cold = time_logins(lambda e: (store.invalidate(e), store.get_by_email(e))[1], emails)
+            store.get_by_email(emails[0])
+            warm = time_logins(store.get_by_email, emails)
+
+            print(f"{size:>10} {legacy:>14} {cold * 1e6:>11.1f} us {warm * 1e6:>9.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+import os
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# SQLite database holding every user's favorite phrases
+FAVORITES_DB_FILE = os.environ.get("FAVORITES_DB_FILE", "favorites.db")
+# Users whose favorites are kept in memory
+FAVORITES_CACHE_USERS = int(os.environ.get("FAVORITES_CACHE_USERS", "10000"))
+# Buffered toggles are written at least this often (ms), or as soon as this many are pending
+FAVORITES_FLUSH_MS = int(os.environ.get("FAVORITES_FLUSH_MS", "200"))
+FAVORITES_FLUSH_BATCH = int(os.environ.get("FAVORITES_FLUSH_BATCH", "500"))
+
+
+class _UserFavorites:
+    """One user's favorites in insertion order, and the stored version they reflect"""
+
+    __slots__ = ('phrases', 'version')
+
+    def __init__(self, phrases, version):
+        self.phrases = phrases  # phrase_id -> added_at
+        self.version = version
+
+
+class FavoritesStore:
+    """
+    Per-user favorite phrases with set semantics, stored in SQLite (WAL).
+
+    Reads and toggles are served from memory; changes are buffered and
+    written behind in batches by a flusher thread, one transaction per
+    flush. Every flush bumps a per-user version row, so a worker process
+    notices another process's writes on its next access for that user and
+    reloads, re-applying its own unflushed changes on top. Processes agree
+    within one flush interval.
+    """
+
+    def __init__(self, db_path=FAVORITES_DB_FILE, cache_users=FAVORITES_CACHE_USERS,
+                 flush_ms=FAVORITES_FLUSH_MS, flush_batch=FAVORITES_FLUSH_BATCH):
+        self.db_path = db_path
+        self.cache_users = cache_users
+        self.flush_interval = flush_ms / 1000
+        self.flush_batch = flush_batch
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._users = OrderedDict()  # user_id -> _UserFavorites, least recently used first
+        self._pending = {}  # user_id -> {phrase_id: added_at, or None when removed}
+        self._pending_count = 0
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._counters = {'toggles': 0, 'loads': 0, 'reloads': 0, 'flushes': 0, 'rows_written': 0, 'errors': 0}
+        self._init_schema()
+        self._flusher = threading.Thread(target=self._run, name="favorites-flush", daemon=True)
+        self._flusher.start()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS favorites ("
+            " user_id TEXT NOT NULL,"
+            " phrase_id INTEGER NOT NULL,"
+            " added_at REAL NOT NULL,"
+            " PRIMARY KEY (user_id, phrase_id)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS favorite_versions ("
+            " user_id TEXT PRIMARY KEY,"
+            " version INTEGER NOT NULL)"
+        )
+
+    def _stored_version(self, user_id):
+        row = self._connection().execute(
+            "SELECT version FROM favorite_versions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _load(self, user_id):
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            version = self._stored_version(user_id)
+            rows = conn.execute(
+                "SELECT phrase_id, added_at FROM favorites WHERE user_id = ? ORDER BY added_at, phrase_id",
+                (user_id,)
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return dict(rows), version
+
+    def _user(self, user_id):
+        """Up-to-date favorites of a user; call with no locks held"""
+        version = self._stored_version(user_id)
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry.version == version:
+                self._users.move_to_end(user_id)
+                return entry
+
+        # No flush of ours may commit between reading the rows and overlaying what is still
+        # buffered, or the entry would miss the rows just written and carry the old version
+        with self._flush_lock:
+            phrases, version = self._load(user_id)
+            with self._lock:
+                entry = self._users.get(user_id)
+                if entry is not None and entry.version == version:
+                    # Another thread loaded it meanwhile and may already have toggled on it
+                    self._users.move_to_end(user_id)
+                    return entry
+                self._counters['reloads' if user_id in self._users else 'loads'] += 1
+                # Changes of ours that are not stored yet go on top of what is
+                for phrase_id, added_at in self._pending.get(user_id, {}).items():
+                    if added_at is None:
+                        phrases.pop(phrase_id, None)
+                    else:
+                        phrases[phrase_id] = added_at
+                entry = self._users[user_id] = _UserFavorites(phrases, version)
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.cache_users:
+                    self._users.popitem(last=False)
+        return entry
+
+    def get(self, user_id):
+        """A user's favorite phrase ids, oldest first"""
+        entry = self._user(user_id)
+        with self._lock:
+            return list(entry.phrases)
+
+    def _record(self, user_id, phrase_id, added_at):
+        self._pending.setdefault(user_id, {})[phrase_id] = added_at
+        self._pending_count += 1
+        self._counters['toggles'] += 1
+        if self._pending_count >= self.flush_batch:
+            self._wakeup.set()
+
+    def toggle(self, user_id, phrase_id):
+        """Add the phrase if absent, remove it if present; returns the updated list"""
+        entry = self._user(user_id)
+        with self._lock:
+            if phrase_id in entry.phrases:
+                del entry.phrases[phrase_id]
+                self._record(user_id, phrase_id, None)
+            else:
+                entry.phrases[phrase_id] = added_at = time.time()
+                self._record(user_id, phrase_id, added_at)
+            return list(entry.phrases)
+
+    def flush(self):
+        """Write buffered changes in one transaction"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = {}
+                self._pending_count = 0
+
+            upserts = [(user_id, phrase_id, added_at) for user_id, changes in batch.items()
+                       for phrase_id, added_at in changes.items() if added_at is not None]
+            deletes = [(user_id, phrase_id) for user_id, changes in batch.items()
+                       for phrase_id, added_at in changes.items() if added_at is None]
+            conn = self._connection()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(
+                        "INSERT INTO favorites (user_id, phrase_id, added_at) VALUES (?, ?, ?)"
+                        " ON CONFLICT (user_id, phrase_id) DO NOTHING",
+                        upserts
+                    )
+                    conn.executemany("DELETE FROM favorites WHERE user_id = ? AND phrase_id = ?", deletes)
+                    versions = {}
+                    for user_id in batch:
+                        conn.execute(
+                            "INSERT INTO favorite_versions (user_id, version) VALUES (?, 1)"
+                            " ON CONFLICT (user_id) DO UPDATE SET version = version + 1",
+                            (user_id,)
+                        )
+                        versions[user_id] = self._stored_version(user_id)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            except Exception:
+                # Keep the changes for the next attempt, behind anything newer
+                with self._lock:
+                    self._counters['errors'] += 1
+                    for user_id, changes in batch.items():
+                        merged = dict(changes)
+                        merged.update(self._pending.get(user_id, {}))
+                        self._pending[user_id] = merged
+                        self._pending_count += len(changes)
+                raise
+
+            with self._lock:
+                self._counters['flushes'] += 1
+                self._counters['rows_written'] += len(upserts) + len(deletes)
+                for user_id, version in versions.items():
+                    entry = self._users.get(user_id)
+                    if entry is None:
+                        continue
+                    if entry.version == version - 1:
+                        entry.version = version
+                    elif entry.version != version:
+                        # Another process wrote in between, reload on next access
+                        entry.version = None
+            return len(upserts) + len(deletes)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Could not write favorites: {e}")
+
+    def close(self):
+        """Stop the flusher and write what is still buffered"""
+        self._closed = True
+        self._wakeup.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['cached_users'] = len(self._users)
+            stats['pending'] = self._pending_count
+        return stats
+
+
+# Shared store used by the Phrasebook service
+favorites_store = FavoritesStore()
+atexit.register(favorites_store.close)
@@ -0,0 +1,103 @@
+import gzip
+import json
+import hashlib
+from flask import request, Response, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 512
+
+
+def make_etag(body):
+    """Strong ETag for a response body"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def conditional_response(body, etag, mimetype='application/json', max_age=3600, headers=None):
+    """
+    Build a Flask response with ETag and Cache-Control that answers
+    If-None-Match requests with 304 Not Modified.
+    """
+    response = Response(body, mimetype=mimetype, headers=headers)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"public, max-age={max_age}"
+    return response.make_conditional(request)
+
+
+class EncodedPayload:
+    """A JSON payload serialized once, with gzip (and brotli if installed) variants and a strong ETag"""
+
+    __slots__ = ('body', 'etag', 'variants')
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = make_etag(self.body)
+        self.variants = {}
+        if len(self.body) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = gzip.compress(self.body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(self.body, quality=11)
+
+
+def accepted_encodings():
+    """Content codings the client accepts (q > 0)"""
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def payload_response(payload, max_age=3600):
+    """
+    Serve an EncodedPayload in the best encoding the client accepts, each
+    encoding with its own strong ETag, answering If-None-Match with 304.
+    """
+    accepted = accepted_encodings()
+    encoding = next((name for name in ('br', 'gzip') if name in payload.variants and name in accepted), None)
+    body = payload.variants[encoding] if encoding else payload.body
+
+    response = Response(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.set_etag(f"{payload.etag}-{encoding}" if encoding else payload.etag)
+    response.headers['Cache-Control'] = f"public, max-age={max_age}"
+    return response.make_conditional(request)
+
+
+def streaming_response(chunks, mimetype, download_name=None, as_attachment=False):
+    """Chunked response for content produced on the fly (no ETag or Range)"""
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    if download_name:
+        disposition = 'attachment' if as_attachment else 'inline'
+        headers['Content-Disposition'] = f'{disposition}; filename="{download_name}"'
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
+
+def send_cached_file(path, etag, mimetype, download_name=None, as_attachment=False, max_age=86400):
+    """
+    send_file for content-addressed files: strong ETag, 304 Not Modified
+    and Range requests (partial content) on GET/HEAD.
+    """
+    return send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True,
+        etag=etag,
+        max_age=max_age
+    )
@@ -0,0 +1,159 @@
+import os
+import time
+import logging
+import threading
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Timeouts in seconds (connect, read); override through environment variables
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Default keep-alive pool size for hosts without an explicit entry
+DEFAULT_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+
+# Per-host pool sizing for the upstream services we call
+HOST_POOL_SIZES = {
+    "translate.google.com": int(os.environ.get("HTTP_POOL_SIZE_GOOGLE", "32")),
+    "translate.googleapis.com": int(os.environ.get("HTTP_POOL_SIZE_GOOGLE", "32")),
+    "api.mymemory.translated.net": int(os.environ.get("HTTP_POOL_SIZE_MYMEMORY", "16")),
+    "api.ocr.space": int(os.environ.get("HTTP_POOL_SIZE_OCR", "4")),
+}
+
+
+class PooledHTTPClient:
+    """
+    Shared keep-alive HTTP session with per-host connection pools,
+    default connect/read timeouts and pool utilisation metrics.
+    """
+
+    def __init__(self, host_pool_sizes=None, default_pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.default_pool_size = default_pool_size
+        self.host_pool_sizes = dict(HOST_POOL_SIZES if host_pool_sizes is None else host_pool_sizes)
+        self.session = requests.Session()
+        self.session.headers['Connection'] = 'keep-alive'
+        self._adapters = {}
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+        default_adapter = HTTPAdapter(pool_connections=len(self.host_pool_sizes) + 4,
+                                      pool_maxsize=default_pool_size)
+        self.session.mount('http://', default_adapter)
+        self.session.mount('https://', default_adapter)
+        self._adapters['*'] = default_adapter
+
+        for host, size in self.host_pool_sizes.items():
+            self.configure_host(host, size)
+
+    def configure_host(self, host, pool_size, scheme='https'):
+        """Mount a dedicated connection pool for a host"""
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount(f"{scheme}://{host}/", adapter)
+        with self._lock:
+            self.host_pool_sizes[host] = pool_size
+            self._adapters[host] = adapter
+
+    def _host_metrics(self, host):
+        metrics = self._metrics.get(host)
+        if metrics is None:
+            metrics = {
+                'requests': 0,
+                'errors': 0,
+                'in_flight': 0,
+                'peak_in_flight': 0,
+                'total_time': 0.0,
+            }
+            self._metrics[host] = metrics
+        return metrics
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """Send a request through the shared session"""
+        host = urllib.parse.urlsplit(url).hostname or ''
+        with self._lock:
+            metrics = self._host_metrics(host)
+            metrics['requests'] += 1
+            metrics['in_flight'] += 1
+            metrics['peak_in_flight'] = max(metrics['peak_in_flight'], metrics['in_flight'])
+
+        start = time.perf_counter()
+        try:
+            return self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                metrics['errors'] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                metrics['in_flight'] -= 1
+                metrics['total_time'] += elapsed
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _pool_stats(self, adapter, host):
+        """Collect connection counters from the urllib3 pools for a host"""
+        connections = 0
+        requests_sent = 0
+        idle = 0
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            if key.key_host != host:
+                continue
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += getattr(pool, 'num_connections', 0)
+            requests_sent += getattr(pool, 'num_requests', 0)
+            if pool.pool is not None:
+                idle += pool.pool.qsize()
+        return connections, requests_sent, idle
+
+    def stats(self):
+        """Return per-host request and pool utilisation metrics"""
+        with self._lock:
+            snapshot = {host: dict(m) for host, m in self._metrics.items()}
+            adapters = dict(self._adapters)
+            pool_sizes = dict(self.host_pool_sizes)
+
+        hosts = {}
+        for host, metrics in snapshot.items():
+            pool_size = pool_sizes.get(host, self.default_pool_size)
+            adapter = adapters.get(host, adapters['*'])
+            try:
+                connections, requests_sent, idle = self._pool_stats(adapter, host)
+            except Exception as e:
+                logger.debug(f"Could not read pool stats for {host}: {e}")
+                connections, requests_sent, idle = 0, 0, 0
+
+            completed = metrics['requests'] - metrics['in_flight']
+            metrics['avg_latency_ms'] = round(metrics['total_time'] / completed * 1000, 2) if completed else 0.0
+            metrics['total_time'] = round(metrics['total_time'], 4)
+            metrics['pool_size'] = pool_size
+            metrics['utilisation'] = round(metrics['in_flight'] / pool_size, 4) if pool_size else 0.0
+            metrics['connections_opened'] = connections
+            metrics['idle_slots'] = idle
+            metrics['connection_reuse_ratio'] = (
+                round(1 - connections / requests_sent, 4) if requests_sent else 0.0
+            )
+            hosts[host] = metrics
+
+        return {
+            'timeout': {'connect': self.timeout[0], 'read': self.timeout[1]},
+            'hosts': hosts,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+# Shared client used for all outbound translation and OCR calls
+http_client = PooledHTTPClient()
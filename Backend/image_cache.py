@@ -0,0 +1,366 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+import cv2
+import numpy as np
+from transcoder import StageStats
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration (can be overridden through environment variables)
+IMAGE_CACHE_DB = os.environ.get("IMAGE_CACHE_DB", "image_cache.db")
+IMAGE_CACHE_SIZE = int(os.environ.get("IMAGE_CACHE_SIZE", "5000"))
+IMAGE_CACHE_DISK_SIZE = int(os.environ.get("IMAGE_CACHE_DISK_SIZE", "50000"))
+IMAGE_CACHE_TTL = int(os.environ.get("IMAGE_CACHE_TTL", str(7 * 24 * 60 * 60)))  # 7 days
+# Largest Hamming distances (out of 256 and 64 bits) for a cached image to be a near-duplicate candidate
+IMAGE_CACHE_PHASH_DISTANCE = int(os.environ.get("IMAGE_CACHE_PHASH_DISTANCE", "32"))
+IMAGE_CACHE_DHASH_DISTANCE = int(os.environ.get("IMAGE_CACHE_DHASH_DISTANCE", "10"))
+# The disk tier is trimmed to max_disk_entries after this many writes
+PRUNE_EVERY = 1000
+# Near duplicates must also have nearly the same aspect ratio
+ASPECT_TOLERANCE = 0.02
+
+# The DCT runs over a 64x64 thumbnail and its low 16x16 frequencies become the hash. No hash this
+# small tells two signs with the same layout but different words apart (Push/Pull, Cafe/Cake), so a
+# near-duplicate is only a candidate: its translation is reused once the new image's OCR text matches.
+PHASH_SIZE = 64
+PHASH_LOW = 16
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, so dct2(x) = C @ x @ C.T"""
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+DCT_MATRIX = _dct_matrix(PHASH_SIZE)
+
+# Upload identity plus what is needed to find it again: phash is 32 bytes, dhash a 64-bit int,
+# both None when the image can't be decoded
+Fingerprint = namedtuple('Fingerprint', ['key', 'phash', 'dhash', 'aspect', 'target_lang', 'source_lang'])
+
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def _to_signed(value):
+    """SQLite stores signed 64-bit integers"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def popcount(values):
+    """Set bits of each element of a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return np.unpackbits(values[..., None].view(np.uint8), axis=-1).sum(axis=-1)
+
+
+def perceptual_hashes(image_data):
+    """(pHash, dHash, aspect ratio) of an image, None if it can't be decoded"""
+    # Hashes only look at a thumbnail, so decode JPEGs at 1/8 size
+    gray = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None or gray.size == 0:
+        return None
+    height, width = gray.shape
+
+    thumb = cv2.resize(gray, (PHASH_SIZE, PHASH_SIZE), interpolation=cv2.INTER_AREA).astype(np.float64)
+    low = (DCT_MATRIX @ thumb @ DCT_MATRIX.T)[:PHASH_LOW, :PHASH_LOW].ravel()
+    phash = np.packbits(low > np.median(low[1:])).tobytes()
+
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    dhash = _bits_to_int(small[:, 1:] > small[:, :-1])
+    return phash, dhash, width / height
+
+
+def exact_key(image_data, target_lang, source_lang='auto'):
+    digest = hashlib.sha256(image_data)
+    digest.update(f"\x1f{source_lang}\x1f{target_lang}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ImageResultCache:
+    """
+    Image translation results keyed by the upload. Only an identical upload
+    (same SHA-256) is served without running OCR. Otherwise the image's
+    pHash and dHash are compared against every cached image for the same
+    language pair (vectorized Hamming distance); after OCR, a close match
+    whose extracted text is the same supplies the translation.
+    An in-memory LRU of max_entries sits in front of SQLite, which keeps
+    results across restarts and reloads the most recent ones at startup.
+    """
+
+    def __init__(self, db_path=IMAGE_CACHE_DB, max_entries=IMAGE_CACHE_SIZE, max_disk_entries=IMAGE_CACHE_DISK_SIZE,
+                 ttl=IMAGE_CACHE_TTL, phash_distance=IMAGE_CACHE_PHASH_DISTANCE,
+                 dhash_distance=IMAGE_CACHE_DHASH_DISTANCE):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.phash_distance = phash_distance
+        self.dhash_distance = dhash_distance
+        self._memory = OrderedDict()  # key -> (Fingerprint, result, expires_at)
+        self._indexes = {}  # (target_lang, source_lang) -> (keys, phashes, dhashes, aspects)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._writes = 0
+        self._stages = {name: StageStats() for name in ('exact_lookup', 'hash', 'near_lookup')}
+        self._counters = {
+            'exact_hits': 0,
+            'near_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+        }
+        if db_path:
+            self._open_db()
+
+    def _open_db(self):
+        """Open the SQLite store and reload recent entries, falling back to memory-only on failure"""
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS image_results ("
+                " key TEXT PRIMARY KEY,"
+                " phash BLOB,"
+                " dhash INTEGER,"
+                " aspect REAL,"
+                " target_lang TEXT NOT NULL,"
+                " source_lang TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_image_results_expires ON image_results (expires_at)")
+            self._db.execute("DELETE FROM image_results WHERE expires_at < ?", (time.time(),))
+            self._db.execute(
+                "DELETE FROM image_results WHERE key NOT IN"
+                " (SELECT key FROM image_results ORDER BY expires_at DESC LIMIT ?)",
+                (self.max_disk_entries,)
+            )
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT key, phash, dhash, aspect, target_lang, source_lang, result, expires_at FROM image_results"
+                " ORDER BY expires_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Image cache database unavailable, using memory only: {e}")
+            self._db = None
+            return
+
+        with self._lock:
+            for key, phash, dhash, aspect, target_lang, source_lang, result, expires_at in reversed(rows):
+                fingerprint = Fingerprint(key, phash, None if dhash is None else dhash % (1 << 64), aspect,
+                                          target_lang, source_lang)
+                self._memory_put(fingerprint, json.loads(result), expires_at)
+
+    def _record(self, stage, seconds):
+        with self._lock:
+            self._stages[stage].add(seconds)
+
+    def _count(self, name, amount=1):
+        self._counters[name] += amount
+
+    def _memory_put(self, fingerprint, result, expires_at):
+        """Insert into the LRU tier (lock held), evicting the least recently used entries"""
+        self._memory[fingerprint.key] = (fingerprint, result, expires_at)
+        self._memory.move_to_end(fingerprint.key)
+        self._indexes.pop((fingerprint.target_lang, fingerprint.source_lang), None)
+        while len(self._memory) > self.max_entries:
+            _, (evicted, _, _) = self._memory.popitem(last=False)
+            self._indexes.pop((evicted.target_lang, evicted.source_lang), None)
+            self._count('evictions')
+
+    def _memory_get(self, key, now):
+        """Cached result for a key (lock held), dropping it if expired"""
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        fingerprint, result, expires_at = entry
+        if expires_at < now:
+            del self._memory[key]
+            self._indexes.pop((fingerprint.target_lang, fingerprint.source_lang), None)
+            return None
+        self._memory.move_to_end(key)
+        return result
+
+    def _index(self, language_pair):
+        """Hash arrays of the in-memory entries for a language pair (lock held), built on demand"""
+        index = self._indexes.get(language_pair)
+        if index is None:
+            entries = [fingerprint for fingerprint, _, _ in self._memory.values()
+                       if (fingerprint.target_lang, fingerprint.source_lang) == language_pair
+                       and fingerprint.phash is not None]
+            index = self._indexes[language_pair] = (
+                [fingerprint.key for fingerprint in entries],
+                np.frombuffer(b''.join(fingerprint.phash for fingerprint in entries), dtype=np.uint64).reshape(
+                    len(entries), PHASH_LOW * PHASH_LOW // 64),
+                np.array([fingerprint.dhash for fingerprint in entries], dtype=np.uint64),
+                np.array([fingerprint.aspect for fingerprint in entries], dtype=np.float64),
+            )
+        return index
+
+    def _nearest(self, fingerprint, extracted_text, now):
+        with self._lock:
+            keys, phashes, dhashes, aspects = self._index((fingerprint.target_lang, fingerprint.source_lang))
+            if not keys:
+                return None
+            phash_distances = popcount(phashes ^ np.frombuffer(fingerprint.phash, dtype=np.uint64)).sum(axis=1)
+            dhash_distances = popcount(dhashes ^ np.uint64(fingerprint.dhash))
+            close = ((phash_distances <= self.phash_distance) & (dhash_distances <= self.dhash_distance)
+                     & (np.abs(aspects - fingerprint.aspect) <= ASPECT_TOLERANCE * fingerprint.aspect))
+            for i in np.flatnonzero(close)[np.argsort(phash_distances[close], kind='stable')]:
+                result = self._memory_get(keys[i], now)
+                if result is not None and result.get('extracted_text') == extracted_text:
+                    return result
+        return None
+
+    def get(self, image_data, target_lang, source_lang='auto'):
+        """
+        Cached result for these exact bytes, or None, plus the upload's
+        Fingerprint to pass to near_match() and put() after a miss.
+        """
+        start = time.perf_counter()
+        now = time.time()
+        key = exact_key(image_data, target_lang, source_lang)
+        with self._lock:
+            result = self._memory_get(key, now)
+            if result is not None:
+                self._count('exact_hits')
+        if result is not None:
+            self._record('exact_lookup', time.perf_counter() - start)
+            return dict(result), Fingerprint(key, None, None, None, target_lang, source_lang)
+
+        row = self._disk_get(key, now)
+        if row is not None:
+            fingerprint, result, expires_at = row
+            with self._lock:
+                self._memory_put(fingerprint, result, expires_at)
+                self._count('disk_hits')
+            self._record('exact_lookup', time.perf_counter() - start)
+            return dict(result), fingerprint
+        self._record('exact_lookup', time.perf_counter() - start)
+
+        hash_start = time.perf_counter()
+        hashes = perceptual_hashes(image_data)
+        self._record('hash', time.perf_counter() - hash_start)
+        if hashes is None:
+            with self._lock:
+                self._count('misses')
+            return None, Fingerprint(key, None, None, None, target_lang, source_lang)
+        fingerprint = Fingerprint(key, *hashes, target_lang, source_lang)
+        with self._lock:
+            self._count('misses')
+        return None, fingerprint
+
+    def near_match(self, fingerprint, extracted_text):
+        """
+        Result of a near-duplicate image whose OCR text equals this upload's,
+        or None. A hit is stored under the upload's exact key, so the next
+        upload of these bytes skips OCR.
+        """
+        if fingerprint.phash is None or not extracted_text:
+            return None
+        start = time.perf_counter()
+        result = self._nearest(fingerprint, extracted_text, time.time())
+        self._record('near_lookup', time.perf_counter() - start)
+        if result is None:
+            return None
+        with self._lock:
+            self._count('near_hits')
+        # Its hashes stay out of the index so matches can't chain away from the image that was translated
+        self.put(fingerprint._replace(phash=None, dhash=None, aspect=None), result)
+        return dict(result)
+
+    def put(self, fingerprint, result):
+        """Store the result computed for an upload"""
+        expires_at = time.time() + self.ttl
+        value = dict(result)
+        with self._lock:
+            self._memory_put(fingerprint, value, expires_at)
+            self._count('sets')
+        self._disk_set(fingerprint, value, expires_at)
+
+    def _disk_get(self, key, now):
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT phash, dhash, aspect, target_lang, source_lang, result, expires_at"
+                    " FROM image_results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[6] < now:
+                    self._db.execute("DELETE FROM image_results WHERE key = ?", (key,))
+                    self._db.commit()
+                    return None
+            phash, dhash, aspect, target_lang, source_lang, result, expires_at = row
+            fingerprint = Fingerprint(key, phash, None if dhash is None else dhash % (1 << 64), aspect,
+                                      target_lang, source_lang)
+            return fingerprint, json.loads(result), expires_at
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Image cache read failed: {e}")
+            return None
+
+    def _disk_set(self, fingerprint, value, expires_at):
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO image_results"
+                    " (key, phash, dhash, aspect, target_lang, source_lang, result, expires_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (fingerprint.key,
+                     fingerprint.phash,
+                     None if fingerprint.dhash is None else _to_signed(fingerprint.dhash),
+                     fingerprint.aspect, fingerprint.target_lang, fingerprint.source_lang,
+                     json.dumps(value, ensure_ascii=False), expires_at)
+                )
+                self._writes += 1
+                if self._writes % PRUNE_EVERY == 0:
+                    self._db.execute(
+                        "DELETE FROM image_results WHERE key NOT IN"
+                        " (SELECT key FROM image_results ORDER BY expires_at DESC LIMIT ?)",
+                        (self.max_disk_entries,)
+                    )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Image cache write failed: {e}")
+
+    def stats(self):
+        """Return hit/miss counters, hit rate, lookup timings and tier sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['stages'] = {name: stage.as_dict() for name, stage in self._stages.items()}
+            stats['memory_entries'] = len(self._memory)
+        hits = stats['exact_hits'] + stats['disk_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        # Misses whose translation came from a near-duplicate with the same text
+        stats['near_hit_rate'] = round(stats['near_hits'] / stats['misses'], 4) if stats['misses'] else 0.0
+        stats['max_entries'] = self.max_entries
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    stats['disk_entries'] = self._db.execute("SELECT COUNT(*) FROM image_results").fetchone()[0]
+            except sqlite3.Error:
+                stats['disk_entries'] = None
+        return stats
+
+
+# Shared cache used by the image translation service
+image_result_cache = ImageResultCache()
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import logging
+import threading
+from http_cache import make_etag
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the upstream language list is refreshed in the background
+CATALOG_TTL = int(os.environ.get("LANGUAGE_CATALOG_TTL", str(24 * 60 * 60)))
+
+# Single source of truth for the languages we support:
+# code -> (display name, speech recognition locale, gTTS language code)
+LANGUAGE_TABLE = {
+    'en': ('English', 'en-US', 'en'),
+    'es': ('Spanish', 'es-ES', 'es'),
+    'fr': ('French', 'fr-FR', 'fr'),
+    'de': ('German', 'de-DE', 'de'),
+    'it': ('Italian', 'it-IT', 'it'),
+    'pt': ('Portuguese', 'pt-BR', 'pt'),
+    'ru': ('Russian', 'ru-RU', 'ru'),
+    'zh': ('Chinese', 'zh-CN', 'zh-CN'),
+    'ja': ('Japanese', 'ja-JP', 'ja'),
+    'ko': ('Korean', 'ko-KR', 'ko'),
+    'ar': ('Arabic', 'ar-SA', 'ar'),
+    'hi': ('Hindi', 'hi-IN', 'hi'),
+    'ur': ('Urdu', 'ur-PK', 'ur'),  # Urdu for Pakistan
+    'tr': ('Turkish', 'tr-TR', 'tr'),
+    'nl': ('Dutch', 'nl-NL', 'nl'),
+    'sv': ('Swedish', 'sv-SE', 'sv'),
+    'pl': ('Polish', 'pl-PL', 'pl'),
+    'id': ('Indonesian', 'id-ID', 'id'),
+    'vi': ('Vietnamese', 'vi-VN', 'vi'),
+    'th': ('Thai', 'th-TH', 'th'),
+}
+
+# Language code -> display name (with auto detection) used by text_translator
+LANGUAGES = {'auto': 'Auto Detect'}
+LANGUAGES.update({code: entry[0] for code, entry in LANGUAGE_TABLE.items()})
+
+# Language code -> speech recognition locale used by Audio
+SPEECH_LANG_MAP = {code: entry[1] for code, entry in LANGUAGE_TABLE.items()}
+
+# Language code -> gTTS language code used by Phrasebook
+TTS_LANG_MAP = {code: entry[2] for code, entry in LANGUAGE_TABLE.items()}
+
+
+def load_google_languages():
+    """Fetch the full Google Translate language list (name -> code)"""
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator().get_supported_languages(as_dict=True)
+
+
+class LanguageCatalog:
+    """
+    Shared language lookups plus the upstream language list, loaded lazily
+    once and refreshed in the background when older than the TTL. JSON
+    payloads are encoded once per refresh and carry a strong ETag.
+    """
+
+    def __init__(self, loader=load_google_languages, ttl=CATALOG_TTL):
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._google = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._snapshots = {}
+
+    def speech_code(self, code, default="en-US"):
+        return SPEECH_LANG_MAP.get(code, default)
+
+    def tts_code(self, code, default='en'):
+        return TTS_LANG_MAP.get(code, default)
+
+    def name(self, code):
+        return LANGUAGES.get(code, code)
+
+    def supported_languages(self):
+        """Supported languages as [{"code", "name"}] sorted by name"""
+        languages = [{"code": code, "name": name} for code, name in LANGUAGES.items()]
+        languages.sort(key=lambda x: x["name"])
+        return languages
+
+    def _fallback_google(self):
+        return {name.lower(): code for code, name in LANGUAGES.items() if code != 'auto'}
+
+    def _load(self):
+        try:
+            languages = self.loader()
+        except Exception as e:
+            logger.warning(f"Could not load upstream language list: {e}")
+            languages = None
+
+        with self._lock:
+            if languages:
+                self._google = dict(languages)
+                self._loaded_at = time.time()
+                self._snapshots.pop('google', None)
+            elif self._google is None:
+                # Serve our own table until the upstream list can be fetched
+                self._google = self._fallback_google()
+                self._loaded_at = time.time() - self.ttl + 60  # retry in a minute
+            self._refreshing = False
+
+    def _refresh_in_background(self):
+        threading.Thread(target=self._load, name="language-catalog-refresh", daemon=True).start()
+
+    def google_languages(self):
+        """Upstream language list (name -> code), stale-while-revalidate"""
+        with self._lock:
+            loaded = self._google is not None
+            stale = time.time() - self._loaded_at > self.ttl
+            if loaded and stale and not self._refreshing:
+                self._refreshing = True
+                refresh = True
+            else:
+                refresh = False
+
+        if not loaded:
+            self._load()
+        elif refresh:
+            self._refresh_in_background()
+
+        with self._lock:
+            return self._google
+
+    def snapshot(self, kind):
+        """Pre-encoded JSON body and ETag for 'supported' or 'google' payloads"""
+        if kind == 'google':
+            languages = self.google_languages()
+        with self._lock:
+            cached = self._snapshots.get(kind)
+        if cached is not None:
+            return cached
+
+        if kind == 'google':
+            payload = {'languages': languages}
+        elif kind == 'supported':
+            payload = self.supported_languages()
+        else:
+            raise ValueError(f"Unknown catalog payload: {kind}")
+
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        cached = (body, make_etag(body))
+        with self._lock:
+            self._snapshots[kind] = cached
+        return cached
+
+    def preload(self):
+        """Load the upstream list now (e.g. at startup) in a background thread"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        self._refresh_in_background()
+
+
+# Shared catalog used by every service
+language_catalog = LanguageCatalog()
@@ -0,0 +1,237 @@
+import os
+import math
+import re
+import unicodedata
+from collections import Counter
+
+# Minimum confidence before a local detection replaces source_lang='auto'
+DETECT_MIN_CONFIDENCE = float(os.environ.get("DETECT_MIN_CONFIDENCE", "0.9"))
+
+# Unicode ranges for the scripts that identify a language on their own
+SCRIPT_PATTERNS = {
+    'hangul': re.compile(r'[ᄀ-ᇿ㄰-㆏가-힯]'),
+    'kana': re.compile(r'[぀-ゟ゠-ヿ]'),
+    'han': re.compile(r'[一-鿿㐀-䶿]'),
+    'thai': re.compile(r'[฀-๿]'),
+    'devanagari': re.compile(r'[ऀ-ॿ]'),
+    'cyrillic': re.compile(r'[Ѐ-ӿ]'),
+    'arabic': re.compile(r'[؀-ۿݐ-ݿﭐ-﷿ﹰ-﻿]'),
+    'latin': re.compile(r'[A-Za-zÀ-ɏḀ-ỿ]'),
+}
+
+# Scripts written by many languages besides the one we guess (Persian/Pashto, Ukrainian/Bulgarian/
+# Serbian, Marathi/Nepali...). A guess from these alone is capped at this confidence, below
+# DETECT_MIN_CONFIDENCE, so 'auto' is kept and the provider detects the language itself.
+SHARED_SCRIPTS = {'devanagari', 'cyrillic', 'arabic'}
+SHARED_SCRIPT_CONFIDENCE = 0.5
+
+# Letters used in Urdu but not in Arabic
+URDU_LETTERS = re.compile(r'[ٹڈڑںھہےۓپچژگک]')
+
+# Sample text for each Latin-script language, turned into trigram profiles at import
+LATIN_SAMPLES = {
+    'en': (
+        "the quick brown fox jumps over the lazy dog. hello, how are you today? i am fine, thank you. "
+        "where is the train station? we would like to order something to eat and drink. this is the best "
+        "day of my life and i want to share it with you. they have been working there for many years. "
+        "what time does the shop open in the morning? please help me find my hotel. it was very nice "
+        "to meet you, see you tomorrow. the weather is good and the children are playing in the park."
+    ),
+    'es': (
+        "hola, ¿cómo estás? estoy bien, gracias. ¿dónde está la estación de tren? queremos pedir algo "
+        "para comer y beber. este es el mejor día de mi vida y quiero compartirlo contigo. ellos han "
+        "trabajado allí durante muchos años. ¿a qué hora abre la tienda por la mañana? por favor, "
+        "ayúdame a encontrar mi hotel. mucho gusto, hasta mañana. el tiempo es bueno y los niños están "
+        "jugando en el parque. la cuenta, por favor. no entiendo, ¿puede hablar más despacio?"
+    ),
+    'fr': (
+        "bonjour, comment allez-vous? je vais bien, merci. où est la gare? nous voudrions commander "
+        "quelque chose à manger et à boire. c'est le plus beau jour de ma vie et je veux le partager "
+        "avec toi. ils travaillent là depuis de nombreuses années. à quelle heure ouvre le magasin le "
+        "matin? s'il vous plaît, aidez-moi à trouver mon hôtel. enchanté, à demain. il fait beau et "
+        "les enfants jouent dans le parc. l'addition, s'il vous plaît. je ne comprends pas."
+    ),
+    'de': (
+        "hallo, wie geht es dir? mir geht es gut, danke. wo ist der bahnhof? wir möchten etwas zu essen "
+        "und zu trinken bestellen. das ist der schönste tag meines lebens und ich möchte ihn mit dir "
+        "teilen. sie arbeiten dort seit vielen jahren. um wie viel uhr öffnet das geschäft am morgen? "
+        "bitte helfen sie mir, mein hotel zu finden. schön, sie kennenzulernen, bis morgen. das wetter "
+        "ist gut und die kinder spielen im park. die rechnung, bitte. ich verstehe das nicht. straße."
+    ),
+    'it': (
+        "ciao, come stai? sto bene, grazie. dov'è la stazione dei treni? vorremmo ordinare qualcosa da "
+        "mangiare e da bere. questo è il giorno più bello della mia vita e voglio condividerlo con te. "
+        "loro lavorano lì da molti anni. a che ora apre il negozio la mattina? per favore, aiutami a "
+        "trovare il mio albergo. piacere di conoscerti, a domani. il tempo è bello e i bambini stanno "
+        "giocando nel parco. il conto, per favore. non capisco, può parlare più lentamente?"
+    ),
+    'pt': (
+        "olá, como você está? estou bem, obrigado. onde fica a estação de trem? gostaríamos de pedir "
+        "algo para comer e beber. este é o melhor dia da minha vida e quero compartilhá-lo com você. "
+        "eles trabalham lá há muitos anos. a que horas a loja abre de manhã? por favor, me ajude a "
+        "encontrar o meu hotel. muito prazer, até amanhã. o tempo está bom e as crianças estão "
+        "brincando no parque. a conta, por favor. não entendo, pode falar mais devagar? não são."
+    ),
+    'nl': (
+        "hallo, hoe gaat het met je? het gaat goed, dank je. waar is het treinstation? we willen graag "
+        "iets te eten en te drinken bestellen. dit is de mooiste dag van mijn leven en ik wil hem met "
+        "jou delen. zij werken daar al vele jaren. hoe laat gaat de winkel 's ochtends open? help me "
+        "alstublieft mijn hotel te vinden. leuk je te ontmoeten, tot morgen. het weer is goed en de "
+        "kinderen spelen in het park. de rekening, alstublieft. ik begrijp het niet. een, het, van."
+    ),
+    'sv': (
+        "hej, hur mår du? jag mår bra, tack. var ligger tågstationen? vi skulle vilja beställa något "
+        "att äta och dricka. det här är den bästa dagen i mitt liv och jag vill dela den med dig. de "
+        "har arbetat där i många år. när öppnar affären på morgonen? snälla hjälp mig att hitta mitt "
+        "hotell. trevligt att träffas, vi ses i morgon. vädret är fint och barnen leker i parken. "
+        "notan, tack. jag förstår inte, kan du tala långsammare? och att det som är för på med."
+    ),
+    'pl': (
+        "cześć, jak się masz? dobrze, dziękuję. gdzie jest dworzec kolejowy? chcielibyśmy zamówić coś "
+        "do jedzenia i picia. to jest najpiękniejszy dzień w moim życiu i chcę go z tobą dzielić. oni "
+        "pracują tam od wielu lat. o której godzinie otwiera się sklep rano? proszę, pomóż mi znaleźć "
+        "mój hotel. miło cię poznać, do jutra. pogoda jest dobra, a dzieci bawią się w parku. "
+        "poproszę rachunek. nie rozumiem, czy może pan mówić wolniej? że, się, jest, nie, być."
+    ),
+    'tr': (
+        "merhaba, nasılsın? iyiyim, teşekkür ederim. tren istasyonu nerede? yiyecek ve içecek bir şey "
+        "sipariş etmek istiyoruz. bu hayatımın en güzel günü ve onu seninle paylaşmak istiyorum. "
+        "orada uzun yıllardır çalışıyorlar. mağaza sabah saat kaçta açılıyor? lütfen otelimi bulmama "
+        "yardım et. tanıştığımıza memnun oldum, yarın görüşürüz. hava güzel ve çocuklar parkta "
+        "oynuyor. hesap lütfen. anlamıyorum, daha yavaş konuşabilir misiniz? bir, bu, ve, için."
+    ),
+    'id': (
+        "halo, apa kabar? saya baik, terima kasih. di mana stasiun kereta api? kami ingin memesan "
+        "sesuatu untuk makan dan minum. ini adalah hari terbaik dalam hidup saya dan saya ingin "
+        "membaginya dengan kamu. mereka sudah bekerja di sana selama bertahun-tahun. jam berapa toko "
+        "buka di pagi hari? tolong bantu saya menemukan hotel saya. senang bertemu dengan anda, sampai "
+        "jumpa besok. cuacanya bagus dan anak-anak sedang bermain di taman. yang, dan, ini, itu, tidak."
+    ),
+    'vi': (
+        "xin chào, bạn có khỏe không? tôi khỏe, cảm ơn. ga xe lửa ở đâu? chúng tôi muốn gọi món gì đó "
+        "để ăn và uống. đây là ngày đẹp nhất trong cuộc đời tôi và tôi muốn chia sẻ nó với bạn. họ đã "
+        "làm việc ở đó nhiều năm. cửa hàng mở cửa lúc mấy giờ vào buổi sáng? làm ơn giúp tôi tìm "
+        "khách sạn của tôi. rất vui được gặp bạn, hẹn gặp lại ngày mai. thời tiết đẹp và trẻ em đang "
+        "chơi trong công viên. cho tôi xin hóa đơn. tôi không hiểu, bạn có thể nói chậm hơn không?"
+    ),
+}
+
+# Trigram count below which Latin-script confidence is scaled down
+MIN_TRIGRAMS = 12
+
+# Smoothing floor for trigrams a profile has never seen
+UNSEEN_LOG_PROB = math.log(1e-6)
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFC', text.lower())
+    return re.sub(r"[^\w'\s]+|\d+|_", " ", text)
+
+
+def trigrams(text):
+    """Character trigrams of each word padded with spaces"""
+    grams = Counter()
+    for word in normalize(text).split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            grams[padded[i:i + 3]] += 1
+    return grams
+
+
+def build_profile(sample):
+    """Log-probability table of trigrams in a sample text"""
+    grams = trigrams(sample)
+    total = sum(grams.values()) + len(grams)
+    return {gram: math.log((count + 1) / total) for gram, count in grams.items()}
+
+
+class LanguageDetector:
+    """
+    Offline language detector: Unicode script counts settle non-Latin
+    languages written in a script of their own, Latin-script text is
+    scored against precomputed character-trigram profiles. Scripts shared
+    by many languages only give a low-confidence guess.
+    """
+
+    def __init__(self, samples=LATIN_SAMPLES):
+        self.profiles = {lang: build_profile(sample) for lang, sample in samples.items()}
+
+    def script_counts(self, text):
+        return {name: len(pattern.findall(text)) for name, pattern in SCRIPT_PATTERNS.items()}
+
+    def _script_language(self, counts, text):
+        """Language implied by a non-Latin script, or None"""
+        if counts['hangul']:
+            return 'ko', 'hangul'
+        if counts['kana']:
+            return 'ja', 'kana'
+        if counts['han']:
+            return 'zh', 'han'
+        if counts['thai']:
+            return 'th', 'thai'
+        if counts['devanagari']:
+            return 'hi', 'devanagari'
+        if counts['cyrillic']:
+            return 'ru', 'cyrillic'
+        if counts['arabic']:
+            return ('ur' if URDU_LETTERS.search(text) else 'ar'), 'arabic'
+        return None
+
+    def _score_latin(self, text):
+        grams = trigrams(text)
+        if not grams:
+            return None
+        scores = {}
+        for lang, profile in self.profiles.items():
+            scores[lang] = sum(profile.get(gram, UNSEEN_LOG_PROB) * count for gram, count in grams.items())
+
+        # Softmax over per-trigram average scores keeps confidence comparable across lengths
+        total = sum(grams.values())
+        best = max(scores.values())
+        weights = {lang: math.exp((score - best) / total * 4) for lang, score in scores.items()}
+        norm = sum(weights.values())
+        lang = max(weights, key=weights.get)
+        # A handful of trigrams is weak evidence whatever the margin
+        return lang, weights[lang] / norm * min(1.0, total / MIN_TRIGRAMS)
+
+    def detect(self, text):
+        """Return {'language', 'confidence', 'script'} for a text ('language' is None if unknown)"""
+        if not text or not text.strip():
+            return {'language': None, 'confidence': 0.0, 'script': None}
+
+        counts = self.script_counts(text)
+        letters = sum(counts.values())
+        if not letters:
+            return {'language': None, 'confidence': 0.0, 'script': None}
+
+        # A dominant non-Latin script decides the language on its own, unless other languages share it
+        non_latin = letters - counts['latin']
+        if non_latin and non_latin >= counts['latin']:
+            language, script = self._script_language(counts, text)
+            confidence = non_latin / letters
+            if script in SHARED_SCRIPTS:
+                confidence = min(confidence, SHARED_SCRIPT_CONFIDENCE)
+            return {'language': language, 'confidence': round(confidence, 4), 'script': script}
+
+        scored = self._score_latin(text)
+        if scored is None:
+            return {'language': None, 'confidence': 0.0, 'script': 'latin'}
+        language, confidence = scored
+        return {'language': language, 'confidence': round(confidence, 4), 'script': 'latin'}
+
+    def detect_batch(self, texts):
+        return [self.detect(text) for text in texts]
+
+
+# Shared detector instance
+language_detector = LanguageDetector()
+
+
+def resolve_source_lang(text, source_lang='auto', min_confidence=DETECT_MIN_CONFIDENCE):
+    """Replace 'auto' with a confident local detection, otherwise return source_lang unchanged"""
+    if source_lang != 'auto':
+        return source_lang
+    result = language_detector.detect(text)
+    if result['language'] and result['confidence'] >= min_confidence:
+        return result['language']
+    return source_lang
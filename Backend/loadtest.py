@@ -0,0 +1,210 @@
+"""
+Load-test harness for the text translation service.
+
+Starts a local stub of the Google/MyMemory upstreams (fixed artificial
+latency), launches text_translator in either sync Flask mode or async
+ASGI mode pointed at the stub, then fires concurrent /translate requests
+and reports throughput and latency percentiles.
+
+    python loadtest.py --mode async --requests 5000 --concurrency 1000
+    python loadtest.py --mode flask --requests 5000 --concurrency 1000
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import subprocess
+import urllib.parse
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def handle_stub_connection(reader, writer, delay):
+    """Minimal keep-alive HTTP/1.1 server answering like the Google/MyMemory endpoints"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            content_length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    content_length = int(value.strip())
+            if content_length:
+                await reader.readexactly(content_length)
+
+            _, target, _ = request_line.decode('latin-1').split(' ', 2)
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(target).query)
+            text = query.get('q', [''])[0]
+            target_lang = query.get('tl', ['xx'])[0]
+
+            await asyncio.sleep(delay)
+
+            if 'langpair' in query:
+                payload = {"responseData": {"translatedText": f"[{query['langpair'][0]}] {text}"}}
+            else:
+                payload = [[[f"[{target_lang}] {text}", text, None, None]], None, "en"]
+            body = json.dumps(payload).encode('utf-8')
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: application/json\r\n"
+                b"Connection: keep-alive\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode('ascii')
+                + body
+            )
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+def start_stub_upstream(port, delay):
+    """Run the stub upstream on its own event loop in a daemon thread"""
+    ready = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        async def serve():
+            server = await asyncio.start_server(
+                lambda r, w: handle_stub_connection(r, w, delay), '127.0.0.1', port, backlog=4096
+            )
+            ready.set()
+            async with server:
+                await server.serve_forever()
+
+        loop.run_until_complete(serve())
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait(5)
+
+
+def start_target(mode, port, upstream_port):
+    env = dict(os.environ)
+    env['GOOGLE_TRANSLATE_URL'] = f"http://127.0.0.1:{upstream_port}/translate_a/single"
+    env['MYMEMORY_URL'] = f"http://127.0.0.1:{upstream_port}/get"
+    env['TRANSLATION_CACHE_DB'] = ''  # memory-only cache so runs start cold
+    env.setdefault('HTTP_POOL_SIZE', '256')
+
+    if mode == 'async':
+        cmd = [sys.executable, 'async_server.py', 'text', '--host', '127.0.0.1', '--port', str(port)]
+    else:
+        cmd = [sys.executable, '-c',
+               f"import text_translator; text_translator.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(base_url, total, concurrency, target_lang, unique):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def one(i):
+            nonlocal errors
+            text = f"load test phrase {i}" if unique else "load test phrase"
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post('/translate', json={
+                        "text": text, "target_lang": target_lang, "source_lang": "en"
+                    })
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /translate load test against a local stub upstream")
+    parser.add_argument('--mode', choices=['async', 'flask'], default='async')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--upstream-delay', type=float, default=0.05, help="stub upstream latency in seconds")
+    parser.add_argument('--target-lang', default='es')
+    parser.add_argument('--repeat-text', action='store_true', help="send the same text every time (cache hits)")
+    parser.add_argument('--url', help="test an already running server instead of launching one")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        upstream_port = free_port()
+        start_stub_upstream(upstream_port, args.upstream_delay)
+        port = free_port()
+        process = start_target(args.mode, port, upstream_port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        if not wait_until_ready(f"{base_url}/health"):
+            print("Server did not become ready")
+            return 1
+
+        elapsed, latencies, errors = asyncio.run(
+            run_load(base_url, args.requests, args.concurrency, args.target_lang, not args.repeat_text)
+        )
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    print(f"mode:         {args.mode if not args.url else args.url}")
+    print(f"requests:     {args.requests} (concurrency {args.concurrency}, upstream delay {args.upstream_delay * 1000:.0f} ms)")
+    print(f"errors:       {errors}")
+    print(f"elapsed:      {elapsed:.2f} s")
+    print(f"throughput:   {args.requests / elapsed:.1f} req/s")
+    for pct in (50, 95, 99):
+        print(f"p{pct} latency:  {percentile(latencies, pct) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
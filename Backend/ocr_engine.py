@@ -0,0 +1,310 @@
+import os
+import time
+import shutil
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image, ImageDraw, ImageFont
+from transcoder import StageStats
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+# OCR workers, and how many images (regions count one each) may wait for them before callers get OCRBusy
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(os.cpu_count() or 2)))
+OCR_QUEUE = int(os.environ.get("OCR_QUEUE", "16"))
+# Resolution Tesseract is told the image has (array input carries no DPI)
+OCR_DPI = int(os.environ.get("OCR_DPI", "300"))
+OCR_LANGUAGE = os.environ.get("OCR_LANGUAGE", "eng")
+# Seconds one tesseract process may run before it is killed
+OCR_PROCESS_TIMEOUT = float(os.environ.get("OCR_PROCESS_TIMEOUT", "60"))
+# Seconds a self-test result is reused before it is refreshed in the background
+OCR_SELF_TEST_TTL = int(os.environ.get("OCR_SELF_TEST_TTL", "300"))
+
+SELF_TEST_TEXT = "Hello, Tesseract!"
+
+
+class OCRBusy(Exception):
+    """Raised when the OCR queue is full"""
+
+
+class TesserocrBackend:
+    """
+    Tesseract linked in-process through tesserocr. Each worker thread keeps
+    its own initialised API (language data loaded once) and hands images
+    over in memory; recognition releases the GIL.
+    """
+
+    name = 'tesserocr'
+    persistent = True
+
+    def __init__(self, language=OCR_LANGUAGE, dpi=OCR_DPI):
+        self.language = language
+        self.dpi = dpi
+        self._local = threading.local()
+        self._apis = []
+        self._lock = threading.Lock()
+
+    def _api(self):
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=self.language, oem=tesserocr.OEM.DEFAULT)
+            api.SetVariable("user_defined_dpi", str(self.dpi))
+            self._local.api = api
+            with self._lock:
+                self._apis.append(api)
+        return api
+
+    def available(self):
+        return True
+
+    def recognize(self, image, psm):
+        api = self._api()
+        api.SetPageSegMode(psm)
+        api.SetImage(Image.fromarray(image))
+        return api.GetUTF8Text().strip()
+
+    def close(self):
+        with self._lock:
+            apis, self._apis = self._apis, []
+        for api in apis:
+            api.End()
+
+
+class TesseractCLIBackend:
+    """
+    The tesseract executable, fed through stdin/stdout pipes so images never
+    touch disk. Only a fallback for hosts where tesserocr can't be built:
+    every call starts a process, so callers should send whole images rather
+    than many small regions. A process running longer than ``timeout``
+    seconds is killed.
+    """
+
+    name = 'tesseract'
+    persistent = False
+
+    def __init__(self, language=OCR_LANGUAGE, dpi=OCR_DPI, timeout=OCR_PROCESS_TIMEOUT):
+        self.language = language
+        self.dpi = dpi
+        self.timeout = timeout
+
+    @property
+    def command(self):
+        # Follows whatever path the service configured on pytesseract
+        return pytesseract.pytesseract.tesseract_cmd
+
+    def available(self):
+        command = self.command
+        return bool(shutil.which(command) or os.path.isfile(command))
+
+    def recognize(self, image, psm):
+        # PGM needs no compression and is read by every Leptonica build
+        ok, encoded = cv2.imencode('.pgm', image)
+        if not ok:
+            raise ValueError("Could not encode image for OCR")
+        env = dict(os.environ, OMP_THREAD_LIMIT='1')  # parallelism comes from the pool
+        try:
+            # run() kills the child before re-raising, so a hung tesseract can't hold the worker
+            result = subprocess.run(
+                [self.command, 'stdin', 'stdout', '-l', self.language,
+                 '--oem', '3', '--psm', str(psm), '--dpi', str(self.dpi)],
+                input=encoded.tobytes(), capture_output=True, env=env, timeout=self.timeout
+            )
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"tesseract killed after {self.timeout:g}s")
+        if result.returncode != 0:
+            message = result.stderr.decode('utf-8', 'replace').strip()
+            raise RuntimeError(message or f"tesseract exited with {result.returncode}")
+        return result.stdout.decode('utf-8', 'replace').strip()
+
+    def close(self):
+        pass
+
+
+def self_test_image():
+    """Grayscale image with SELF_TEST_TEXT on it"""
+    image = Image.new('L', (400, 100), color=255)
+    try:
+        font = ImageFont.truetype("arial.ttf", 24)
+    except OSError:
+        font = ImageFont.load_default()
+    ImageDraw.Draw(image).text((10, 30), SELF_TEST_TEXT, fill=0, font=font)
+    return image
+
+
+class OCREngine:
+    """
+    Long-lived OCR workers behind one interface. Images are recognised on
+    a fixed pool of ``workers`` threads, each with its own in-process
+    tesserocr API (piped tesseract processes where tesserocr is missing);
+    at most ``queue_size``
+    images wait for them, beyond that callers get OCRBusy. Every region of
+    a batch counts as one image; a batch larger than the whole queue is
+    only admitted when the engine is idle.
+
+    health() is cheap enough for load balancer probes: it checks the
+    engine is usable and reports the last self-test, which actually runs
+    OCR at most once per self_test_ttl and refreshes in the background.
+    """
+
+    def __init__(self, backend=None, workers=OCR_WORKERS, queue_size=OCR_QUEUE, self_test_ttl=OCR_SELF_TEST_TTL):
+        if backend is None:
+            if tesserocr is not None:
+                backend = TesserocrBackend()
+            else:
+                logger.warning("tesserocr is not installed, OCR starts a tesseract process per image")
+                backend = TesseractCLIBackend()
+        self.backend = backend
+        self.workers = workers
+        self.self_test_ttl = self_test_ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+        self._capacity = workers + queue_size
+        self._in_flight = 0  # images admitted and not yet finished
+        self._lock = threading.Lock()
+        self._stages = {name: StageStats() for name in ('queue_wait', 'recognize', 'batch')}
+        self._counters = {'images': 0, 'batches': 0, 'rejected': 0, 'errors': 0}
+        self._self_test = None  # (passed, message, checked_at)
+        self._testing = False
+
+    def _record(self, stage, seconds):
+        with self._lock:
+            self._stages[stage].add(seconds)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _recognize(self, image, psm, submitted):
+        start = time.perf_counter()
+        self._record('queue_wait', start - submitted)
+        try:
+            return self.backend.recognize(image, psm)
+        except Exception:
+            self._count('errors')
+            raise
+        finally:
+            self._record('recognize', time.perf_counter() - start)
+
+    @property
+    def persistent(self):
+        """Whether recognition runs on warm workers (cheap per call) rather than a new process per call"""
+        return getattr(self.backend, 'persistent', False)
+
+    def recognize_batch(self, items, timeout=None):
+        """OCR (image, psm) pairs in parallel, texts returned in the same order"""
+        count = len(items)
+        with self._lock:
+            admitted = self._in_flight == 0 or self._in_flight + count <= self._capacity
+            if admitted:
+                self._in_flight += count
+            else:
+                self._counters['rejected'] += 1
+        if not admitted:
+            raise OCRBusy("OCR queue is full")
+        start = time.perf_counter()
+        futures = []
+        try:
+            for image, psm in items:
+                future = self._pool.submit(self._recognize, image, psm, start)
+                futures.append(future)
+                # Released when the image finishes or is cancelled, not when the caller stops waiting
+                future.add_done_callback(self._release)
+        finally:
+            if len(futures) < count:
+                self._release(None, count - len(futures))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            texts = [future.result(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+                     for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+        self._record('batch', time.perf_counter() - start)
+        self._count('batches')
+        self._count('images', count)
+        return texts
+
+    def _release(self, future, amount=1):
+        with self._lock:
+            self._in_flight -= amount
+
+    def recognize(self, image, psm=6, timeout=None):
+        return self.recognize_batch([(image, psm)], timeout)[0]
+
+    def run_self_test(self):
+        """OCR a rendered test image now and remember the outcome"""
+        try:
+            text = self.recognize(np.array(self_test_image()), psm=7, timeout=30)
+            passed = "Hello" in text
+            message = "Tesseract is working!" if passed else f"Tesseract test failed: {text}"
+        except OCRBusy:
+            # A full queue says nothing about whether OCR works: keep the last result and retry on a later probe
+            with self._lock:
+                result = self._self_test
+                self._testing = False
+            if result is not None:
+                return result[0], result[1]
+            return True, "OCR engine busy, self-test deferred"
+        except Exception as e:
+            passed, message = False, f"Tesseract test error: {str(e)}"
+        with self._lock:
+            self._self_test = (passed, message, time.time())
+            self._testing = False
+        return passed, message
+
+    def self_test(self):
+        """Last self-test result, running it on first use and refreshing it in the background when stale"""
+        with self._lock:
+            result = self._self_test
+            stale = result is not None and time.time() - result[2] > self.self_test_ttl
+            refresh = stale and not self._testing
+            if refresh:
+                self._testing = True
+        if result is None:
+            return self.run_self_test()
+        if refresh:
+            threading.Thread(target=self.run_self_test, name="ocr-self-test", daemon=True).start()
+        return result[0], result[1]
+
+    def health(self):
+        """Liveness plus the cached self-test; OCR only runs here on the very first call"""
+        available = self.backend.available()
+        if available:
+            passed, message = self.self_test()
+        else:
+            passed, message = False, "Tesseract not found"
+        with self._lock:
+            checked_at = self._self_test[2] if self._self_test else None
+        return {
+            'backend': self.backend.name,
+            'available': available,
+            'self_test_passed': passed,
+            'self_test': message,
+            'self_test_age': round(time.time() - checked_at, 1) if checked_at else None
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = self._in_flight
+            stats['stages'] = {name: stage.as_dict() for name, stage in self._stages.items()}
+        stats['backend'] = self.backend.name
+        stats['workers'] = self.workers
+        return stats
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
+
+
+# Shared engine used by the OCR pipeline
+ocr_engine = OCREngine()
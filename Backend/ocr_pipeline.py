@@ -0,0 +1,218 @@
+import io
+import os
+import time
+import threading
+import cv2
+import numpy as np
+from PIL import Image
+from transcoder import StageStats
+from ocr_engine import ocr_engine
+
+# Images are OCR'd with their long side at most this many pixels; smaller ones are enlarged towards OCR_MIN_SIDE
+OCR_MAX_SIDE = int(os.environ.get("OCR_MAX_SIDE", "2400"))
+OCR_MIN_SIDE = int(os.environ.get("OCR_MIN_SIDE", "1000"))
+# Seconds allowed for OCR'ing all regions of one image
+OCR_TIMEOUT = float(os.environ.get("OCR_TIMEOUT", "60"))
+# More regions than this and the image is OCR'd as a whole
+OCR_MAX_REGIONS = int(os.environ.get("OCR_MAX_REGIONS", "48"))
+
+# Text regions are searched for on a copy no larger than this
+DETECT_SIDE = 1024
+# Regions shorter than this are enlarged before OCR
+MIN_REGION_HEIGHT = 32
+
+# Page segmentation modes
+PSM_BLOCK = 6
+PSM_LINE = 7
+
+
+def decode_image(image_data, max_side=OCR_MAX_SIDE, min_side=OCR_MIN_SIDE):
+    """
+    Grayscale image with its long side scaled into [min_side, max_side].
+    Large JPEGs are decoded straight at 1/2, 1/4 or 1/8 size, which skips
+    most of the decoding work for phone photos. Returns None if the data
+    is not an image.
+    """
+    flag = cv2.IMREAD_GRAYSCALE
+    try:
+        with Image.open(io.BytesIO(image_data)) as probe:
+            if probe.format == 'JPEG':
+                long_side = max(probe.size)
+                for factor, reduced in ((8, cv2.IMREAD_REDUCED_GRAYSCALE_8), (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+                                        (2, cv2.IMREAD_REDUCED_GRAYSCALE_2)):
+                    if long_side / factor >= max_side:
+                        flag = reduced
+                        break
+    except Exception:
+        pass  # let OpenCV decide
+
+    gray = cv2.imdecode(np.frombuffer(image_data, np.uint8), flag)
+    if gray is None:
+        return None
+
+    height, width = gray.shape
+    long_side = max(height, width)
+    if long_side > max_side:
+        scale = max_side / long_side
+        gray = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    elif long_side < min_side:
+        scale = min(2.0, min_side / long_side)
+        gray = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_CUBIC)
+    return gray
+
+
+def binarize(gray):
+    """Denoise and threshold to black text on white (Otsu)"""
+    denoised = cv2.medianBlur(gray, 3)
+    return cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def _line_boxes(gray):
+    """Bounding boxes of text lines: gradient, threshold, then close gaps between characters"""
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    mask = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    kernel_width = max(9, gray.shape[1] // 80)
+    joined = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_width, 1)))
+    contours, _ = cv2.findContours(joined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    max_height = gray.shape[0] // 3
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < 6 or w < 8 or h > max_height or (h > 3 * w and h > 40):
+            continue
+        # Text strokes fill a good part of their box; edges of photos and frames do not
+        if cv2.countNonZero(mask[y:y + h, x:x + w]) < 0.2 * w * h:
+            continue
+        boxes.append([x, y, x + w, y + h, 1, h])  # left, top, right, bottom, lines, last line height
+    return boxes
+
+
+def _group_blocks(lines):
+    """Stack lines that sit close below each other, overlap horizontally and have similar height"""
+    blocks = []
+    for line in sorted(lines, key=lambda box: box[1]):
+        left, top, right, bottom, _, height = line
+        for block in blocks:
+            gap = top - block[3]
+            if (-height // 2 <= gap < 0.8 * min(height, block[5]) and left < block[2] and right > block[0]
+                    and max(height, block[5]) < 2 * min(height, block[5])):
+                block[0], block[1] = min(block[0], left), min(block[1], top)
+                block[2], block[3] = max(block[2], right), max(block[3], bottom)
+                block[4] += 1
+                block[5] = height
+                break
+        else:
+            blocks.append(list(line))
+    return blocks
+
+
+def reading_order(blocks):
+    """Sort blocks into rows top to bottom (blocks overlapping vertically share a row), left to right within a row"""
+    rows = []
+    for block in sorted(blocks, key=lambda box: box[1]):
+        row = rows[-1] if rows else None
+        if row and block[1] < row['bottom'] and block[3] - row['bottom'] < (block[3] - block[1]) / 2:
+            row['blocks'].append(block)
+            row['bottom'] = max(row['bottom'], block[3])
+        else:
+            rows.append({'bottom': block[3], 'blocks': [block]})
+    return [block for row in rows for block in sorted(row['blocks'], key=lambda box: box[0])]
+
+
+def detect_text_regions(gray):
+    """
+    Text blocks as (left, top, right, bottom, psm) in reading order, psm
+    being single-line or uniform-block mode for Tesseract.
+    """
+    height, width = gray.shape
+    scale = min(1.0, DETECT_SIDE / max(height, width))
+    small = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA) \
+        if scale < 1.0 else gray
+
+    regions = []
+    for left, top, right, bottom, lines, line_height in reading_order(_group_blocks(_line_boxes(small))):
+        pad = max(2, line_height // 4)
+        regions.append((
+            max(0, int((left - pad) / scale)),
+            max(0, int((top - pad) / scale)),
+            min(width, int((right + pad) / scale)),
+            min(height, int((bottom + pad) / scale)),
+            PSM_LINE if lines == 1 else PSM_BLOCK
+        ))
+    return regions
+
+
+class OCRPipeline:
+    """
+    Staged OCR: decode and normalise size, find text blocks, binarize each
+    one and OCR them in parallel on the warm OCR engine with a page
+    segmentation mode suited to the block, then join the text in reading
+    order. Images without usable regions (or with very many) are OCR'd as
+    a whole, and so is every image when the engine starts a process per
+    call instead of using warm workers.
+    """
+
+    def __init__(self, engine=ocr_engine, timeout=OCR_TIMEOUT, max_regions=OCR_MAX_REGIONS):
+        self.engine = engine
+        self.timeout = timeout
+        self.max_regions = max_regions
+        self._lock = threading.Lock()
+        self._stages = {name: StageStats() for name in ('decode', 'detect', 'ocr', 'total')}
+        self._counters = {'images': 0, 'regions': 0, 'full_frame': 0, 'undecodable': 0}
+
+    def _record(self, stage, seconds):
+        with self._lock:
+            self._stages[stage].add(seconds)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _ocr_regions(self, gray, regions):
+        crops = []
+        for left, top, right, bottom, psm in regions:
+            crop = gray[top:bottom, left:right]
+            if crop.shape[0] < MIN_REGION_HEIGHT:
+                factor = MIN_REGION_HEIGHT / crop.shape[0]
+                crop = cv2.resize(crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+            crops.append((binarize(crop), psm))
+        return self.engine.recognize_batch(crops, timeout=self.timeout)
+
+    def extract(self, image_data):
+        """Text found in an image ('' if none), None if the data can't be decoded"""
+        start = time.perf_counter()
+        gray = decode_image(image_data)
+        self._record('decode', time.perf_counter() - start)
+        if gray is None:
+            self._count('undecodable')
+            return None
+        self._count('images')
+
+        regions = None
+        if self.engine.persistent:
+            detect_start = time.perf_counter()
+            regions = detect_text_regions(gray)
+            self._record('detect', time.perf_counter() - detect_start)
+        if not regions or len(regions) > self.max_regions:
+            self._count('full_frame')
+            regions = [(0, 0, gray.shape[1], gray.shape[0], PSM_BLOCK)]
+        else:
+            self._count('regions', len(regions))
+
+        ocr_start = time.perf_counter()
+        texts = self._ocr_regions(gray, regions)
+        self._record('ocr', time.perf_counter() - ocr_start)
+        self._record('total', time.perf_counter() - start)
+        return "\n".join(text for text in texts if text)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['stages'] = {name: stage.as_dict() for name, stage in self._stages.items()}
+        stats['engine'] = self.engine.stats()
+        return stats
+
+
+# Shared pipeline used by the image service
+ocr_pipeline = OCRPipeline()
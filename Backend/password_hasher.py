@@ -0,0 +1,159 @@
+import os
+import hmac
+import base64
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+logger = logging.getLogger(__name__)
+
+# scrypt work factor as log2(N); each step doubles CPU time and memory
+PASSWORD_HASH_COST = int(os.environ.get("PASSWORD_HASH_COST", "14"))
+PASSWORD_HASH_BLOCK_SIZE = int(os.environ.get("PASSWORD_HASH_BLOCK_SIZE", "8"))
+PASSWORD_HASH_PARALLELISM = int(os.environ.get("PASSWORD_HASH_PARALLELISM", "1"))
+# Hashing threads and how many hashes may wait for one before callers are turned away
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", "64"))
+# Seconds a request waits for its hash before giving up
+PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10"))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+SCHEME = 'scrypt'
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool is saturated or a hash timed out"""
+
+
+def b64encode(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def is_legacy_hash(stored):
+    """Unsalted SHA-256 hex digests written before password_hasher existed"""
+    return len(stored) == 64 and all(c in '0123456789abcdef' for c in stored)
+
+
+def scrypt_key(password, salt, cost, block_size, parallelism):
+    return hashlib.scrypt(
+        password.encode('utf-8'), salt=salt, n=1 << cost, r=block_size, p=parallelism,
+        maxmem=256 * block_size * (1 << cost) + (1 << 20), dklen=KEY_BYTES
+    )
+
+
+class PasswordHasher:
+    """
+    Salted scrypt password hashes stored as
+    ``scrypt$<cost>$<block size>$<parallelism>$<salt>$<key>``. Hashing runs on
+    a bounded thread pool (hashlib releases the GIL) so slow hashes never
+    occupy more than ``workers`` cores and a flood of logins is rejected
+    instead of queueing forever.
+    """
+
+    def __init__(self, cost=PASSWORD_HASH_COST, block_size=PASSWORD_HASH_BLOCK_SIZE,
+                 parallelism=PASSWORD_HASH_PARALLELISM, workers=PASSWORD_HASH_WORKERS,
+                 queue_size=PASSWORD_HASH_QUEUE, timeout=PASSWORD_HASH_TIMEOUT):
+        self.cost = cost
+        self.block_size = block_size
+        self.parallelism = parallelism
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._counters = {'hashes': 0, 'verifications': 0, 'rehashes': 0, 'rejected': 0}
+
+    # Synchronous primitives (run on the pool by the public methods)
+
+    def _hash(self, password):
+        salt = os.urandom(SALT_BYTES)
+        key = scrypt_key(password, salt, self.cost, self.block_size, self.parallelism)
+        return f"{SCHEME}${self.cost}${self.block_size}${self.parallelism}${b64encode(salt)}${b64encode(key)}"
+
+    def _verify(self, password, stored):
+        if is_legacy_hash(stored):
+            candidate = hashlib.sha256(password.encode('utf-8')).hexdigest()
+            return hmac.compare_digest(candidate, stored)
+        try:
+            scheme, cost, block_size, parallelism, salt, key = stored.split('$')
+            if scheme != SCHEME:
+                return False
+            candidate = scrypt_key(password, b64decode(salt), int(cost), int(block_size), int(parallelism))
+        except ValueError:
+            logger.warning("Unreadable password hash")
+            return False
+        return hmac.compare_digest(candidate, b64decode(key))
+
+    def needs_rehash(self, stored):
+        """True for legacy hashes and hashes made with other parameters"""
+        if is_legacy_hash(stored):
+            return True
+        parts = stored.split('$')
+        return len(parts) != 6 or parts[:4] != [SCHEME, str(self.cost), str(self.block_size), str(self.parallelism)]
+
+    # Pool-backed API
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counters['rejected'] += 1
+            raise HasherBusy("Too many password hashes in progress")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._counters['rejected'] += 1
+            raise HasherBusy("Password hashing timed out")
+
+    def hash(self, password):
+        """Hash a new password with the current work factor"""
+        with self._lock:
+            self._counters['hashes'] += 1
+        return self._run(self._hash, password)
+
+    def verify(self, password, stored):
+        """Check a password against a stored hash (legacy SHA-256 or scrypt)"""
+        with self._lock:
+            self._counters['verifications'] += 1
+        return self._run(self._verify, password, stored)
+
+    def verify_and_update(self, password, stored):
+        """
+        Verify a password and, when the stored hash is legacy or uses other
+        parameters, return a fresh hash to persist: (valid, new_hash or None).
+        If the pool is too busy to rehash, the upgrade waits for a later login.
+        """
+        if not self.verify(password, stored):
+            return False, None
+        if not self.needs_rehash(stored):
+            return True, None
+        try:
+            new_hash = self.hash(password)
+        except HasherBusy:
+            logger.info("Password rehash deferred, hashing pool is busy")
+            return True, None
+        with self._lock:
+            self._counters['rehashes'] += 1
+        return True, new_hash
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['cost'] = self.cost
+        stats['workers'] = self._executor._max_workers
+        return stats
+
+
+# Shared hasher used by the auth service
+password_hasher = PasswordHasher()
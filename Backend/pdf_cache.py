@@ -0,0 +1,245 @@
+import io
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet
+from PyPDF2 import PdfReader, PdfWriter
+from singleflight import SingleFlight
+from phrasebook_store import phrasebook_store
+
+logger = logging.getLogger(__name__)
+
+# Directory holding rendered phrasebooks and category fragments, named by content key
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", "pdf_cache")
+# Background threads re-rendering phrasebooks whose data changed
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", "2"))
+# Seconds a replaced rendering stays on disk, so downloads already handed its path can still send it
+PDF_RETIRE_GRACE = float(os.environ.get("PDF_RETIRE_GRACE", "300"))
+
+
+def _category_story(phrase_set, category_id, styles):
+    story = [Paragraph(phrasebook_store.category_name(category_id), styles['Heading2']), Spacer(1, 6)]
+    for phrase in phrase_set.by_category[category_id]:
+        phrase_text = f"<b>{phrase.english}</b>: {phrase.translation} ({phrase.pronunciation})"
+        story.append(Paragraph(phrase_text, styles['BodyText']))
+        story.append(Spacer(1, 3))
+    story.append(Spacer(1, 12))
+    return story
+
+
+def _build(story, on_page=None):
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    if on_page:
+        doc.build(story, onFirstPage=on_page, onLaterPages=on_page)
+    else:
+        doc.build(story)
+    return buffer.getvalue()
+
+
+def render_phrasebook(phrase_set):
+    """The whole phrasebook of a language as one flowing document"""
+    styles = getSampleStyleSheet()
+    story = [Paragraph(f"Phrasebook - {phrase_set.language.upper()}", styles['Title']), Spacer(1, 12)]
+    for category_id in phrase_set.by_category:
+        story.extend(_category_story(phrase_set, category_id, styles))
+    return _build(story)
+
+
+def render_fragment(phrase_set, category_id):
+    """One category on its own pages, with the phrasebook title as a running header"""
+    styles = getSampleStyleSheet()
+    title = f"Phrasebook - {phrase_set.language.upper()}"
+
+    def header(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica-Bold', 10)
+        canvas.drawString(doc.leftMargin, doc.pagesize[1] - doc.topMargin / 2, title)
+        canvas.restoreState()
+
+    return _build(_category_story(phrase_set, category_id, styles), header)
+
+
+def merge_pdfs(documents):
+    """Concatenate PDF documents (bytes) page by page"""
+    writer = PdfWriter()
+    for document in documents:
+        for page in PdfReader(io.BytesIO(document)).pages:
+            writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def pdf_key(kind, language, content_hash, categories=()):
+    """Content address of a rendering"""
+    return hashlib.sha256(json.dumps([kind, language, content_hash, list(categories)]).encode('utf-8')).hexdigest()
+
+
+class PhrasebookPDFCache:
+    """
+    Rendered phrasebook PDFs on disk, keyed by language, category subset and
+    the content hash of the phrase data, so a download is a file send
+    instead of a ReportLab build. Concurrent misses share one render. When
+    the data changes, the previous PDF for the same language/subset keeps
+    being served while the new one renders in the background. A subset of
+    categories is stitched from per-category fragments, each rendered once
+    and reused by every subset that includes it. Replaced renderings are
+    deleted once they have been out of use for ``retire_grace`` seconds.
+    """
+
+    def __init__(self, store=phrasebook_store, directory=PDF_CACHE_DIR, workers=PDF_RENDER_WORKERS,
+                 retire_grace=PDF_RETIRE_GRACE):
+        self.store = store
+        self.directory = os.path.abspath(directory)
+        self.retire_grace = retire_grace
+        self._lock = threading.Lock()
+        self._latest = {}  # (language, categories) or fragment slot -> key of the newest rendering on disk
+        self._refreshing = set()
+        self._retired = []  # (key, retired_at) of replaced renderings, oldest first
+        self._flight = SingleFlight()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-render")
+        self._counters = {'hits': 0, 'stale_hits': 0, 'renders': 0, 'fragment_renders': 0, 'errors': 0}
+        os.makedirs(self.directory, exist_ok=True)
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _store(self, key, document):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(document)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _fragment(self, phrase_set, category_id):
+        key = pdf_key('fragment', phrase_set.language, phrase_set.content_hash, [category_id])
+        try:
+            with open(self.path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            pass
+        document = render_fragment(phrase_set, category_id)
+        self._count('fragment_renders')
+        self._store(key, document)
+        self._publish(('fragment', phrase_set.language, category_id), key)
+        return document
+
+    def _render(self, phrase_set, categories, key):
+        if os.path.exists(self.path(key)):
+            return  # rendered by another worker process sharing the directory
+        if categories:
+            document = merge_pdfs([self._fragment(phrase_set, category_id) for category_id in categories])
+        else:
+            document = render_phrasebook(phrase_set)
+        self._count('renders')
+        self._store(key, document)
+
+    def _publish(self, slot, key):
+        """Make key the rendering served for slot; the one it replaces is deleted after the grace period"""
+        now = time.time()
+        with self._lock:
+            previous = self._latest.get(slot)
+            self._latest[slot] = key
+            if previous and previous != key:
+                self._retired.append((previous, now))
+            expired = []
+            while self._retired and now - self._retired[0][1] >= self.retire_grace:
+                expired.append(self._retired.pop(0)[0])
+            if expired:
+                # Content-addressed: a key can be current again (e.g. data reverted)
+                current = set(self._latest.values())
+                expired = [old for old in expired if old not in current]
+        for old in expired:
+            try:
+                os.unlink(self.path(old))
+            except OSError:
+                pass
+
+    def _refresh(self, phrase_set, categories, key, slot):
+        try:
+            self._flight.do(key, self._render, phrase_set, categories, key)
+            self._publish(slot, key)
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"Background phrasebook render for '{phrase_set.language}' failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(slot)
+
+    def get(self, language, categories=None):
+        """
+        Path and key (usable as ETag) of the phrasebook PDF for a language,
+        optionally limited to some category ids; None for an unknown language.
+        """
+        phrase_set = self.store.get(language)
+        if phrase_set is None:
+            return None
+        # Subsets are kept in phrasebook order; all categories is the full document
+        if categories:
+            wanted = set(categories)
+            categories = tuple(category_id for category_id in phrase_set.by_category if category_id in wanted)
+            if len(categories) == len(phrase_set.by_category):
+                categories = ()
+        else:
+            categories = ()
+
+        key = pdf_key('subset' if categories else 'full', language, phrase_set.content_hash, categories)
+        slot = (language, categories)
+        if os.path.exists(self.path(key)):
+            self._count('hits')
+            self._publish(slot, key)
+            return self.path(key), key
+
+        with self._lock:
+            stale = self._latest.get(slot)
+        if stale and os.path.exists(self.path(stale)):
+            # Data changed: serve the previous rendering until the new one is ready
+            with self._lock:
+                refresh = slot not in self._refreshing
+                self._refreshing.add(slot)
+            if refresh:
+                self._pool.submit(self._refresh, phrase_set, categories, key, slot)
+            self._count('stale_hits')
+            return self.path(stale), stale
+
+        self._flight.do(key, self._render, phrase_set, categories, key)
+        self._publish(slot, key)
+        return self.path(key), key
+
+    def preload(self, language):
+        """Render a language's full phrasebook in the background (e.g. at startup)"""
+        return self._pool.submit(self.get, language)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['documents'] = len(self._latest)
+            stats['refreshing'] = len(self._refreshing)
+            stats['retired'] = len(self._retired)
+        stats['directory'] = self.directory
+        return stats
+
+
+# Shared cache used by the Phrasebook service
+pdf_cache = PhrasebookPDFCache()
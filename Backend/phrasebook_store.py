@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Directory with base.json (categories + English phrases) and one <code>.json per language
+PHRASEBOOK_DATA_DIR = os.environ.get(
+    "PHRASEBOOK_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrasebook_data")
+)
+# Languages kept in memory; the least recently used one is dropped beyond this
+PHRASEBOOK_MAX_LANGUAGES = int(os.environ.get("PHRASEBOOK_MAX_LANGUAGES", "8"))
+# Seconds between checks of a language file for changes on disk
+PHRASEBOOK_RELOAD_INTERVAL = float(os.environ.get("PHRASEBOOK_RELOAD_INTERVAL", "30"))
+
+BASE_FILE = "base.json"
+
+# One phrase in one language; id, category and English text are shared with the base data
+Phrase = namedtuple('Phrase', ['id', 'category', 'english', 'translation', 'pronunciation'])
+
+
+def phrase_dict(phrase):
+    """API representation of a phrase"""
+    return {
+        "id": phrase.id,
+        "english": phrase.english,
+        "translation": phrase.translation,
+        "pronunciation": phrase.pronunciation
+    }
+
+
+class PhraseSet:
+    """All phrases of one language, indexed by id and by category"""
+
+    __slots__ = ('language', 'phrases', 'by_id', 'by_category', 'content_hash', 'mtime', 'checked_at')
+
+    def __init__(self, language, phrases, category_ids, content_hash, mtime):
+        self.language = language
+        self.phrases = tuple(phrases)
+        self.by_id = {phrase.id: phrase for phrase in self.phrases}
+        grouped = {category_id: [] for category_id in category_ids}
+        for phrase in self.phrases:
+            grouped[phrase.category].append(phrase)
+        self.by_category = {category_id: tuple(items) for category_id, items in grouped.items()}
+        self.content_hash = content_hash
+        self.mtime = mtime
+        self.checked_at = time.monotonic()
+
+    def as_dict(self, category=None):
+        """{category_id: [phrase dicts]} for every category, or just one"""
+        category_ids = [category] if category else self.by_category
+        return {category_id: [phrase_dict(phrase) for phrase in self.by_category[category_id]]
+                for category_id in category_ids}
+
+
+class PhrasebookStore:
+    """
+    Phrase data for many languages read from JSON files. The base file
+    (categories, ids, English text) is loaded once; each language is parsed
+    on first use, concurrent first requests share one load, and at most
+    max_languages stay in memory. Files are re-read when their mtime
+    changes, so data can be updated without a restart.
+    """
+
+    def __init__(self, directory=PHRASEBOOK_DATA_DIR, max_languages=PHRASEBOOK_MAX_LANGUAGES,
+                 reload_interval=PHRASEBOOK_RELOAD_INTERVAL):
+        self.directory = os.path.abspath(directory)
+        self.max_languages = max_languages
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._sets = OrderedDict()  # code -> PhraseSet, least recently used first
+        self._flight = SingleFlight()
+        self._counters = {'hits': 0, 'loads': 0, 'reloads': 0, 'evictions': 0}
+        self._load_base()
+
+    def _path(self, code):
+        return os.path.join(self.directory, f"{code}.json")
+
+    def _load_base(self):
+        with open(os.path.join(self.directory, BASE_FILE), 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        self._base_hash = hashlib.sha256(raw).digest()
+        self._categories = data['categories']
+        self._category_names = {category['id']: category['name'] for category in self._categories}
+        # id -> (category, english), in document order
+        self._base = {
+            phrase['id']: (sys.intern(phrase['category']), phrase['english'])
+            for phrase in data['phrases']
+        }
+
+    def _load(self, code):
+        path = self._path(code)
+        with open(path, 'rb') as f:
+            raw = f.read()
+            mtime = os.fstat(f.fileno()).st_mtime
+        data = json.loads(raw)
+
+        translations = {entry['id']: entry for entry in data['phrases']}
+        phrases = []
+        for phrase_id, (category_id, english) in self._base.items():
+            entry = translations.get(phrase_id)
+            if entry is None or not entry.get('translation'):
+                continue  # not translated yet
+            phrases.append(Phrase(phrase_id, category_id, english,
+                                  entry['translation'], entry.get('pronunciation', '')))
+
+        content_hash = hashlib.sha256(self._base_hash + raw).hexdigest()
+        phrase_set = PhraseSet(code, phrases, self._category_names, content_hash, mtime)
+
+        evicted = []
+        with self._lock:
+            self._counters['reloads' if code in self._sets else 'loads'] += 1
+            self._sets[code] = phrase_set
+            self._sets.move_to_end(code)
+            while len(self._sets) > self.max_languages:
+                evicted.append(self._sets.popitem(last=False)[0])
+                self._counters['evictions'] += 1
+        for evicted_code in evicted:
+            logger.info(f"Unloaded phrasebook language '{evicted_code}'")
+        return phrase_set
+
+    def _is_stale(self, phrase_set):
+        now = time.monotonic()
+        if now - phrase_set.checked_at < self.reload_interval:
+            return False
+        phrase_set.checked_at = now
+        try:
+            return os.path.getmtime(self._path(phrase_set.language)) != phrase_set.mtime
+        except OSError:
+            return False  # removed from disk, keep serving what we have
+
+    def languages(self):
+        """Codes of every language with a data file"""
+        return sorted(name[:-5] for name in os.listdir(self.directory)
+                      if name.endswith('.json') and name != BASE_FILE)
+
+    def has_language(self, code):
+        with self._lock:
+            if code in self._sets:
+                return True
+        return (bool(code) and code != BASE_FILE[:-5] and os.path.basename(code) == code
+                and os.path.isfile(self._path(code)))
+
+    def get(self, code):
+        """PhraseSet for a language, loading it on first use; None if there is no data for it"""
+        with self._lock:
+            phrase_set = self._sets.get(code)
+            if phrase_set is not None:
+                self._sets.move_to_end(code)
+                self._counters['hits'] += 1
+        if phrase_set is not None and not self._is_stale(phrase_set):
+            return phrase_set
+        if phrase_set is None and not self.has_language(code):
+            return None
+        try:
+            return self._flight.do(code, self._load, code)
+        except (OSError, ValueError, KeyError) as e:
+            if phrase_set is None:
+                raise
+            logger.warning(f"Could not reload phrasebook '{code}', keeping the loaded copy: {e}")
+            return phrase_set
+
+    def categories(self):
+        return self._categories
+
+    def category_name(self, category_id):
+        return self._category_names.get(category_id, category_id)
+
+    def has_category(self, category_id):
+        return category_id in self._category_names
+
+    def has_phrase(self, phrase_id):
+        """Whether a phrase id exists (ids are shared by every language)"""
+        return phrase_id in self._base
+
+    def phrase(self, code, phrase_id):
+        """One phrase by id, None if the language or phrase is unknown"""
+        phrase_set = self.get(code)
+        return phrase_set.by_id.get(phrase_id) if phrase_set else None
+
+    def content_hash(self, code):
+        phrase_set = self.get(code)
+        return phrase_set.content_hash if phrase_set else None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['loaded'] = list(self._sets)
+        stats['max_languages'] = self.max_languages
+        stats['phrases'] = len(self._base)
+        return stats
+
+
+# Shared store used by the Phrasebook service
+phrasebook_store = PhrasebookStore()
+
+
+def translate_language(code, store=phrasebook_store):
+    """Machine-translate the English phrases into a new <code>.json (pronunciations left empty)"""
+    from translator_registry import get_translator
+    translator = get_translator('en', code)
+    entries = [
+        {"id": phrase_id, "translation": translator.translate(english), "pronunciation": ""}
+        for phrase_id, (_, english) in store._base.items()
+    ]
+    lines = ["{", f' "language": {json.dumps(code)},', ' "phrases": [']
+    lines.append(",\n".join("  " + json.dumps(entry, ensure_ascii=False) for entry in entries))
+    lines.extend([" ]", "}"])
+    with open(store._path(code), 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    return len(entries)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Phrasebook data")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    subcommands.add_parser('list', help="show available languages")
+    translate = subcommands.add_parser('translate', help="create a language file by machine translation")
+    translate.add_argument('language')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for code in phrasebook_store.languages():
+            print(f"{code}: {len(phrasebook_store.get(code).phrases)} phrases")
+    else:
+        count = translate_language(args.language)
+        print(f"Wrote {count} phrases to {phrasebook_store._path(args.language)}")
@@ -0,0 +1,357 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+# Rolling window of samples kept per provider and language pair
+WINDOW_SIZE = int(os.environ.get("ROUTER_WINDOW_SIZE", "200"))
+# Samples older than this many seconds are ignored, so a recovered provider can win back traffic
+SAMPLE_MAX_AGE = float(os.environ.get("ROUTER_SAMPLE_MAX_AGE", "300"))
+# Samples needed before measured latency/errors override the static preference
+MIN_SAMPLES = int(os.environ.get("ROUTER_MIN_SAMPLES", "10"))
+# Consecutive failures that open a provider's circuit breaker
+FAILURE_THRESHOLD = int(os.environ.get("ROUTER_FAILURE_THRESHOLD", "5"))
+# Seconds an open breaker waits before letting a probe request through
+BREAKER_COOLDOWN = float(os.environ.get("ROUTER_BREAKER_COOLDOWN", "30"))
+# Send a hedge request to the next provider after this many seconds (0 disables hedging)
+HEDGE_AFTER = float(os.environ.get("ROUTER_HEDGE_AFTER", "1.5"))
+# Lower bound for the adaptive hedge deadline
+MIN_HEDGE_AFTER = float(os.environ.get("ROUTER_MIN_HEDGE_AFTER", "0.2"))
+
+# Stats bucket for language codes the router wasn't told about
+OTHER_LANGUAGE = 'other'
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ProviderStats:
+    """Rolling latency and error samples for one provider and language pair"""
+
+    def __init__(self, window=WINDOW_SIZE, max_age=SAMPLE_MAX_AGE):
+        self.samples = deque(maxlen=window)  # (timestamp, latency, ok)
+        self.max_age = max_age
+
+    def record(self, latency, ok):
+        self.samples.append((time.time(), latency, ok))
+
+    def recent(self):
+        cutoff = time.time() - self.max_age
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return self.samples
+
+    def summary(self):
+        samples = self.recent()
+        latencies = [latency for _, latency, ok in samples if ok]
+        count = len(samples)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        p50 = percentile(latencies, 50)
+        p95 = percentile(latencies, 95)
+        p99 = percentile(latencies, 99)
+        return {
+            'samples': count,
+            'error_rate': round(errors / count, 4) if count else 0.0,
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'p99_ms': round(p99 * 1000, 1) if p99 is not None else None,
+        }
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open probe after cooldown"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    def allow(self, now):
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and now - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record(self, ok, now):
+        if ok:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+            return
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = now
+            self.probe_in_flight = False
+
+
+class ProviderRouter:
+    """
+    Choose the provider order per language pair from rolling latency and
+    error rates, skip providers whose circuit breaker is open and hedge
+    slow requests to the next provider after a deadline (counted from
+    when the call actually starts, not while it waits for a pool thread).
+
+    Language codes come from request bodies, so stats are only kept per
+    pair of ``languages``; any other code is counted as OTHER_LANGUAGE.
+    """
+
+    def __init__(self, providers, preferred_order, languages, hedge_after=HEDGE_AFTER, max_workers=32):
+        self.providers = dict(providers)  # name -> callable(text, target_lang, source_lang)
+        self.preferred_order = preferred_order  # callable(target_lang) -> [name, ...]
+        self.languages = frozenset(languages)
+        self.hedge_after = hedge_after
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._breakers = {name: CircuitBreaker() for name in self.providers}
+        self._counters = {'hedged': 0, 'hedge_wins': 0, 'short_circuited': 0}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="provider")
+        self._background = set()  # async hedge requests still running after the winner returned
+
+    def _stats_key(self, name, source_lang, target_lang):
+        known = self.languages
+        return (name, source_lang if source_lang in known else OTHER_LANGUAGE,
+                target_lang if target_lang in known else OTHER_LANGUAGE)
+
+    def _pair_stats(self, name, source_lang, target_lang):
+        key = self._stats_key(name, source_lang, target_lang)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = ProviderStats()
+            self._stats[key] = stats
+        return stats
+
+    def record(self, name, source_lang, target_lang, latency, ok):
+        """Record the outcome of one upstream call"""
+        with self._lock:
+            self._pair_stats(name, source_lang, target_lang).record(latency, ok)
+            self._breakers[name].record(ok, time.time())
+
+    def allow(self, name):
+        """Whether the provider's breaker lets a request through right now"""
+        with self._lock:
+            allowed = self._breakers[name].allow(time.time())
+            if not allowed:
+                self._counters['short_circuited'] += 1
+            return allowed
+
+    def order(self, target_lang, source_lang='auto'):
+        """Providers for a language pair, best first"""
+        preferred = self.preferred_order(target_lang)
+        with self._lock:
+            def score(item):
+                rank, name = item
+                stats = self._stats.get(self._stats_key(name, source_lang, target_lang))
+                if stats is None or len(stats.recent()) < MIN_SAMPLES:
+                    return (0, rank, 0.0)
+                summary = stats.summary()
+                p50 = summary['p50_ms'] if summary['p50_ms'] is not None else float('inf')
+                # Providers failing more than a quarter of calls go behind healthy ones
+                return (1 if summary['error_rate'] > 0.25 else 0, p50, rank)
+
+            ranked = sorted(enumerate(preferred), key=score)
+            order = [name for _, name in ranked]
+            # Providers with an open breaker are tried last
+            open_names = [n for n in order if self._breakers[n].state == CircuitBreaker.OPEN]
+        return [n for n in order if n not in open_names] + open_names
+
+    def hedge_delay(self, name, source_lang, target_lang):
+        """Seconds to wait on a provider before hedging to the next one"""
+        if not self.hedge_after:
+            return None
+        with self._lock:
+            stats = self._stats.get(self._stats_key(name, source_lang, target_lang))
+            if stats is None or len(stats.recent()) < MIN_SAMPLES:
+                return self.hedge_after
+            p95 = stats.summary()['p95_ms']
+        if p95 is None:
+            return self.hedge_after
+        return min(self.hedge_after, max(MIN_HEDGE_AFTER, p95 / 1000))
+
+    def _finish_call(self, name, source_lang, target_lang, start, result=None, error=None):
+        """Record one upstream call's latency and outcome, return the result or raise"""
+        latency = time.perf_counter() - start
+        if error is not None:
+            self.record(name, source_lang, target_lang, latency, False)
+            logger.warning(f"API {name} failed: {error}")
+            raise error
+        ok = bool(result and result['text'].strip())
+        self.record(name, source_lang, target_lang, latency, ok)
+        if not ok:
+            raise Exception(f"Empty result from {name}")
+        return result
+
+    def _timed_call(self, name, text, target_lang, source_lang, started=None):
+        start = time.perf_counter()
+        if started is not None:
+            started.append(start)  # tells translate() the hedge deadline is now running
+        try:
+            result = self.providers[name](text, target_lang, source_lang)
+        except Exception as e:
+            return self._finish_call(name, source_lang, target_lang, start, error=e)
+        return self._finish_call(name, source_lang, target_lang, start, result)
+
+    async def _timed_call_async(self, provider, name, text, target_lang, source_lang):
+        start = time.perf_counter()
+        try:
+            result = await provider(text, target_lang, source_lang)
+        except Exception as e:
+            return self._finish_call(name, source_lang, target_lang, start, error=e)
+        return self._finish_call(name, source_lang, target_lang, start, result)
+
+    def call(self, name, text, target_lang, source_lang='auto'):
+        """Call a single provider, recording its latency and outcome"""
+        return self._timed_call(name, text, target_lang, source_lang)
+
+    # Hedging bookkeeping shared by translate() and translate_async()
+
+    def _next_allowed(self, candidates):
+        """Pop candidates until one whose breaker lets the request through, None if none left"""
+        while candidates:
+            name = candidates.pop(0)
+            if self.allow(name):
+                return name
+        return None
+
+    def _note_hedge(self):
+        with self._lock:
+            self._counters['hedged'] += 1
+
+    def _note_winner(self, winner, primary, hedged):
+        if hedged and winner != primary:
+            with self._lock:
+                self._counters['hedge_wins'] += 1
+
+    def translate(self, text, target_lang, source_lang='auto'):
+        """Translate through the best available provider, None if every provider failed"""
+        candidates = self.order(target_lang, source_lang)
+        pending = {}  # future -> provider name
+        primary = None
+        hedged = False
+        launch = True
+        started = []  # start time of the newest call, once a pool thread picks it up
+
+        while candidates or pending:
+            # Launch the next provider whose breaker lets the request through
+            if launch:
+                name = self._next_allowed(candidates)
+                if name is not None:
+                    primary = primary or name
+                    started = []
+                    future = self._executor.submit(self._timed_call, name, text, target_lang, source_lang, started)
+                    pending[future] = name
+            if not pending:
+                break
+
+            # Wait for a result, or hedge to the next provider once the deadline passes
+            timeout = self.hedge_delay(name, source_lang, target_lang) if candidates else None
+            if timeout is not None and started:
+                timeout = max(0.0, started[0] + timeout - time.perf_counter())
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # A call still queued for a pool thread hasn't been slow yet, keep waiting for it
+                launch = bool(started)
+                if launch:
+                    hedged = True
+                    self._note_hedge()
+                continue
+            launch = True
+
+            for future in done:
+                winner = pending.pop(future)
+                if future.exception() is None:
+                    self._note_winner(winner, primary, hedged)
+                    return future.result()
+
+        return None
+
+    async def translate_async(self, text, target_lang, source_lang='auto', providers=None):
+        """
+        translate() for asyncio servers: same ordering, breakers, hedging and
+        stats, calling ``providers`` (name -> coroutine function) instead of
+        the sync callables. Losing hedge requests finish in the background so
+        their latency is still recorded.
+        """
+        candidates = [name for name in self.order(target_lang, source_lang) if name in providers]
+        pending = {}  # task -> provider name
+        primary = None
+        hedged = False
+        try:
+            while candidates or pending:
+                name = self._next_allowed(candidates)
+                if name is not None:
+                    primary = primary or name
+                    task = asyncio.ensure_future(
+                        self._timed_call_async(providers[name], name, text, target_lang, source_lang))
+                    pending[task] = name
+                if not pending:
+                    break
+
+                timeout = self.hedge_delay(name, source_lang, target_lang) if candidates else None
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    self._note_hedge()
+                    continue
+
+                for task in done:
+                    winner = pending.pop(task)
+                    if task.exception() is None:
+                        self._note_winner(winner, primary, hedged)
+                        return task.result()
+        finally:
+            for task in pending:
+                self._background.add(task)
+                task.add_done_callback(self._finish_background)
+
+        return None
+
+    def _finish_background(self, task):
+        self._background.discard(task)
+        if not task.cancelled():
+            task.exception()  # Mark the exception as retrieved
+
+    def stats(self):
+        """Per provider/pair latency and error summaries plus breaker states"""
+        with self._lock:
+            pairs = {
+                f"{name}:{source}->{target}": stats.summary()
+                for (name, source, target), stats in self._stats.items()
+            }
+            breakers = {
+                name: {
+                    'state': breaker.state,
+                    'consecutive_failures': breaker.failures,
+                    'times_opened': breaker.times_opened,
+                }
+                for name, breaker in self._breakers.items()
+            }
+            counters = dict(self._counters)
+        return {'pairs': pairs, 'breakers': breakers, 'hedge_after': self.hedge_after, **counters}
@@ -0,0 +1,211 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+import numpy as np
+import speech_recognition as sr
+from audio_stream import SAMPLE_RATE, SAMPLE_WIDTH
+
+logger = logging.getLogger(__name__)
+
+# Default speech recognition backend: 'google' (remote) or 'whisper' (in-process, CPU)
+SPEECH_BACKEND = os.environ.get("SPEECH_BACKEND", "google")
+
+# Whisper settings
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "base")
+WHISPER_THREADS = int(os.environ.get("WHISPER_THREADS", str(os.cpu_count() or 1)))
+# Clips queued together are decoded as one batch of up to this many
+WHISPER_BATCH_SIZE = int(os.environ.get("WHISPER_BATCH_SIZE", "8"))
+# Milliseconds the batcher waits for more clips once one has arrived
+WHISPER_BATCH_WAIT_MS = int(os.environ.get("WHISPER_BATCH_WAIT_MS", "20"))
+# Segments judged silent by the model above this probability are discarded
+WHISPER_NO_SPEECH_THRESHOLD = 0.6
+
+# Whisper decodes at most this much audio per clip in a batch
+WHISPER_CLIP_SECONDS = 30
+
+
+def whisper_language(locale):
+    """Whisper language code for a speech locale like 'pt-BR', None to auto-detect"""
+    if not locale:
+        return None
+    return locale.split('-')[0].lower()
+
+
+class GoogleRecognizer:
+    """Remote recognition through the Google Web Speech API (speech_recognition)"""
+
+    name = 'google'
+
+    def transcribe(self, pcm, language=None):
+        audio = sr.AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH)
+        try:
+            recognizer = sr.Recognizer()
+
+            # Try with specified language first, then fallback to auto-detect
+            try:
+                text = recognizer.recognize_google(audio, language=language or "en-US")
+            except:
+                text = recognizer.recognize_google(audio)
+
+            return text
+        except sr.UnknownValueError:
+            return "Could not understand audio"
+        except sr.RequestError as e:
+            return f"Error with speech recognition service: {e}"
+        except Exception as e:
+            return f"Error transcribing audio: {str(e)}"
+
+    def preload(self):
+        pass
+
+    def stats(self):
+        return {'backend': self.name}
+
+
+class WhisperRecognizer:
+    """
+    In-process Whisper on CPU. The model is loaded once and kept warm; a
+    single batcher thread drains the request queue, groups clips by
+    language hint and decodes each group as one batch, so concurrent
+    utterances share a forward pass.
+    """
+
+    name = 'whisper'
+
+    def __init__(self, model_size=WHISPER_MODEL, threads=WHISPER_THREADS,
+                 batch_size=WHISPER_BATCH_SIZE, batch_wait_ms=WHISPER_BATCH_WAIT_MS):
+        self.model_size = model_size
+        self.threads = threads
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._worker = None
+        self._counters = {'clips': 0, 'batches': 0, 'batched_clips': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._load_lock:
+            if self._model is None:
+                import torch
+                import whisper
+                torch.set_num_threads(self.threads)
+                logger.info(f"Loading Whisper model '{self.model_size}' on CPU with {self.threads} threads")
+                self._model = whisper.load_model(self.model_size, device='cpu')
+                self._worker = threading.Thread(target=self._run, name="whisper-batcher", daemon=True)
+                self._worker.start()
+        return self._model
+
+    def preload(self):
+        """Load the model and run one decode so the first request is warm"""
+        self._load()
+        self.transcribe(np.zeros(SAMPLE_RATE, dtype='<i2').tobytes())
+
+    def transcribe(self, pcm, language=None):
+        future = Future()
+        try:
+            self._load()
+            self._requests.put((pcm, whisper_language(language), future))
+            return future.result()
+        except Exception as e:
+            return f"Error transcribing audio: {str(e)}"
+
+    def _next_batch(self):
+        batch = [self._requests.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._requests.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for language, items in groups.items():
+                try:
+                    texts = self._decode(items, language)
+                except Exception as e:
+                    logger.warning(f"Whisper batch failed: {e}")
+                    with self._lock:
+                        self._counters['errors'] += 1
+                    for _, _, future in items:
+                        future.set_exception(e)
+                    continue
+                for (_, _, future), text in zip(items, texts):
+                    future.set_result(text or "Could not understand audio")
+
+    def _decode(self, items, language):
+        import torch
+        import whisper
+        model = self._model
+        audios = [np.frombuffer(pcm, dtype='<i2').astype(np.float32) / 32768.0 for pcm, _, _ in items]
+
+        texts = [None] * len(audios)
+        batched = []
+        for i, audio in enumerate(audios):
+            if len(audio) <= WHISPER_CLIP_SECONDS * SAMPLE_RATE:
+                batched.append(i)
+            else:
+                # Longer than one window: let Whisper slide over it on its own
+                texts[i] = model.transcribe(audio, language=language, fp16=False)['text'].strip()
+
+        if batched:
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i]), n_mels=model.dims.n_mels)
+                for i in batched
+            ])
+            options = whisper.DecodingOptions(language=language, fp16=False, without_timestamps=True)
+            with torch.inference_mode():
+                results = whisper.decode(model, mels, options)
+            for i, result in zip(batched, results):
+                silent = result.no_speech_prob > WHISPER_NO_SPEECH_THRESHOLD and result.avg_logprob < -1.0
+                texts[i] = "" if silent else result.text.strip()
+
+        with self._lock:
+            self._counters['clips'] += len(items)
+            self._counters['batches'] += 1
+            self._counters['batched_clips'] += len(batched)
+        return texts
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update({
+            'backend': self.name,
+            'model': self.model_size,
+            'threads': self.threads,
+            'loaded': self._model is not None,
+            'queued': self._requests.qsize(),
+            'avg_batch': round(stats['clips'] / stats['batches'], 2) if stats['batches'] else 0.0
+        })
+        return stats
+
+
+RECOGNIZERS = {
+    'google': GoogleRecognizer,
+    'whisper': WhisperRecognizer,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_recognizer(name=None):
+    """Shared recognizer for a backend name (SPEECH_BACKEND when omitted)"""
+    name = name or SPEECH_BACKEND
+    if name not in RECOGNIZERS:
+        raise ValueError(f"Unknown speech backend: {name}")
+    with _instances_lock:
+        recognizer = _instances.get(name)
+        if recognizer is None:
+            recognizer = _instances[name] = RECOGNIZERS[name]()
+    return recognizer
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """A single in-progress call that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one: the first caller for a
+    key runs the function, callers arriving while it is in flight wait
+    for and share its result. Works from threads (do) and asyncio (do_async).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self._counters = {
+            'calls': 0,
+            'executions': 0,
+            'collapsed': 0,
+            'errors': 0,
+        }
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once per key for all concurrent callers"""
+        with self._lock:
+            self._counters['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._counters['collapsed'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._counters['executions'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._counters['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) once per key for all concurrent coroutines"""
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            self._counters['calls'] += 1
+            task = self._async_calls.get(loop_key)
+            if task is not None:
+                self._counters['collapsed'] += 1
+            else:
+                task = asyncio.ensure_future(fn(*args, **kwargs))
+                self._async_calls[loop_key] = task
+                self._counters['executions'] += 1
+                task.add_done_callback(lambda t: self._finish_async(loop_key, t))
+
+        # Shield so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finish_async(self, loop_key, task):
+        with self._lock:
+            self._async_calls.pop(loop_key, None)
+            if not task.cancelled() and task.exception() is not None:
+                self._counters['errors'] += 1
+
+    def stats(self):
+        """Return call counters and the number of keys currently in flight"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = len(self._calls) + len(self._async_calls)
+        stats['collapse_rate'] = round(stats['collapsed'] / stats['calls'], 4) if stats['calls'] else 0.0
+        return stats
+
+
+# Shared single-flight group for upstream translations
+translation_flight = SingleFlight()
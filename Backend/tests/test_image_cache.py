@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+import pytest
+from image_cache import ImageResultCache
+
+
+def sign(word, quality=95):
+    """A white sign with one black word on it, as JPEG bytes"""
+    image = np.full((300, 600), 255, dtype=np.uint8)
+    cv2.rectangle(image, (20, 20), (580, 280), 0, 6)
+    cv2.putText(image, word, (110, 190), cv2.FONT_HERSHEY_SIMPLEX, 3, 0, 8)
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    assert ok
+    return encoded.tobytes()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ImageResultCache(db_path=str(tmp_path / "image_cache.db"))
+
+
+def store(cache, image, text):
+    cached, fingerprint = cache.get(image, 'fr')
+    assert cached is None
+    result = {'extracted_text': text, 'translated_text': f"<{text}>"}
+    cache.put(fingerprint, result)
+    return result
+
+
+def test_identical_upload_is_served_without_ocr(cache):
+    image = sign("Push")
+    result = store(cache, image, "Push")
+    cached, _ = cache.get(image, 'fr')
+    assert cached == result
+
+
+@pytest.mark.parametrize("first, second", [("Push", "Pull"), ("Cafe", "Cake"), ("Open", "Shut")])
+def test_same_layout_different_words_is_not_a_hit(cache, first, second):
+    store(cache, sign(first), first)
+    cached, fingerprint = cache.get(sign(second), 'fr')
+    assert cached is None
+    assert cache.near_match(fingerprint, second) is None
+
+
+def test_near_duplicate_with_same_text_reuses_translation(cache):
+    result = store(cache, sign("Push"), "Push")
+    recompressed = sign("Push", quality=70)
+    cached, fingerprint = cache.get(recompressed, 'fr')
+    assert cached is None
+    assert cache.near_match(fingerprint, "Push") == result
+    # Now an exact hit
+    assert cache.get(recompressed, 'fr')[0] == result
+
+
+def test_near_duplicate_needs_same_language_pair(cache):
+    store(cache, sign("Push"), "Push")
+    _, fingerprint = cache.get(sign("Push", quality=70), 'de')
+    assert cache.near_match(fingerprint, "Push") is None
@@ -0,0 +1,30 @@
+import pytest
+from language_detector import language_detector, resolve_source_lang
+
+
+@pytest.mark.parametrize("text, language", [
+    ("안녕하세요, 만나서 반갑습니다", 'ko'),
+    ("こんにちは、お元気ですか", 'ja'),
+    ("สวัสดีครับ คุณสบายดีไหม", 'th'),
+    ("Hello, how are you today? I am fine, thank you.", 'en'),
+    ("Hola, ¿cómo estás? Estoy bien, gracias.", 'es'),
+])
+def test_confident_detection_replaces_auto(text, language):
+    assert resolve_source_lang(text) == language
+
+
+@pytest.mark.parametrize("text, script", [
+    ("سلام، حال شما چطور است؟", 'arabic'),          # Persian, shares letters with Urdu
+    ("Привіт, як справи? Дякую, добре.", 'cyrillic'),  # Ukrainian
+    ("Здравей, как си? Благодаря, добре съм.", 'cyrillic'),  # Bulgarian
+    ("नमस्कार, तुम्ही कसे आहात?", 'devanagari'),       # Marathi
+])
+def test_shared_scripts_keep_auto(text, script):
+    result = language_detector.detect(text)
+    assert result['script'] == script
+    assert result['confidence'] < 0.9
+    assert resolve_source_lang(text) == 'auto'
+
+
+def test_explicit_source_is_kept():
+    assert resolve_source_lang("Привет", 'ru') == 'ru'
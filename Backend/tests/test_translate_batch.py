@@ -0,0 +1,75 @@
+import pytest
+import text_translator
+from translation_cache import TranslationCache
+
+GOOGLE = 'translate_with_google_translate'
+MYMEMORY = 'translate_with_mymemory'
+
+ENGLISH = ["Hello, how are you today? I am fine, thank you.", "Where is the train station? Please help me."]
+SPANISH = ["Hola, ¿cómo estás? Estoy bien, gracias.", "¿Dónde está la estación de tren? Por favor, ayúdame."]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Stub providers that upper-case every line and record each call"""
+    calls = []
+
+    def provider(text, target_lang, source_lang='auto'):
+        calls.append((text, source_lang))
+        return {"text": "\n".join(line.upper() for line in text.split("\n")), "src": source_lang}
+
+    monkeypatch.setitem(text_translator.provider_router.providers, GOOGLE, provider)
+    monkeypatch.setitem(text_translator.provider_router.providers, MYMEMORY, provider)
+    monkeypatch.setattr(text_translator, 'translation_cache', TranslationCache(db_path=None))
+    return calls
+
+
+@pytest.fixture
+def client():
+    return text_translator.app.test_client()
+
+
+def translate_batch(client, texts, **fields):
+    response = client.post('/translate/batch', json={'texts': texts, 'target_lang': 'fr', **fields})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_dedupes_keeps_order_and_reports_item_errors(client, upstream):
+    body = translate_batch(client, ["hello", "", "world", "hello", 5, "x" * 5001])
+    results = body['results']
+    assert results[0]['translated_text'] == "HELLO"
+    assert results[2]['translated_text'] == "WORLD"
+    assert results[3] == results[0]
+    assert 'error' in results[1] and 'error' in results[4] and 'error' in results[5]
+    assert body['unique_texts'] == 2
+    assert body['upstream_calls'] == len(upstream) == 1
+
+
+def test_mixed_languages_are_packed_per_detected_source(client, upstream):
+    body = translate_batch(client, ENGLISH + SPANISH)
+    assert [result['translated_text'] for result in body['results']] == [text.upper() for text in ENGLISH + SPANISH]
+    assert sorted(source for _, source in upstream) == ['en', 'es']
+    assert body['results'][0]['source_lang'] == 'en'
+    assert body['results'][2]['source_lang'] == 'es'
+
+
+def test_results_are_cached_for_single_translations(client, upstream):
+    translate_batch(client, ["good morning", "good night"])
+    upstream.clear()
+    response = client.post('/translate', json={'text': "good night", 'target_lang': 'fr'})
+    assert response.get_json()['translated_text'] == "GOOD NIGHT"
+    assert upstream == []
+
+
+def test_empty_packed_segment_is_retried_alone(client, upstream, monkeypatch):
+    def provider(text, target_lang, source_lang='auto'):
+        upstream.append((text, source_lang))
+        # Drops the translation of "bye" when packed with other texts
+        return {"text": "\n".join("" if line == "bye" and "\n" in text else line.upper()
+                                  for line in text.split("\n")), "src": 'en'}
+
+    monkeypatch.setitem(text_translator.provider_router.providers, GOOGLE, provider)
+    body = translate_batch(client, ["hi", "bye"])
+    assert [result['translated_text'] for result in body['results']] == ["HI", "BYE"]
+    assert body['upstream_calls'] == 2
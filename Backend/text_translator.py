@@ -1,11 +1,17 @@
 import os
 import json
-import requests
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import sqlite3
 import logging
 import urllib.parse
+from translation_cache import translation_cache, make_key
+from language_catalog import LANGUAGES, language_catalog
+from http_cache import conditional_response
+from language_detector import resolve_source_lang
+from singleflight import translation_flight
+from provider_router import ProviderRouter
+from translator_registry import GOOGLE_TRANSLATE_URL, GOOGLE_HEADERS, google_params, parse_google_response
+from http_client import http_client
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -14,136 +20,108 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Reduced language mapping to 20 most common languages
-LANGUAGES = {
-    'auto': 'Auto Detect',
-    'en': 'English',
-    'es': 'Spanish',
-    'fr': 'French',
-    'de': 'German',
-    'it': 'Italian',
-    'pt': 'Portuguese',
-    'ru': 'Russian',
-    'zh': 'Chinese',
-    'ja': 'Japanese',
-    'ko': 'Korean',
-    'ar': 'Arabic',
-    'hi': 'Hindi',
-    'ur': 'Urdu',
-    'tr': 'Turkish',
-    'nl': 'Dutch',
-    'sv': 'Swedish',
-    'pl': 'Polish',
-    'id': 'Indonesian',
-    'vi': 'Vietnamese',
-    'th': 'Thai'
+# Browser cache lifetime for the language list (seconds)
+LANGUAGES_MAX_AGE = 3600
+
+# Upstream endpoints (overridable, e.g. to point at a local stub for load tests)
+MYMEMORY_URL = os.environ.get("MYMEMORY_URL", "https://api.mymemory.translated.net/get")
+
+# Maximum characters per upstream request
+MAX_TEXT_LENGTH = 5000
+
+# Maximum number of texts accepted by /translate/batch
+MAX_BATCH_ITEMS = 500
+
+# Separator used to pack several texts into one upstream request
+BATCH_SEPARATOR = "\n"
+
+# Per-provider length limits for packed requests (MyMemory caps free queries at 500 chars)
+PROVIDER_MAX_CHARS = {
+    'translate_with_google_translate': MAX_TEXT_LENGTH,
+    'translate_with_mymemory': 500
 }
 
 # Get supported languages with proper names
 def get_supported_languages():
-    languages = []
-    for code, name in LANGUAGES.items():
-        languages.append({"code": code, "name": name})
-    
-    # Sort by language name
-    languages.sort(key=lambda x: x["name"])
-    return languages
+    return language_catalog.supported_languages()
 
 # Improved translation function with better API selection
 def translate_text_api(text, target_lang, source_lang='auto'):
-    # Try multiple translation APIs with better language-specific selection
-    apis = []
+    # Serve repeated translations from the shared cache
+    cached = translation_cache.get(text, target_lang, source_lang)
+    if cached:
+        return cached
+
+    # Confident local detection replaces 'auto' so routing works per language pair
+    route_source = resolve_source_lang(text, source_lang)
+
+    # Try the translation APIs in the order picked by the adaptive router
+    result = provider_router.translate(text, target_lang, route_source)
+    if result:
+        translation_cache.set(text, target_lang, source_lang, result)
+        return result
     
+    # All APIs failed, use simple fallback (never cached)
+    return simple_translate(text, target_lang, source_lang)
+
+# Static provider preference for a target language (the router reorders it from live stats)
+def get_api_order(target_lang):
     # For certain language pairs, prefer specific APIs
     if target_lang in ['ur', 'ar', 'hi']:  # Urdu, Arabic, Hindi
         # MyMemory works better for these languages
-        apis = [
+        return [
             translate_with_mymemory,
             translate_with_google_translate
         ]
-    else:
-        # Default order for other languages
-        apis = [
-            translate_with_google_translate,
-            translate_with_mymemory
-        ]
-    
-    for api in apis:
-        try:
-            result = api(text, target_lang, source_lang)
-            if result and result['text'].strip():
-                return result
-        except Exception as e:
-            logger.warning(f"API {api.__name__} failed: {e}")
-            continue
-    
-    # All APIs failed, use simple fallback
-    return simple_translate(text, target_lang, source_lang)
+    # Default order for other languages
+    return [
+        translate_with_google_translate,
+        translate_with_mymemory
+    ]
 
 # Translation using MyMemory API
 def translate_with_mymemory(text, target_lang, source_lang='auto'):
     try:
         if source_lang == 'auto':
-            source_lang = 'en'  # Default to English for auto detection
+            # MyMemory needs an explicit source, detect it locally (English if unsure)
+            source_lang = resolve_source_lang(text)
+            if source_lang == 'auto':
+                source_lang = 'en'
             
-        # Properly encode the text for URL
-        encoded_text = urllib.parse.quote(text)
-        url = f"https://api.mymemory.translated.net/get?q={encoded_text}&langpair={source_lang}|{target_lang}"
-        
-        response = requests.get(url, timeout=10)
+        response = http_client.get(mymemory_url(text, target_lang, source_lang))
         response.raise_for_status()
         
-        result = response.json()
-        if 'responseData' in result and 'translatedText' in result['responseData']:
-            return {
-                "text": result['responseData']['translatedText'],
-                "src": source_lang
-            }
-        else:
-            raise Exception("Invalid response from MyMemory API")
+        return parse_mymemory_response(response.json(), source_lang)
     except Exception as e:
         logger.error(f"MyMemory API error: {e}")
         raise e
 
+# Build the MyMemory request URL
+def mymemory_url(text, target_lang, source_lang):
+    # Properly encode the text for URL
+    encoded_text = urllib.parse.quote(text)
+    return f"{MYMEMORY_URL}?q={encoded_text}&langpair={source_lang}|{target_lang}"
+
+# Extract the translation from a MyMemory response
+def parse_mymemory_response(result, source_lang):
+    if 'responseData' in result and 'translatedText' in result['responseData']:
+        return {
+            "text": result['responseData']['translatedText'],
+            "src": source_lang
+        }
+    raise Exception("Invalid response from MyMemory API")
+
 # Translation using Google Translate (updated endpoint)
 def translate_with_google_translate(text, target_lang, source_lang='auto'):
     try:
-        # Updated Google Translate endpoint
-        url = "https://translate.google.com/translate_a/single"
-        
-        params = {
-            'client': 'gtx',
-            'sl': source_lang,
-            'tl': target_lang,
-            'dt': 't',
-            'q': text
-        }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = http_client.get(
+            GOOGLE_TRANSLATE_URL,
+            params=google_params(text, target_lang, source_lang),
+            headers=GOOGLE_HEADERS
+        )
         response.raise_for_status()
         
-        result = response.json()
-        # Extract translated text from the complex response structure
-        if isinstance(result, list) and len(result) > 0:
-            translated_text = ''
-            for item in result[0]:
-                if item[0]:
-                    translated_text += item[0]
-            
-            detected_lang = source_lang
-            if source_lang == 'auto' and len(result) > 2:
-                detected_lang = result[2]
-            
-            return {
-                "text": translated_text,
-                "src": detected_lang
-            }
-        else:
-            raise Exception("Invalid response from Google Translate")
+        return parse_google_response(response.json(), source_lang)
     except Exception as e:
         logger.error(f"Google Translate API error: {e}")
         raise e
@@ -156,9 +134,133 @@ def simple_translate(text, target_lang, source_lang='auto'):
         "src": source_lang if source_lang != 'auto' else 'en'
     }
 
+# Pack several texts into one upstream call, returns None if it cannot be split back
+# (every text must share source_lang, callers group them by detected language first)
+def translate_packed(texts, target_lang, source_lang='auto'):
+    packed = BATCH_SEPARATOR.join(texts)
+    for name in provider_router.order(target_lang, source_lang):
+        if len(packed) > PROVIDER_MAX_CHARS.get(name, MAX_TEXT_LENGTH):
+            continue
+        if not provider_router.allow(name):
+            continue
+        try:
+            result = provider_router.call(name, packed, target_lang, source_lang)
+        except Exception as e:
+            logger.warning(f"API {name} failed for packed batch: {e}")
+            continue
+
+        parts = result['text'].split(BATCH_SEPARATOR)
+        if len(parts) != len(texts):
+            logger.warning(f"API {name} returned {len(parts)} segments for {len(texts)} texts")
+            continue
+        return [{"text": part.strip(), "src": result['src']} for part in parts]
+    return None
+
+# Group texts into packs that fit within the upstream length limit
+def pack_segments(texts, max_chars=MAX_TEXT_LENGTH):
+    packs = []
+    current = []
+    current_len = 0
+    for text in texts:
+        # Texts containing the separator cannot be split back, send them alone
+        if BATCH_SEPARATOR in text:
+            packs.append([text])
+            continue
+        extra = len(text) + (len(BATCH_SEPARATOR) if current else 0)
+        if current and current_len + extra > max_chars:
+            packs.append(current)
+            current = []
+            current_len = 0
+            extra = len(text)
+        current.append(text)
+        current_len += extra
+    if current:
+        packs.append(current)
+    return packs
+
+# Translate a list of texts for one language pair, results are in input order
+def batch_translate(texts, target_lang, source_lang='auto'):
+    results = [None] * len(texts)
+    positions = {}  # unique text -> input indexes
+
+    for index, raw in enumerate(texts):
+        if not isinstance(raw, str) or not raw.strip():
+            results[index] = {"error": "No text provided"}
+            continue
+        text = raw.strip()
+        if len(text) > MAX_TEXT_LENGTH:
+            results[index] = {"error": f"Text too long. Maximum {MAX_TEXT_LENGTH} characters allowed."}
+            continue
+        positions.setdefault(text, []).append(index)
+
+    translated = {}
+    pending = {}  # source language to send upstream -> texts
+    for text in positions:
+        cached = translation_cache.get(text, target_lang, source_lang)
+        if cached:
+            translated[text] = cached
+        else:
+            # Each text is detected on its own so a mixed-language batch isn't forced into one source;
+            # texts without a confident detection are packed with 'auto' and left to the provider
+            pending.setdefault(resolve_source_lang(text, source_lang), []).append(text)
+
+    packs = [(pack_source, pack) for pack_source, group in pending.items() for pack in pack_segments(group)]
+    upstream_calls = 0
+    for pack_source, pack in packs:
+        if len(pack) > 1:
+            upstream_calls += 1
+            pack_results = translate_packed(pack, target_lang, pack_source)
+            if pack_results:
+                for text, result in zip(pack, pack_results):
+                    if result['text']:
+                        translation_cache.set(text, target_lang, source_lang, result)
+                        translated[text] = result
+                # Segments that came back empty are retried one by one below
+                pack = [text for text in pack if text not in translated]
+
+        # Single text, empty packed segments, or the pack could not be split back
+        for text in pack:
+            if text in translated:
+                continue
+            try:
+                upstream_calls += 1
+                translated[text] = sync_translate(text, target_lang, source_lang)
+            except Exception as e:
+                logger.error(f"Batch item translation error: {e}")
+                translated[text] = {"error": "Translation failed for this item"}
+
+    # Scatter results back to every input position
+    for text, indexes in positions.items():
+        result = translated.get(text, {"error": "Translation failed for this item"})
+        if 'error' in result:
+            item = {"error": result['error']}
+        else:
+            item = {"translated_text": result['text'], "source_lang": result['src']}
+        for index in indexes:
+            results[index] = item
+
+    return {
+        "results": results,
+        "unique_texts": len(positions),
+        "upstream_calls": upstream_calls
+    }
+
 # Main translation function with fallbacks
 def sync_translate(text, target_lang, source_lang='auto'):
-    return translate_text_api(text, target_lang, source_lang)
+    # Concurrent identical requests share a single upstream call
+    key = make_key(text, target_lang, source_lang)
+    result = translation_flight.do(key, translate_text_api, text, target_lang, source_lang)
+    return dict(result)
+
+# Adaptive provider routing (latency/error tracking, circuit breakers, hedging)
+provider_router = ProviderRouter(
+    {
+        'translate_with_google_translate': translate_with_google_translate,
+        'translate_with_mymemory': translate_with_mymemory
+    },
+    lambda target_lang: [api.__name__ for api in get_api_order(target_lang)],
+    LANGUAGES
+)
 
 # Translation endpoint (no authentication required)
 @app.route('/translate', methods=['POST'])
@@ -173,8 +275,8 @@ def translate_text():
             return jsonify({"error": "No text provided"}), 400
         
         # Check text length
-        if len(text) > 5000:
-            return jsonify({"error": "Text too long. Maximum 5000 characters allowed."}), 400
+        if len(text) > MAX_TEXT_LENGTH:
+            return jsonify({"error": f"Text too long. Maximum {MAX_TEXT_LENGTH} characters allowed."}), 400
         
         # Translate the text
         translation = sync_translate(text, target_lang, source_lang)
@@ -188,16 +290,57 @@ def translate_text():
         logger.error(f"Translation error: {e}")
         return jsonify({"error": "Translation service temporarily unavailable. Please try again."}), 500
 
+# Batch translation endpoint, one language pair per request
+@app.route('/translate/batch', methods=['POST'])
+def translate_batch():
+    try:
+        data = request.get_json(silent=True) or {}
+        texts = data.get('texts')
+        target_lang = data.get('target_lang', 'en')
+        source_lang = data.get('source_lang', 'auto')
+
+        if not isinstance(texts, list) or not texts:
+            return jsonify({"error": "Field 'texts' must be a non-empty list"}), 400
+
+        if len(texts) > MAX_BATCH_ITEMS:
+            return jsonify({"error": f"Too many texts. Maximum {MAX_BATCH_ITEMS} per batch."}), 400
+
+        return jsonify(batch_translate(texts, target_lang, source_lang))
+
+    except Exception as e:
+        logger.error(f"Batch translation error: {e}")
+        return jsonify({"error": "Translation service temporarily unavailable. Please try again."}), 500
+
 # Get supported languages endpoint
 @app.route('/languages', methods=['GET'])
 def get_languages():
     try:
-        languages = get_supported_languages()
-        return jsonify(languages)
+        body, etag = language_catalog.snapshot('supported')
+        return conditional_response(body, etag, max_age=LANGUAGES_MAX_AGE)
     except Exception as e:
         logger.error(f"Error getting languages: {e}")
         return jsonify({"error": str(e)}), 500
 
+# Translation cache statistics endpoint
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(translation_cache.stats())
+
+# Provider latency, error rate and circuit breaker statistics endpoint
+@app.route('/providers/stats', methods=['GET'])
+def providers_stats():
+    return jsonify(provider_router.stats())
+
+# Single-flight (collapsed duplicate request) statistics endpoint
+@app.route('/singleflight/stats', methods=['GET'])
+def singleflight_stats():
+    return jsonify(translation_flight.stats())
+
+# Outbound HTTP pool statistics endpoint
+@app.route('/http/stats', methods=['GET'])
+def http_stats():
+    return jsonify(http_client.stats())
+
 # Health check endpoint
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -0,0 +1,112 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import jwt
+
+# Maximum number of verified tokens kept in memory
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "50000"))
+
+
+def token_digest(token):
+    """Cache key for a token (the raw token is never stored)"""
+    if isinstance(token, str):
+        token = token.encode('utf-8')
+    return hashlib.sha256(token).digest()
+
+
+def verify_jwt(token, cache, secret, algorithm='HS256'):
+    """
+    Claims of a JWT issued by the auth service, reusing the claims of tokens
+    already verified and rejecting revoked ones. Raises jwt.InvalidTokenError
+    (or its ExpiredSignatureError subclass) like jwt.decode.
+    """
+    if cache.is_revoked(token):
+        raise jwt.InvalidTokenError("Token has been revoked")
+    claims = cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token, secret, algorithms=[algorithm])
+        cache.put(token, claims)
+    return claims
+
+
+class VerifiedTokenCache:
+    """
+    Claims of tokens whose signature has already been verified, keyed by
+    the token digest. Entries are dropped at the token's own expiry and
+    the least recently used are evicted past max_entries.
+
+    Logged out tokens are revoked: their digest is kept on a deny-list
+    until the token would have expired anyway. The list lives in this
+    process only.
+    """
+
+    def __init__(self, max_entries=TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # digest -> (claims, exp)
+        self._revoked = OrderedDict()  # digest -> exp, roughly in expiry order
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'revoked': 0}
+
+    def get(self, token):
+        """Return cached claims for a still-valid token, or None"""
+        key = token_digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            claims, exp = entry
+            if exp <= now:
+                del self._entries[key]
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return claims
+
+    def put(self, token, claims):
+        """Remember the claims of a verified token until it expires"""
+        exp = claims.get('exp')
+        if exp is None:
+            return
+        key = token_digest(token)
+        with self._lock:
+            self._entries[key] = (claims, float(exp))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def revoke(self, token, exp):
+        """Reject the token from now until its expiry, even though its signature is valid"""
+        key = token_digest(token)
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            # Tokens share one lifetime, so the oldest revocations expire first
+            while self._revoked and next(iter(self._revoked.values())) <= now:
+                self._revoked.popitem(last=False)
+            if float(exp) > now:
+                self._revoked[key] = float(exp)
+                self._counters['revoked'] += 1
+
+    def is_revoked(self, token):
+        key = token_digest(token)
+        with self._lock:
+            exp = self._revoked.get(key)
+            if exp is None:
+                return False
+            if exp <= time.time():
+                del self._revoked[key]
+                return False
+            return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+            stats['revoked_entries'] = len(self._revoked)
+        return stats
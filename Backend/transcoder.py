@@ -0,0 +1,236 @@
+import io
+import os
+import time
+import queue
+import shutil
+import wave
+import atexit
+import logging
+import threading
+import subprocess
+from audio_stream import (SAMPLE_RATE, SAMPLE_WIDTH, CHANNELS, SEEKABLE_FORMATS, TranscodeError,
+                          ffmpeg_pcm_command, stream_pcm, window_bytes)
+
+logger = logging.getLogger(__name__)
+
+# Concurrent ffmpeg decodes, and how many more uploads may wait for one
+TRANSCODE_WORKERS = int(os.environ.get("TRANSCODE_WORKERS", str(os.cpu_count() or 2)))
+TRANSCODE_QUEUE = int(os.environ.get("TRANSCODE_QUEUE", "32"))
+# Seconds an upload may wait for a free worker
+TRANSCODE_QUEUE_TIMEOUT = float(os.environ.get("TRANSCODE_QUEUE_TIMEOUT", "10"))
+
+
+class TranscoderBusy(Exception):
+    """Raised when the transcoding queue is full or the wait timed out"""
+
+
+def find_ffmpeg():
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path:
+        return ffmpeg_path
+
+    custom_paths = [
+        "C:\\FFMPEG\\ffmpeg\\bin\\ffmpeg.exe",
+        "C:\\ffmpeg\\bin\\ffmpeg.exe",
+        "C:\\Program Files\\ffmpeg\\bin\\ffmpeg.exe",
+        "/usr/bin/ffmpeg",
+        "/usr/local/bin/ffmpeg",
+    ]
+
+    for path in custom_paths:
+        if os.path.exists(path):
+            return path
+
+    return None
+
+
+def native_pcm(audio_data):
+    """PCM frames of an upload that is already 16 kHz mono 16-bit WAV, else None"""
+    if audio_data[:4] != b'RIFF' or audio_data[8:12] != b'WAVE':
+        return None
+    try:
+        with wave.open(io.BytesIO(audio_data)) as wav:
+            if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH):
+                return None
+            return wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+
+class StageStats:
+    """Count, mean and max duration of one pipeline stage"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 2)
+        }
+
+
+class Transcoder:
+    """
+    Decodes uploads to 16 kHz mono PCM. Uploads already in that format skip
+    ffmpeg entirely; everything else runs on at most ``workers`` ffmpeg
+    processes, each spawned ahead of time and parked on stdin so process
+    startup is off the request path. At most ``queue_size`` uploads wait for
+    a worker, beyond that callers get TranscoderBusy.
+    """
+
+    def __init__(self, ffmpeg_path=None, workers=TRANSCODE_WORKERS, queue_size=TRANSCODE_QUEUE,
+                 queue_timeout=TRANSCODE_QUEUE_TIMEOUT):
+        self._ffmpeg_path = ffmpeg_path
+        self._resolved = ffmpeg_path is not None
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._running = threading.BoundedSemaphore(workers)
+        self._warm = queue.Queue(maxsize=workers)
+        self._lock = threading.Lock()
+        self._stages = {name: StageStats() for name in ('native', 'queue_wait', 'spawn', 'decode')}
+        self._counters = {'native': 0, 'ffmpeg': 0, 'warm_hits': 0, 'rejected': 0, 'errors': 0}
+        self._closed = False
+
+    @property
+    def ffmpeg_path(self):
+        """ffmpeg location, looked up on first use"""
+        if not self._resolved:
+            self._ffmpeg_path = find_ffmpeg()
+            self._resolved = True
+        return self._ffmpeg_path
+
+    def _record(self, stage, seconds):
+        with self._lock:
+            self._stages[stage].add(seconds)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _spawn(self):
+        return subprocess.Popen(
+            ffmpeg_pcm_command(self.ffmpeg_path),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+
+    def _replenish(self):
+        """Park a fresh ffmpeg process for the next upload"""
+        if self._closed or self._warm.full():
+            return
+        try:
+            process = self._spawn()
+        except OSError as e:
+            logger.warning(f"Could not prespawn ffmpeg: {e}")
+            return
+        try:
+            self._warm.put_nowait(process)
+        except queue.Full:
+            process.kill()
+            process.wait()
+
+    def _take_process(self):
+        """A parked ffmpeg process if one is alive, else a freshly spawned one"""
+        while True:
+            try:
+                process = self._warm.get_nowait()
+            except queue.Empty:
+                break
+            if process.poll() is None:
+                self._count('warm_hits')
+                threading.Thread(target=self._replenish, name="ffmpeg-prespawn", daemon=True).start()
+                return process
+            process.wait()
+
+        start = time.perf_counter()
+        process = self._spawn()
+        self._record('spawn', time.perf_counter() - start)
+        threading.Thread(target=self._replenish, name="ffmpeg-prespawn", daemon=True).start()
+        return process
+
+    def preload(self):
+        """Park one ffmpeg process per worker (e.g. at startup)"""
+        if self.ffmpeg_path:
+            for _ in range(self.workers):
+                self._replenish()
+
+    def stream(self, audio_data, input_extension='.webm', chunk_bytes=None):
+        """Yield PCM windows of chunk_bytes for an upload (see audio_stream.stream_pcm)"""
+        chunk_bytes = chunk_bytes or window_bytes()
+
+        start = time.perf_counter()
+        pcm = native_pcm(audio_data)
+        if pcm is not None:
+            self._count('native')
+            self._record('native', time.perf_counter() - start)
+            for offset in range(0, len(pcm), chunk_bytes):
+                yield pcm[offset:offset + chunk_bytes]
+            return
+
+        if not self.ffmpeg_path:
+            raise TranscodeError("FFmpeg not found")
+
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise TranscoderBusy("Transcoding queue is full")
+        try:
+            if not self._running.acquire(timeout=self.queue_timeout):
+                self._count('rejected')
+                raise TranscoderBusy("Timed out waiting for a transcoding worker")
+            try:
+                self._record('queue_wait', time.perf_counter() - start)
+                self._count('ffmpeg')
+                # Containers that need seeking go through a temp file and can't use a parked process
+                process = None if input_extension.lower() in SEEKABLE_FORMATS else self._take_process()
+
+                decode_start = time.perf_counter()
+                try:
+                    yield from stream_pcm(audio_data, self.ffmpeg_path, input_extension, chunk_bytes, process)
+                except TranscodeError:
+                    self._count('errors')
+                    raise
+                self._record('decode', time.perf_counter() - decode_start)
+            finally:
+                self._running.release()
+        finally:
+            self._slots.release()
+
+    def to_pcm(self, audio_data, input_extension='.webm'):
+        """Decode a whole upload to PCM"""
+        return b"".join(self.stream(audio_data, input_extension, chunk_bytes=1 << 16))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['stages'] = {name: stage.as_dict() for name, stage in self._stages.items()}
+        stats['workers'] = self.workers
+        stats['warm_processes'] = self._warm.qsize()
+        stats['ffmpeg_path'] = self.ffmpeg_path
+        return stats
+
+    def close(self):
+        """Kill parked processes"""
+        self._closed = True
+        while True:
+            try:
+                process = self._warm.get_nowait()
+            except queue.Empty:
+                return
+            process.kill()
+            process.wait()
+
+
+# Shared transcoder used by the audio service
+transcoder = Transcoder()
+atexit.register(transcoder.close)
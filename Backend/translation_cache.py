@@ -0,0 +1,227 @@
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration (can be overridden through environment variables)
+CACHE_DB_FILE = os.environ.get(
+    "TRANSLATION_CACHE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_cache.db")
+)
+CACHE_MAX_ENTRIES = int(os.environ.get("TRANSLATION_CACHE_SIZE", "10000"))
+CACHE_DISK_ENTRIES = int(os.environ.get("TRANSLATION_CACHE_DISK_SIZE", "200000"))
+CACHE_TTL = int(os.environ.get("TRANSLATION_CACHE_TTL", str(7 * 24 * 60 * 60)))  # 7 days
+# The disk tier is trimmed to max_disk_entries after this many writes
+PRUNE_EVERY = 1000
+
+
+def make_key(text, target_lang, source_lang='auto'):
+    """Build a stable cache key for a (text, source_lang, target_lang) triple"""
+    raw = f"{source_lang}\x1f{target_lang}\x1f{text}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """
+    Two-tier translation cache: an in-process LRU with size and TTL
+    eviction in front of an SQLite store that survives restarts. The store
+    drops expired rows and keeps at most max_disk_entries, oldest written
+    going first.
+    """
+
+    def __init__(self, db_path=CACHE_DB_FILE, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL,
+                 max_disk_entries=CACHE_DISK_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._writes = 0
+        self._memory = OrderedDict()  # key -> (result, expires_at)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'expirations': 0,
+        }
+        if db_path:
+            self._open_db()
+
+    def _open_db(self):
+        """Open the SQLite store, falling back to memory-only on failure"""
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " key TEXT PRIMARY KEY,"
+                " result TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_translations_expires ON translations (expires_at)")
+            self._prune()
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Translation cache database unavailable, using memory only: {e}")
+            self._db = None
+
+    def _count(self, name, amount=1):
+        self._counters[name] += amount
+
+    def _memory_put(self, key, result, expires_at):
+        """Insert into the LRU tier, evicting the least recently used entries"""
+        self._memory[key] = (result, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._count('evictions')
+
+    def get(self, text, target_lang, source_lang='auto'):
+        """Return a cached translation dict or None"""
+        key = make_key(text, target_lang, source_lang)
+        now = time.time()
+        result = self._memory_get(key, now)
+        if result is not None:
+            return result
+        return self._disk_lookup(key, now)
+
+    async def get_async(self, text, target_lang, source_lang='auto'):
+        """get() for event loops: the memory tier is checked inline, SQLite on a worker thread"""
+        key = make_key(text, target_lang, source_lang)
+        now = time.time()
+        result = self._memory_get(key, now)
+        if result is not None:
+            return result
+        return await asyncio.to_thread(self._disk_lookup, key, now)
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    self._count('memory_hits')
+                    return dict(result)
+                del self._memory[key]
+                self._count('expirations')
+        return None
+
+    def _disk_lookup(self, key, now):
+        """Read-through from SQLite after a memory miss"""
+        result = self._disk_get(key, now)
+        with self._lock:
+            if result is None:
+                self._count('misses')
+                return None
+            self._count('disk_hits')
+            self._memory_put(key, result[0], result[1])
+        return dict(result[0])
+
+    def _memory_set(self, text, target_lang, source_lang, result):
+        key = make_key(text, target_lang, source_lang)
+        expires_at = time.time() + self.ttl
+        value = {"text": result["text"], "src": result["src"]}
+        with self._lock:
+            self._memory_put(key, value, expires_at)
+            self._count('sets')
+        return key, value, expires_at
+
+    def set(self, text, target_lang, source_lang, result):
+        """Store a translation result in both tiers"""
+        self._disk_set(*self._memory_set(text, target_lang, source_lang, result))
+
+    async def set_async(self, text, target_lang, source_lang, result):
+        """set() for event loops: the SQLite write runs on a worker thread"""
+        await asyncio.to_thread(self._disk_set, *self._memory_set(text, target_lang, source_lang, result))
+
+    def _disk_get(self, key, now):
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT result, expires_at FROM translations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] < now:
+                    self._db.execute("DELETE FROM translations WHERE key = ?", (key,))
+                    self._db.commit()
+                    with self._lock:
+                        self._count('expirations')
+                    return None
+            return json.loads(row[0]), row[1]
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Translation cache read failed: {e}")
+            return None
+
+    def _disk_set(self, key, value, expires_at):
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO translations (key, result, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at)
+                )
+                self._writes += 1
+                if self._writes % PRUNE_EVERY == 0:
+                    self._prune()
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Translation cache write failed: {e}")
+
+    def _prune(self):
+        """Delete expired rows and the oldest beyond max_disk_entries (db lock held or not yet shared)"""
+        self._db.execute("DELETE FROM translations WHERE expires_at < ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM translations WHERE key NOT IN"
+            " (SELECT key FROM translations ORDER BY expires_at DESC LIMIT ?)",
+            (self.max_disk_entries,)
+        )
+
+    def clear(self):
+        """Drop every cached entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM translations")
+                self._db.commit()
+
+    def stats(self):
+        """Return hit/miss/eviction counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['max_disk_entries'] = self.max_disk_entries
+        stats['ttl'] = self.ttl
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    stats['disk_entries'] = self._db.execute(
+                        "SELECT COUNT(*) FROM translations"
+                    ).fetchone()[0]
+            except sqlite3.Error:
+                stats['disk_entries'] = None
+        return stats
+
+
+# Shared cache used by every translation path in the backend
+translation_cache = TranslationCache()
@@ -0,0 +1,125 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from http_client import http_client
+
+logger = logging.getLogger(__name__)
+
+# Google Translate endpoint (overridable, e.g. to point at a local stub for load tests)
+GOOGLE_TRANSLATE_URL = os.environ.get("GOOGLE_TRANSLATE_URL", "https://translate.google.com/translate_a/single")
+
+# Browser User-Agent sent to the Google endpoint
+GOOGLE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Google rejects longer payloads
+MAX_CHARS = 5000
+
+# Language pairs whose clients are kept (codes come from request bodies, so the set is open-ended)
+TRANSLATOR_REGISTRY_SIZE = int(os.environ.get("TRANSLATOR_REGISTRY_SIZE", "256"))
+
+
+# Query parameters for the Google Translate endpoint
+def google_params(text, target_lang, source_lang):
+    return {
+        'client': 'gtx',
+        'sl': source_lang,
+        'tl': target_lang,
+        'dt': 't',
+        'q': text
+    }
+
+# Extract translated text from the complex Google response structure
+def parse_google_response(result, source_lang):
+    if isinstance(result, list) and len(result) > 0:
+        translated_text = ''
+        for item in result[0]:
+            if item[0]:
+                translated_text += item[0]
+
+        detected_lang = source_lang
+        if source_lang == 'auto' and len(result) > 2:
+            detected_lang = result[2]
+
+        return {
+            "text": translated_text,
+            "src": detected_lang
+        }
+    raise Exception("Invalid response from Google Translate")
+
+
+class GoogleTranslateClient:
+    """
+    Google Translate client bound to one language pair. Unlike
+    deep_translator.GoogleTranslator it keeps no per-call state, so one
+    instance is safely shared between threads, and it sends requests
+    through the pooled keep-alive session.
+    """
+
+    def __init__(self, source='auto', target='en', client=http_client):
+        self.source = source
+        self.target = target
+        self.client = client
+
+    def translate(self, text):
+        """Translate text, raising on upstream failure"""
+        text = text.strip()
+        if not text or self.source == self.target:
+            return text
+        if len(text) > MAX_CHARS:
+            raise ValueError(f"Text too long. Maximum {MAX_CHARS} characters allowed.")
+
+        response = self.client.get(
+            GOOGLE_TRANSLATE_URL,
+            params=google_params(text, self.target, self.source),
+            headers=GOOGLE_HEADERS
+        )
+        response.raise_for_status()
+        return parse_google_response(response.json(), self.source)['text']
+
+
+class TranslatorRegistry:
+    """
+    Create one translator client per (source, target) pair and reuse it,
+    keeping the max_pairs most recently used
+    """
+
+    def __init__(self, factory=GoogleTranslateClient, max_pairs=TRANSLATOR_REGISTRY_SIZE):
+        self.factory = factory
+        self.max_pairs = max_pairs
+        self._lock = threading.Lock()
+        self._clients = OrderedDict()  # (source, target) -> client, least recently used first
+        self._counters = {'created': 0, 'reused': 0, 'evictions': 0}
+
+    def get(self, source='auto', target='en'):
+        key = (source, target)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self.factory(source=source, target=target)
+                self._clients[key] = client
+                self._counters['created'] += 1
+                while len(self._clients) > self.max_pairs:
+                    self._clients.popitem(last=False)
+                    self._counters['evictions'] += 1
+            else:
+                self._clients.move_to_end(key)
+                self._counters['reused'] += 1
+        return client
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['pairs'] = len(self._clients)
+        return stats
+
+
+# Shared registry used by every service
+translator_registry = TranslatorRegistry()
+
+
+def get_translator(source='auto', target='en'):
+    """Return the shared translator client for a language pair"""
+    return translator_registry.get(source, target)
@@ -0,0 +1,227 @@
+import io
+import os
+import re
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from gtts import gTTS
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Directory holding rendered MP3s, named by content hash
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", "tts_cache")
+# Total size the cache may use before least recently used files are removed
+TTS_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Streaming TTS: longest piece synthesized at once, and pieces rendered in parallel
+TTS_PIECE_CHARS = int(os.environ.get("TTS_PIECE_CHARS", "200"))
+TTS_STREAM_WORKERS = int(os.environ.get("TTS_STREAM_WORKERS", "4"))
+
+# Sentence ends (Latin, CJK, Arabic/Urdu, Devanagari) and line breaks
+SENTENCE_END = re.compile(r'(?<=[.!?。！？؟।])\s+|(?<=[。！？])|\n+')
+# Places to break a sentence that is still too long
+CLAUSE_BREAK = re.compile(r'(?<=[,;:，、；])\s*')
+
+
+def tts_key(text, lang, slow=False):
+    """Content address of a rendering"""
+    return hashlib.sha256(json.dumps([text, lang, bool(slow)], ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def render_mp3(text, lang, slow=False):
+    """Synthesize text with gTTS and return the MP3 bytes"""
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=lang, slow=slow).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+def _hard_split(piece, max_chars):
+    """Break an overlong piece at clause marks, then at spaces"""
+    parts = []
+    for clause in CLAUSE_BREAK.split(piece):
+        while len(clause) > max_chars:
+            cut = clause.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            parts.append(clause[:cut])
+            clause = clause[cut:].lstrip()
+        if clause:
+            parts.append(clause)
+    return parts
+
+
+def split_sentences(text, max_chars=TTS_PIECE_CHARS):
+    """
+    Split text into sentence-sized pieces of at most max_chars. Short
+    sentences are merged, except into the first piece, which stays short so
+    streaming starts quickly.
+    """
+    pieces = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        for part in (_hard_split(sentence, max_chars) if len(sentence) > max_chars else [sentence]):
+            if len(pieces) > 1 and len(pieces[-1]) + 1 + len(part) <= max_chars // 2:
+                pieces[-1] = f"{pieces[-1]} {part}"
+            else:
+                pieces.append(part)
+    return pieces
+
+
+class TTSCache:
+    """
+    Content-addressed MP3 cache on disk. Files are written atomically (temp
+    file + rename, nothing left behind on failure), concurrent requests for
+    the same rendering share one gTTS call, and the directory is kept under
+    max_bytes by evicting the least recently used files.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, renderer=render_mp3):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.renderer = renderer
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._total = 0
+        self._flight = SingleFlight()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Index existing files, oldest access first, and drop stray temp files"""
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.tmp'):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            elif name.endswith('.mp3'):
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+        self._evict()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _evict(self):
+        removed = []
+        with self._lock:
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                key, size = self._entries.popitem(last=False)
+                self._total -= size
+                self._counters['evictions'] += 1
+                removed.append(key)
+        for key in removed:
+            try:
+                os.unlink(self.path(key))
+            except OSError:
+                pass
+
+    def _store(self, key, audio):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self._total += len(audio) - self._entries.pop(key, 0)
+            self._entries[key] = len(audio)
+        self._evict()
+
+    def _render(self, key, text, lang, slow):
+        # Another worker process sharing the directory may have rendered it already
+        try:
+            size = os.path.getsize(self.path(key))
+        except OSError:
+            self._store(key, self.renderer(text, lang, slow))
+            return
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = size
+                self._total += size
+
+    def get(self, text, lang, slow=False):
+        """Path and key (usable as ETag) of the rendered MP3, rendering it on a miss"""
+        key = tts_key(text, lang, slow)
+        path = self.path(key)
+        with self._lock:
+            cached = key in self._entries
+            if cached:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+            else:
+                self._counters['misses'] += 1
+
+        if cached and os.path.exists(path):
+            try:
+                os.utime(path)  # keeps LRU order across restarts
+            except OSError:
+                pass
+            return path, key
+
+        self._flight.do(key, self._render, key, text, lang, slow)
+        return path, key
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._total
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+# Shared cache used by Audio, Image and Phrasebook
+tts_cache = TTSCache()
+
+# Renders the pieces of streamed speech
+tts_stream_pool = ThreadPoolExecutor(max_workers=TTS_STREAM_WORKERS, thread_name_prefix="tts-stream")
+
+
+def _read_file(path, chunk_size=64 * 1024):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def stream_speech(text, lang, slow=False, cache=None):
+    """
+    Synthesize text piece by piece and return an iterator of MP3 bytes in
+    order. All pieces render concurrently (each one cached on its own);
+    this call waits for the first piece, so synthesis errors surface here
+    rather than mid-stream.
+    """
+    cache = cache or tts_cache
+    futures = [tts_stream_pool.submit(cache.get, piece, lang, slow) for piece in split_sentences(text)]
+    if not futures:
+        raise ValueError("Nothing to synthesize")
+    first_path, _ = futures[0].result()
+
+    def chunks():
+        yield from _read_file(first_path)
+        for future in futures[1:]:
+            try:
+                path, _ = future.result()
+            except Exception as e:
+                # Headers are already sent, end the stream with what we have
+                logger.warning(f"Streaming TTS piece failed: {e}")
+                return
+            yield from _read_file(path)
+
+    return chunks()
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# SQLite database holding user accounts
+USER_DB_FILE = os.environ.get("USER_DB_FILE", "users.db")
+# Read-through cache sizing
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "300"))
+
+USER_FIELDS = ('id', 'name', 'email', 'password', 'created_at')
+
+
+class UserStore:
+    """
+    User accounts in SQLite (WAL mode, unique index on email) with an
+    in-memory read-through cache. Each thread gets its own connection;
+    writes are serialized and safe across worker processes.
+    """
+
+    def __init__(self, db_path=USER_DB_FILE, cache_size=USER_CACHE_SIZE, cache_ttl=USER_CACHE_TTL):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._cache = OrderedDict()  # email -> (user, expires_at)
+        self._cache_lock = threading.Lock()
+        self._init_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " id TEXT PRIMARY KEY,"
+            " name TEXT NOT NULL,"
+            " email TEXT NOT NULL,"
+            " password TEXT NOT NULL,"
+            " created_at TEXT NOT NULL)"
+        )
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def migrate_from_file(self, path):
+        """One-shot import of the legacy users.txt JSON-lines file"""
+        conn = self._connection()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone():
+            return 0
+        if not os.path.exists(path):
+            return 0
+
+        rows = []
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    user = json.loads(line.strip())
+                    rows.append(tuple(user[field] for field in USER_FIELDS))
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"Skipping malformed user record: {e}")
+
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another worker may have migrated while we were reading the file
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone():
+                    conn.execute("ROLLBACK")
+                    return 0
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users (id, name, email, password, created_at) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                imported = conn.total_changes - before
+                conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (path,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        logger.info(f"Migrated {imported} users from {path}")
+        return imported
+
+    def _cache_get(self, email):
+        with self._cache_lock:
+            entry = self._cache.get(email)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.time():
+                del self._cache[email]
+                return None
+            self._cache.move_to_end(email)
+            return dict(user)
+
+    def _cache_put(self, user):
+        with self._cache_lock:
+            self._cache[user['email']] = (dict(user), time.time() + self.cache_ttl)
+            self._cache.move_to_end(user['email'])
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, email):
+        with self._cache_lock:
+            self._cache.pop(email, None)
+
+    def get_by_email(self, email):
+        """Return the user dict for an email, or None"""
+        user = self._cache_get(email)
+        if user is not None:
+            return user
+
+        row = self._connection().execute(
+            "SELECT id, name, email, password, created_at FROM users WHERE email = ?", (email,)
+        ).fetchone()
+        if row is None:
+            return None
+        user = dict(row)
+        self._cache_put(user)
+        return user
+
+    def create(self, user_data):
+        """Insert a new user, returns False if the email is already registered"""
+        conn = self._connection()
+        try:
+            with self._write_lock:
+                conn.execute(
+                    "INSERT INTO users (id, name, email, password, created_at) VALUES (?, ?, ?, ?, ?)",
+                    tuple(user_data[field] for field in USER_FIELDS)
+                )
+        except sqlite3.IntegrityError:
+            return False
+        self._cache_put(user_data)
+        return True
+
+    def update(self, email, **fields):
+        """Update columns of an existing user"""
+        columns = [name for name in fields if name in USER_FIELDS and name not in ('id', 'email')]
+        if not columns:
+            return False
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        with self._write_lock:
+            cursor = self._connection().execute(
+                f"UPDATE users SET {assignments} WHERE email = ?",
+                tuple(fields[name] for name in columns) + (email,)
+            )
+        self.invalidate(email)
+        return cursor.rowcount > 0
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
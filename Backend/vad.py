@@ -0,0 +1,182 @@
+import os
+from collections import namedtuple
+import numpy as np
+from audio_stream import SAMPLE_RATE, SAMPLE_WIDTH
+
+# Analysis frame length
+FRAME_MS = 30
+# Speech must rise this far above the clip's noise floor, and never below VAD_MIN_DB
+VAD_MARGIN_DB = float(os.environ.get("VAD_MARGIN_DB", "10"))
+VAD_MIN_DB = float(os.environ.get("VAD_MIN_DB", "-50"))
+# Quieter frames still count as speech when they look like fricatives (high zero-crossing rate)
+FRICATIVE_MARGIN_DB = 6.0
+FRICATIVE_ZCR = 0.25
+# Pauses shorter than this stay inside one utterance
+MIN_SILENCE_MS = int(os.environ.get("VAD_MIN_SILENCE_MS", "400"))
+# Blips shorter than this are dropped
+MIN_SPEECH_MS = int(os.environ.get("VAD_MIN_SPEECH_MS", "200"))
+# Context kept around each utterance
+PADDING_MS = int(os.environ.get("VAD_PADDING_MS", "150"))
+# Longer utterances are cut at the quietest frame of their last SPLIT_SEARCH_MS
+MAX_UTTERANCE_MS = int(os.environ.get("VAD_MAX_UTTERANCE_MS", "15000"))
+SPLIT_SEARCH_MS = 3000
+
+# dB of a full-scale 16-bit sine, so frame energies come out in dBFS
+FULL_SCALE_DB = 20 * np.log10(32768.0)
+
+# Start/end in seconds plus the utterance's PCM
+Utterance = namedtuple('Utterance', ['start', 'end', 'pcm'])
+
+
+def frame_features(samples, frame_length):
+    """Per-frame energy (dBFS) and zero-crossing rate"""
+    count = len(samples) // frame_length
+    frames = samples[:count * frame_length].reshape(count, frame_length).astype(np.float32)
+    energy = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10) - FULL_SCALE_DB
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+    return energy, zcr
+
+
+class VoiceActivityDetector:
+    """
+    Energy/zero-crossing VAD over 16 kHz mono 16-bit PCM. The speech
+    threshold adapts to each clip's noise floor; short pauses are bridged,
+    short blips dropped and overly long utterances split at their quietest
+    point.
+    """
+
+    def __init__(self, frame_ms=FRAME_MS, margin_db=VAD_MARGIN_DB, min_db=VAD_MIN_DB,
+                 min_silence_ms=MIN_SILENCE_MS, min_speech_ms=MIN_SPEECH_MS,
+                 padding_ms=PADDING_MS, max_utterance_ms=MAX_UTTERANCE_MS):
+        self.frame_length = SAMPLE_RATE * frame_ms // 1000
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.min_silence = max(1, min_silence_ms // frame_ms)
+        self.min_speech = max(1, min_speech_ms // frame_ms)
+        self.padding = padding_ms // frame_ms
+        self.max_utterance = max(1, max_utterance_ms // frame_ms)
+        self.split_search = max(1, min(self.max_utterance // 2, SPLIT_SEARCH_MS // frame_ms))
+
+    def speech_frames(self, energy, zcr):
+        """Boolean speech mask over frames"""
+        floor = np.percentile(energy, 10)
+        # Nothing stands out from the floor: steady noise or silence, not speech
+        if energy.max() - floor < self.margin_db:
+            return np.zeros(len(energy), dtype=bool)
+        # A clip that is speech throughout has no quiet floor to measure against
+        threshold = max(min(floor + self.margin_db, energy.max() - 2 * self.margin_db), self.min_db)
+        fricative = (energy > threshold - FRICATIVE_MARGIN_DB) & (zcr > FRICATIVE_ZCR)
+        return (energy > threshold) | fricative
+
+    def _runs(self, mask):
+        edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+        return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+    def _split_long(self, start, end, energy):
+        pieces = []
+        while end - start > self.max_utterance:
+            search_from = start + self.max_utterance - self.split_search
+            cut = search_from + int(np.argmin(energy[search_from:start + self.max_utterance]))
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+        return pieces
+
+    def segments(self, samples):
+        """Speech regions as (start_sample, end_sample) pairs"""
+        if len(samples) < self.frame_length:
+            return []
+        energy, zcr = frame_features(samples, self.frame_length)
+        runs = self._runs(self.speech_frames(energy, zcr))
+
+        merged = []
+        for start, end in runs:
+            if merged and start - merged[-1][1] < self.min_silence:
+                merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+
+        frames = len(energy)
+        regions = []
+        for start, end in merged:
+            if end - start < self.min_speech:
+                continue
+            start = max(0, start - self.padding)
+            end = min(frames, end + self.padding)
+            if regions and start < regions[-1][1]:
+                start = regions[-1][1]
+            regions.extend(self._split_long(start, end, energy))
+
+        # The tail shorter than one frame belongs to a region reaching the end
+        last = len(samples)
+        return [(int(start) * self.frame_length, last if end == frames else int(end) * self.frame_length)
+                for start, end in regions]
+
+    def split(self, pcm, offset=0.0):
+        """Split PCM into Utterances, times relative to offset seconds"""
+        samples = np.frombuffer(pcm, dtype='<i2')
+        return [
+            Utterance(
+                round(offset + start / SAMPLE_RATE, 3),
+                round(offset + end / SAMPLE_RATE, 3),
+                pcm[start * SAMPLE_WIDTH:end * SAMPLE_WIDTH]
+            )
+            for start, end in self.segments(samples)
+        ]
+
+
+class StreamSegmenter:
+    """
+    Incremental VAD for PCM arriving in windows: feed() returns the
+    utterances that are complete (followed by enough silence or cut for
+    length), flush() returns whatever is left at the end of the stream.
+    """
+
+    def __init__(self, detector=None):
+        self.detector = detector or voice_activity_detector
+        self._buffer = bytearray()
+        self._offset = 0  # samples already consumed before the buffer
+
+    def _emit(self, final):
+        samples = np.frombuffer(bytes(self._buffer), dtype='<i2')
+        segments = self.detector.segments(samples)
+        hangover = self.detector.min_silence * self.detector.frame_length
+        pending = None
+        if not final and segments and segments[-1][1] + hangover > len(samples):
+            # The last region may continue in the next window unless silence followed it
+            pending = segments.pop()
+
+        offset = self._offset / SAMPLE_RATE
+        utterances = [
+            Utterance(
+                round(offset + start / SAMPLE_RATE, 3),
+                round(offset + end / SAMPLE_RATE, 3),
+                bytes(self._buffer[start * SAMPLE_WIDTH:end * SAMPLE_WIDTH])
+            )
+            for start, end in segments
+        ]
+
+        if final:
+            consumed = len(samples)
+        elif segments:
+            consumed = segments[-1][1]
+        elif pending:
+            consumed = pending[0]
+        else:
+            # Only silence so far, keep a short tail as context for the next utterance
+            consumed = max(0, len(samples) - hangover)
+        del self._buffer[:consumed * SAMPLE_WIDTH]
+        self._offset += consumed
+        return utterances
+
+    def feed(self, pcm):
+        self._buffer += pcm
+        return self._emit(final=False)
+
+    def flush(self):
+        return self._emit(final=True)
+
+
+# Shared detector with the configured thresholds
+voice_activity_detector = VoiceActivityDetector()
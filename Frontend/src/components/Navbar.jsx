@@ -30,6 +30,7 @@ const Navbar = ({ user, setUser }) => {
       });
       setUser(null);
       localStorage.removeItem('user');
+      localStorage.removeItem('token');
       navigate('/');
     } catch (error) {
       console.error('Logout error:', error);
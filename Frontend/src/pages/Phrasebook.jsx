@@ -23,6 +23,12 @@ import '../styles/app.css';
 // API base URL
 const API_BASE = 'http://localhost:5002';
 
+// Favorites are saved per account, so requests carry the signed-in user's token
+const authHeaders = () => {
+  const token = localStorage.getItem('token');
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
+
 const Phrasebook = () => {
   const [selectedCategory, setSelectedCategory] = useState('greetings');
   const [favorites, setFavorites] = useState([]);
@@ -155,10 +161,8 @@ const defaultCategories = [
               if (!res.ok) throw new Error('Practice questions fetch failed');
               return res.json();
             }),
-            fetch(`${API_BASE}/api/favorites`).then(res => {
-              if (!res.ok) throw new Error('Favorites fetch failed');
-              return res.json();
-            })
+            // Without a valid session favorites start empty and are kept in the page
+            fetch(`${API_BASE}/api/favorites`, { headers: authHeaders() }).then(res => res.ok ? res.json() : [])
           ]);
 
           setCategories(categoriesRes);
@@ -193,6 +197,7 @@ const defaultCategories = [
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders(),
         },
         body: JSON.stringify({ phraseId }),
       });